@@ -1,52 +1,134 @@
+import hmac
+import logging
 import os
-from flask import Flask, jsonify
+import time
+from flask import Flask, jsonify, request
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
 from config import config
+from utils.database import db
+from utils.passwords import hasher
+from utils.json_provider import FastJSONProvider
+from utils.log import configure_logging
+from utils.metrics import metrics, registry
+from utils.profiler import query_profiler
+from utils.startup import startup
+from models.user_cache import user_cache
+from utils.tokens import denylist, is_staff_request
+from models.location import location_directory
+from models.donor_snapshot import donor_snapshot
+from models.eligibility import eligibility_engine
+from models.expiry import expiry_scheduler
+from cli import register_commands
+
+logger = logging.getLogger(__name__)
 
 def create_app(config_name=None):
     """Application factory pattern."""
     if config_name is None:
         config_name = os.environ.get('FLASK_ENV', 'development')
+    started = time.perf_counter()
     
     app = Flask(__name__)
     app.config.from_object(config[config_name])
+    if app.config['JSON_FAST_ENCODER']:
+        app.json = FastJSONProvider(app)
+    configure_logging(app)
+    startup.init_app(app)
+    
+    # First, so its after_request hook runs last and records the final status
+    metrics.init_app(app)
+    query_profiler.init_app(app)
     
     # Initialize extensions
     CORS(app, origins=app.config['CORS_ORIGINS'])
     jwt = JWTManager(app)
+    db.init_app(app)
+    hasher.init_app(app)
+    user_cache.init_app(app)
+    denylist.init_app(app)
+    location_directory.init_app(app)
+    donor_snapshot.init_app(app)
+    eligibility_engine.init_app(app)
+    expiry_scheduler.init_app(app)
+    register_commands(app)
     
-    # JWT error handlers for debugging
+    # JWT error handlers
     @jwt.expired_token_loader
     def expired_token_callback(jwt_header, jwt_payload):
-        print(f"JWT Error: Token expired - {jwt_payload}")
+        logger.info('JWT error: token expired', extra={'user_id': jwt_payload.get('sub')})
         return jsonify({'message': 'Token has expired'}), 422
     
     @jwt.invalid_token_loader
     def invalid_token_callback(error):
-        print(f"JWT Error: Invalid token - {error}")
+        logger.info('JWT error: invalid token: %s', error)
         return jsonify({'message': 'Invalid token'}), 422
     
+    @jwt.token_in_blocklist_loader
+    def check_if_token_revoked(jwt_header, jwt_payload):
+        return denylist.is_revoked(jwt_payload)
+    
+    @jwt.revoked_token_loader
+    def revoked_token_callback(jwt_header, jwt_payload):
+        return jsonify({'message': 'Token has been revoked'}), 401
+    
     @jwt.unauthorized_loader
     def missing_token_callback(error):
-        print(f"JWT Error: Missing token - {error}")
+        logger.debug('JWT error: missing token: %s', error)
         return jsonify({'message': 'Authorization token is required'}), 422
     
     # Register blueprints
     from routes.auth import auth_bp
     from routes.users import users_bp
+    from routes.locations import locations_bp
+    from routes.inventory import inventory_bp
+    from routes.donors import donors_bp
+    from routes.donations import donations_bp
+    from routes.exports import exports_bp
+    from routes.stats import stats_bp
+    from routes.lab import lab_bp
     
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(users_bp, url_prefix='/api/users')
+    app.register_blueprint(locations_bp, url_prefix='/api/locations')
+    app.register_blueprint(inventory_bp, url_prefix='/api/inventory')
+    app.register_blueprint(donors_bp, url_prefix='/api/donors')
+    app.register_blueprint(donations_bp, url_prefix='/api/donations')
+    app.register_blueprint(exports_bp, url_prefix='/api/exports')
+    app.register_blueprint(stats_bp, url_prefix='/api/stats')
+    app.register_blueprint(lab_bp, url_prefix='/api/lab')
     
     # Health check endpoint
     @app.route('/health')
     def health_check():
-        return {
+        health = {
             'status': 'healthy',
             'message': 'VitaPink BloodBank API is running',
             'version': '1.0.0'
         }
+        # Pool, cache and process internals only for staff (or in debug and testing)
+        if app.debug or app.testing or is_staff_request():
+            health.update({
+                'database_pool': db.pool_stats(),
+                'user_cache': user_cache.stats(),
+                'startup': startup.stats()
+            })
+        return health
+    
+    # Metrics endpoint (Prometheus text format, this process only)
+    if metrics.enabled:
+        @app.route('/metrics')
+        def metrics_endpoint():
+            # Scrapers send METRICS_TOKEN; staff may look too (anyone in debug and testing)
+            scrape_token = app.config['METRICS_TOKEN']
+            authorization = request.headers.get('Authorization', '')
+            allowed = (
+                (scrape_token and hmac.compare_digest(authorization.encode(), f'Bearer {scrape_token}'.encode()))
+                or app.debug or app.testing or is_staff_request()
+            )
+            if not allowed:
+                return jsonify({'message': 'Not allowed'}), 403
+            return app.response_class(registry.render(), content_type=registry.CONTENT_TYPE)
     
     # Root endpoint
     @app.route('/')
@@ -58,10 +140,19 @@ def create_app(config_name=None):
             'endpoints': {
                 'auth': '/api/auth',
                 'users': '/api/users',
-                'health': '/health'
+                'locations': '/api/locations',
+                'inventory': '/api/inventory',
+                'donors': '/api/donors',
+                'donations': '/api/donations',
+                'exports': '/api/exports',
+                'stats': '/api/stats',
+                'lab': '/api/lab',
+                'health': '/health',
+                'metrics': '/metrics'
             }
         }
     
+    startup.record('create_app', time.perf_counter() - started)
     return app
 
 if __name__ == '__main__':
@@ -69,9 +160,10 @@ if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
     host = os.environ.get('HOST', '0.0.0.0')
     
-    print(f"Starting VitaPink BloodBank API...")
-    print(f"Environment: {os.environ.get('FLASK_ENV', 'development')}")
-    print(f"Host: {host}")
-    print(f"Port: {port}")
+    logger.info('Starting VitaPink BloodBank API', extra={
+        'environment': os.environ.get('FLASK_ENV', 'development'),
+        'host': host,
+        'port': port
+    })
     
     app.run(host=host, port=port, debug=True) 
\ No newline at end of file
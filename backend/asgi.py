@@ -0,0 +1,32 @@
+"""ASGI entry point: async views for I/O-bound endpoints, Flask for the rest.
+
+    uvicorn --factory asgi:create_asgi_app --port 5000
+
+Requests listed in routes.async_views.ROUTES are handled on the event loop
+with AsyncDatabase; every other request goes to the regular Flask app,
+which asgiref runs in a thread pool.
+"""
+import os
+from asgiref.wsgi import WsgiToAsgi
+from app import create_app
+from routes.async_views import ROUTES
+from utils.asgi import AsyncViews
+from utils.async_database import async_db
+from utils.metrics import metrics
+
+
+def create_asgi_app(config_name=None):
+    """ASGI application factory."""
+    if config_name is None:
+        config_name = os.environ.get('FLASK_ENV', 'development')
+    
+    app = create_app(config_name)
+    if metrics.enabled:
+        async_db.add_observer(metrics.observe_query)
+    return AsyncViews(
+        app,
+        ROUTES,
+        WsgiToAsgi(app),
+        startup=[async_db.open],
+        shutdown=[async_db.close]
+    )
@@ -0,0 +1,100 @@
+import click
+from flask.cli import AppGroup
+from models.eligibility import eligibility_engine
+from models.expiry import expiry_scheduler
+from models.donor_stats import DonorStats
+from models.inventory import inventory
+from models.rollups import InventoryRollups
+
+eligibility_cli = AppGroup('eligibility', help='Donor eligibility engine.')
+donor_stats_cli = AppGroup('donor-stats', help='Maintained donor statistics.')
+rollups_cli = AppGroup('rollups', help='Hourly and daily inventory rollups.')
+expiry_cli = AppGroup('expiry', help='Expiry of units in stock.')
+inventory_cli = AppGroup('inventory', help='Blood inventory maintenance.')
+
+
+@eligibility_cli.command('sweep')
+def eligibility_sweep():
+    """Re-evaluate every donor once."""
+    result = eligibility_engine.sweep()
+    click.echo(
+        f"Checked {result['checked']} donors: {result['made_eligible']} made eligible, "
+        f"{result['made_ineligible']} made ineligible"
+    )
+
+
+@eligibility_cli.command('run')
+def eligibility_run():
+    """Keep eligibility current until interrupted."""
+    click.echo(f'Eligibility engine running (poll every {eligibility_engine.poll_interval}s)')
+    try:
+        eligibility_engine.run()
+    except KeyboardInterrupt:
+        pass
+
+
+@donor_stats_cli.command('backfill')
+def donor_stats_backfill():
+    """Recompute donor_stats_totals from donations."""
+    written = DonorStats.backfill()
+    click.echo(f'Recomputed totals for {written} donors')
+
+
+@donor_stats_cli.command('check')
+@click.option('--fix', is_flag=True, help='Backfill when mismatches are found.')
+def donor_stats_check(fix):
+    """Compare donor_stats_totals with donations."""
+    mismatches = DonorStats.check()
+    for mismatch in mismatches[:50]:
+        click.echo(f"user {mismatch['user_id']}: {mismatch['differences']}")
+    if not mismatches:
+        click.echo('donor_stats_totals is consistent')
+        return
+    click.echo(f'{len(mismatches)} donors out of sync')
+    if fix:
+        DonorStats.backfill()
+        click.echo('Backfilled donor_stats_totals')
+    else:
+        raise SystemExit(1)
+
+
+@rollups_cli.command('backfill')
+@click.option('--since', type=click.DateTime(), help='First day to rebuild (default: first completed donation).')
+def rollups_backfill(since):
+    """Recompute the collection figures of inventory_rollups from donations."""
+    windows = InventoryRollups.backfill(since=since)
+    click.echo(f'Backfilled {windows} windows of inventory rollups')
+
+
+@expiry_cli.command('sweep')
+def expiry_sweep():
+    """Expire every unit past its expiry date once."""
+    scheduled = expiry_scheduler.load()
+    result = expiry_scheduler.expire_due()
+    click.echo(f"Expired {result['expired']} of {scheduled} units in stock: {result['volume']}")
+
+
+@expiry_cli.command('run')
+def expiry_run():
+    """Expire units as their expiry dates pass until interrupted."""
+    click.echo(f'Expiry scheduler running (poll every {expiry_scheduler.poll_interval}s)')
+    try:
+        expiry_scheduler.run()
+    except KeyboardInterrupt:
+        pass
+
+
+@inventory_cli.command('reset-daily')
+def inventory_reset_daily():
+    """Zero the daily dispensed and received counters (run at midnight)."""
+    reset = inventory.reset_daily_counters()
+    click.echo(f'Reset the daily counters of {reset} blood types')
+
+
+def register_commands(app):
+    """Attach the management commands to ``flask``."""
+    app.cli.add_command(eligibility_cli)
+    app.cli.add_command(donor_stats_cli)
+    app.cli.add_command(rollups_cli)
+    app.cli.add_command(expiry_cli)
+    app.cli.add_command(inventory_cli)
@@ -5,6 +5,8 @@ from dotenv import load_dotenv
 # Load environment variables
 load_dotenv()
 
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
 class Config:
     """Base configuration class."""
     
@@ -18,11 +20,99 @@ class Config:
     DB_USER = os.environ.get('DB_USER') or 'root'
     DB_PASSWORD = os.environ.get('DB_PASSWORD') or 'admin'
     
+    # Connection Pool Configuration
+    DB_POOL_MIN_SIZE = int(os.environ.get('DB_POOL_MIN_SIZE') or 1)
+    DB_POOL_MAX_SIZE = int(os.environ.get('DB_POOL_MAX_SIZE') or 10)
+    DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT') or 5)  # seconds to wait for a free connection
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE') or 3600)  # seconds before a connection is replaced
+    DB_POOL_PING_INTERVAL = int(os.environ.get('DB_POOL_PING_INTERVAL') or 30)  # idle seconds before a liveness ping
+    DB_POOL_IDLE_TIMEOUT = int(os.environ.get('DB_POOL_IDLE_TIMEOUT') or 600)  # idle seconds before a connection beyond DB_POOL_MIN_SIZE is closed
+    DB_POOL_WARMUP_SIZE = int(os.environ.get('DB_POOL_WARMUP_SIZE') or 0)  # connections a gunicorn worker opens before serving; 0 = DB_POOL_MIN_SIZE
+    DB_STREAM_NET_WRITE_TIMEOUT = int(os.environ.get('DB_STREAM_NET_WRITE_TIMEOUT') or 600)  # seconds the server waits on a slow export client
+    ASYNC_DB_POOL_MIN_SIZE = int(os.environ.get('ASYNC_DB_POOL_MIN_SIZE') or 1)  # AsyncDatabase (asgi.py) pool
+    ASYNC_DB_POOL_MAX_SIZE = int(os.environ.get('ASYNC_DB_POOL_MAX_SIZE') or 20)
+    
+    # Read Replica Configuration
+    DB_REPLICAS = os.environ.get('DB_REPLICAS') or ''  # host[:port][=weight],...; same credentials as the primary
+    DB_REPLICA_MAX_LAG = float(os.environ.get('DB_REPLICA_MAX_LAG') or 5)  # seconds behind before a replica is ejected
+    DB_REPLICA_CHECK_INTERVAL = float(os.environ.get('DB_REPLICA_CHECK_INTERVAL') or 2)  # seconds between lag checks
+    DB_REPLICA_LAG_QUERY = os.environ.get('DB_REPLICA_LAG_QUERY')  # first column = lag in seconds; default SHOW REPLICA STATUS
+    DB_READ_YOUR_WRITES_WINDOW = float(os.environ.get('DB_READ_YOUR_WRITES_WINDOW') or 5)  # seconds a session reads from the primary after a write
+    DB_READ_YOUR_WRITES_CHANNEL_PATH = os.environ.get('DB_READ_YOUR_WRITES_CHANNEL_PATH') or os.path.join(BASE_DIR, 'instance', 'session-pins.log')  # shared by the workers of a host
+    
     # JWT Configuration
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or 'vitapink-jwt-secret-2025'
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=24)
     JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=30)
     
+    # Token Revocation Configuration
+    TOKEN_DENYLIST_CAPACITY = int(os.environ.get('TOKEN_DENYLIST_CAPACITY') or 100000)
+    TOKEN_DENYLIST_ERROR_RATE = 0.01  # Bloom filter false-positive rate
+    TOKEN_REVOCATION_CHANNEL_PATH = os.environ.get('TOKEN_REVOCATION_CHANNEL_PATH') or os.path.join(BASE_DIR, 'instance', 'token-revocations.log')  # shared file replayed by every worker
+    
+    # Password Hashing Configuration
+    BCRYPT_ROUNDS = int(os.environ.get('BCRYPT_ROUNDS') or 0)  # 0 = calibrate at startup
+    BCRYPT_TARGET_MS = int(os.environ.get('BCRYPT_TARGET_MS') or 250)
+    BCRYPT_MIN_ROUNDS = 10
+    BCRYPT_MAX_ROUNDS = 15
+    BCRYPT_MAX_WORKERS = int(os.environ.get('BCRYPT_MAX_WORKERS') or min(4, os.cpu_count() or 1))
+    BCRYPT_MAX_QUEUE = int(os.environ.get('BCRYPT_MAX_QUEUE') or 16)  # pending operations before 503
+    BCRYPT_MAX_BATCH_QUEUE = int(os.environ.get('BCRYPT_MAX_BATCH_QUEUE') or 0)  # slots batches may hold; 0 = half
+    
+    # Batch Registration Configuration
+    BATCH_REGISTER_MAX_SIZE = int(os.environ.get('BATCH_REGISTER_MAX_SIZE') or 1000)
+    BATCH_INSERT_CHUNK_SIZE = int(os.environ.get('BATCH_INSERT_CHUNK_SIZE') or 200)
+    
+    # Lab Import Configuration
+    LAB_IMPORT_CHUNK_SIZE = int(os.environ.get('LAB_IMPORT_CHUNK_SIZE') or 500)  # rows per transaction
+    LAB_IMPORT_MAX_ERRORS = int(os.environ.get('LAB_IMPORT_MAX_ERRORS') or 1000)  # per-row errors listed in the response
+    MAX_CONTENT_LENGTH = int(os.environ.get('MAX_CONTENT_LENGTH') or 0) or None  # request body bytes, multipart spools included; unset = no limit
+    
+    # User Cache Configuration
+    USER_CACHE_ENABLED = (os.environ.get('USER_CACHE_ENABLED') or 'true').lower() == 'true'
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL') or 60)  # seconds
+    USER_CACHE_MAX_ENTRIES = int(os.environ.get('USER_CACHE_MAX_ENTRIES') or 10000)
+    USER_CACHE_MAX_BYTES = int(os.environ.get('USER_CACHE_MAX_BYTES') or 16 * 1024 * 1024)
+    USER_CACHE_CHANNEL_PATH = os.environ.get('USER_CACHE_CHANNEL_PATH') or os.path.join(BASE_DIR, 'instance', 'user-cache.log')  # shared file for cross-worker invalidation
+    CHANNEL_MAX_BYTES = int(os.environ.get('CHANNEL_MAX_BYTES') or 1048576)  # channel files (user cache, revocations) are compacted beyond this
+    
+    # Locations Directory Configuration
+    LOCATIONS_REFRESH_INTERVAL = int(os.environ.get('LOCATIONS_REFRESH_INTERVAL') or 60)  # seconds between incremental refreshes
+    LOCATIONS_FULL_RELOAD_INTERVAL = int(os.environ.get('LOCATIONS_FULL_RELOAD_INTERVAL') or 900)  # picks up deleted rows
+    LOCATIONS_GRID_CELL_SIZE = 0.25  # degrees per spatial index cell
+    LOCATIONS_TIMEZONE = os.environ.get('LOCATIONS_TIMEZONE') or 'America/Puerto_Rico'  # opening hours are local time
+    LOCATIONS_CACHE_MAX_AGE = int(os.environ.get('LOCATIONS_CACHE_MAX_AGE') or 60)  # Cache-Control max-age of location reads
+    PRELOAD_DATA = (os.environ.get('PRELOAD_DATA') or 'true').lower() == 'true'  # load the location directory before the first request (gunicorn.conf.py)
+    
+    # Donor Snapshot Configuration
+    DONOR_SNAPSHOT_REFRESH_INTERVAL = int(os.environ.get('DONOR_SNAPSHOT_REFRESH_INTERVAL') or 30)  # seconds between incremental refreshes
+    DONOR_SNAPSHOT_FULL_RELOAD_INTERVAL = int(os.environ.get('DONOR_SNAPSHOT_FULL_RELOAD_INTERVAL') or 3600)  # picks up deleted users
+    
+    # Eligibility Engine Configuration
+    ELIGIBILITY_DONATION_INTERVAL_DAYS = int(os.environ.get('ELIGIBILITY_DONATION_INTERVAL_DAYS') or 56)  # whole blood
+    ELIGIBILITY_MIN_AGE = int(os.environ.get('ELIGIBILITY_MIN_AGE') or 17)
+    ELIGIBILITY_MIN_HEMOGLOBIN_FEMALE = os.environ.get('ELIGIBILITY_MIN_HEMOGLOBIN_FEMALE') or '12.5'  # g/dL
+    ELIGIBILITY_MIN_HEMOGLOBIN_MALE = os.environ.get('ELIGIBILITY_MIN_HEMOGLOBIN_MALE') or '13.0'  # g/dL
+    ELIGIBILITY_HEMOGLOBIN_DEFERRAL_DAYS = int(os.environ.get('ELIGIBILITY_HEMOGLOBIN_DEFERRAL_DAYS') or 30)  # after a low reading
+    ELIGIBILITY_POLL_INTERVAL = int(os.environ.get('ELIGIBILITY_POLL_INTERVAL') or 60)  # seconds between change polls
+    ELIGIBILITY_SWEEP_INTERVAL = int(os.environ.get('ELIGIBILITY_SWEEP_INTERVAL') or 86400)  # safety-net full sweep
+    
+    # Expiry Scheduler Configuration
+    EXPIRY_POLL_INTERVAL = int(os.environ.get('EXPIRY_POLL_INTERVAL') or 60)  # seconds between polls for new units
+    EXPIRY_BATCH_SIZE = int(os.environ.get('EXPIRY_BATCH_SIZE') or 500)  # units expired per transaction
+    
+    # JSON Configuration
+    JSON_FAST_ENCODER = (os.environ.get('JSON_FAST_ENCODER') or 'true').lower() == 'true'  # orjson when installed
+    
+    # Observability Configuration
+    METRICS_ENABLED = (os.environ.get('METRICS_ENABLED') or 'true').lower() == 'true'  # request/query metrics on /metrics
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')  # bearer token scrapers send to /metrics; staff tokens work too
+    LOG_LEVEL = (os.environ.get('LOG_LEVEL') or 'INFO').upper()
+    LOG_DEBUG_SAMPLE_RATE = float(os.environ.get('LOG_DEBUG_SAMPLE_RATE') or 0.1)  # fraction of DEBUG records kept
+    QUERY_PROFILER_ENABLED = (os.environ.get('QUERY_PROFILER_ENABLED') or 'false').lower() == 'true'  # Server-Timing and repeated-query warnings
+    QUERY_PROFILER_THRESHOLD = int(os.environ.get('QUERY_PROFILER_THRESHOLD') or 5)  # same statement, different values (N+1)
+    QUERY_PROFILER_DUPLICATE_THRESHOLD = int(os.environ.get('QUERY_PROFILER_DUPLICATE_THRESHOLD') or 2)  # same statement and values
+    
     # CORS Configuration
     CORS_ORIGINS = ["http://localhost:3000", "http://127.0.0.1:3000"]
     
@@ -44,6 +134,7 @@ class TestingConfig(Config):
     """Testing configuration."""
     TESTING = True
     DEBUG = True
+    BCRYPT_ROUNDS = 4
 
 # Configuration dictionary
 config = {
@@ -0,0 +1,35 @@
+"""Gunicorn settings for the API (run from the backend directory).
+
+    python -m gunicorn -c gunicorn.conf.py
+
+With GUNICORN_PRELOAD=true (the default) the master runs create_app once,
+preloads the shared data (utils/startup.py) and forks the workers from it;
+each worker then only restarts its per-process state and warms its pool
+before accepting requests. GUNICORN_PRELOAD=false builds the app in every
+worker instead, which is what code reloading needs.
+"""
+import os
+
+wsgi_app = 'app:create_app()'
+bind = os.environ.get('GUNICORN_BIND') or f"{os.environ.get('HOST', '0.0.0.0')}:{os.environ.get('PORT', 5000)}"
+workers = int(os.environ.get('GUNICORN_WORKERS') or os.cpu_count() or 1)
+threads = int(os.environ.get('GUNICORN_THREADS') or 8)
+preload_app = (os.environ.get('GUNICORN_PRELOAD') or 'true').lower() == 'true'
+
+
+def when_ready(server):
+    # Master, after the app was loaded and before the first fork
+    if server.cfg.preload_app:
+        from utils.startup import preload
+        preload(server.app.wsgi())
+
+
+def post_fork(server, worker):
+    from utils.startup import startup
+    startup.mark_started()
+
+
+def post_worker_init(worker):
+    # Worker, app loaded, not yet accepting
+    from utils.startup import warm_worker
+    warm_worker(worker.wsgi)
@@ -1,5 +1,13 @@
 """Models package for VitaPink BloodBank."""
 
 from .user import User
+from .user_batch import UserBatch
+from .location import Location
+from .inventory import InventoryService, InsufficientStock
+from .donor_snapshot import DonorSnapshot
+from .donation import Donation
+from .donor_stats import DonorStats
+from .rollups import InventoryRollups
+from .donation_import import DonationImport
 
-__all__ = ['User'] 
\ No newline at end of file
+__all__ = ['User', 'UserBatch', 'Location', 'InventoryService', 'InsufficientStock', 'DonorSnapshot', 'Donation', 'DonorStats', 'InventoryRollups', 'DonationImport'] 
\ No newline at end of file
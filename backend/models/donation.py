@@ -0,0 +1,142 @@
+import base64
+import binascii
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from utils.database import db
+
+# Public field name -> SQL expression; location fields come from the joined page
+DONATION_FIELDS = {
+    'id': 'd.id',
+    'user_id': 'd.user_id',
+    'blood_type': 'd.blood_type',
+    'quantity': 'd.quantity',
+    'donation_date': 'd.donation_date',
+    'status': 'd.status',
+    'location_id': 'd.location_id',
+    'hemoglobin_level': 'd.hemoglobin_level',
+    'blood_pressure_systolic': 'd.blood_pressure_systolic',
+    'blood_pressure_diastolic': 'd.blood_pressure_diastolic',
+    'weight': 'd.weight',
+    'temperature': 'd.temperature',
+    'collection_bag_number': 'd.collection_bag_number',
+    'expiry_date': 'd.expiry_date',
+    'location_name': 'l.name',
+    'location_address': 'l.address'
+}
+LOCATION_FIELDS = ('location_name', 'location_address')
+
+# Same columns as the GetDonationHistory procedure
+DEFAULT_FIELDS = ('id', 'blood_type', 'quantity', 'donation_date', 'status', 'location_name', 'location_address')
+
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor cannot be decoded or does not match the query."""
+    pass
+
+
+def parse_fields(value):
+    """Validate a comma-separated ``fields`` parameter; ``id`` is always included."""
+    if not value:
+        return DEFAULT_FIELDS
+    fields = ['id']
+    for field in value.split(','):
+        field = field.strip()
+        if not field or field in fields:
+            continue
+        if field not in DONATION_FIELDS:
+            raise ValueError(f'Unknown field: {field}')
+        fields.append(field)
+    return tuple(fields)
+
+
+def encode_cursor(row, user_id):
+    """Opaque cursor pointing just after ``row``."""
+    payload = [row['donation_date'].isoformat(), row['id'], user_id]
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, user_id):
+    """Return ``(donation_date, id)`` from a cursor made for the same ``user_id``."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        donation_date, donation_id, cursor_user = json.loads(base64.urlsafe_b64decode(padded))
+        donation_date = datetime.fromisoformat(donation_date)
+        donation_id = int(donation_id)
+    except (binascii.Error, ValueError, TypeError):
+        raise InvalidCursor('Invalid cursor')
+    if cursor_user != user_id:
+        raise InvalidCursor('Cursor does not belong to this query')
+    return donation_date, donation_id
+
+
+def _serialize(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+class Donation:
+    """Donation history queries."""
+
+    @staticmethod
+    def page(user_id=None, after=None, limit=50, fields=DEFAULT_FIELDS):
+        """One page of donations, newest first, and the cursor for the next page.
+
+        Uses keyset pagination on ``(donation_date, id)``: the page starts
+        right after the cursor's position in the index instead of skipping
+        OFFSET rows, so every page costs the same. A donor's history seeks
+        ``idx_donations_user_date`` and the unfiltered staff history
+        ``idx_donations_date_id``. ``locations`` is joined only to the rows
+        of the page.
+        """
+        conditions = []
+        params = []
+        if user_id is not None:
+            conditions.append("user_id = %s")
+            params.append(user_id)
+        if after is not None:
+            donation_date, donation_id = decode_cursor(after, user_id)
+            # The leading range keeps the seek on the index; the OR only breaks ties
+            conditions.append("donation_date <= %s AND (donation_date < %s OR id < %s)")
+            params.extend([donation_date, donation_date, donation_id])
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        with_location = any(field in LOCATION_FIELDS for field in fields)
+        inner = ['id', 'donation_date'] + [
+            field for field in fields
+            if field not in LOCATION_FIELDS and field not in ('id', 'donation_date')
+        ]
+        if with_location and 'location_id' not in inner:
+            inner.append('location_id')
+        page = (
+            f"SELECT {', '.join(inner)} FROM donations {where} "
+            f"ORDER BY donation_date DESC, id DESC LIMIT %s"
+        )
+        params.append(limit + 1)
+
+        selected = [f"{DONATION_FIELDS[field]} AS {field}" for field in fields]
+        if 'donation_date' not in fields:
+            selected.append("d.donation_date AS donation_date")
+        if with_location:
+            query = (
+                f"SELECT {', '.join(selected)} FROM ({page}) d "
+                f"LEFT JOIN locations l ON l.id = d.location_id "
+                f"ORDER BY d.donation_date DESC, d.id DESC"
+            )
+        else:
+            query = f"SELECT {', '.join(selected)} FROM ({page}) d ORDER BY d.donation_date DESC, d.id DESC"
+
+        rows = db.execute_query(query, tuple(params))
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1], user_id)
+
+        donations = [
+            {field: _serialize(row[field]) for field in fields}
+            for row in rows
+        ]
+        return donations, next_cursor
@@ -0,0 +1,370 @@
+import csv
+import logging
+import time
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from utils.database import db
+from models.inventory import BLOOD_TYPES, parse_quantity
+from models.user_cache import user_cache
+
+logger = logging.getLogger(__name__)
+
+DONATION_STATUSES = ('pending', 'completed', 'cancelled')
+
+# Alternative header spellings found in device exports
+HEADER_ALIASES = {
+    'bag_number': 'collection_bag_number',
+    'bag': 'collection_bag_number',
+    'donor_id': 'user_id',
+    'donor_email': 'email',
+    'date': 'donation_date',
+    'collected_at': 'donation_date',
+    'hemoglobin': 'hemoglobin_level',
+    'systolic': 'blood_pressure_systolic',
+    'diastolic': 'blood_pressure_diastolic',
+    'notes': 'processing_notes'
+}
+
+IMPORT_COLUMNS = (
+    'user_id', 'blood_type', 'quantity', 'donation_date', 'location_id', 'status',
+    'hemoglobin_level', 'blood_pressure_systolic', 'blood_pressure_diastolic', 'weight',
+    'temperature', 'collection_bag_number', 'expiry_date', 'processing_notes'
+)
+
+INSERT_QUERY = (
+    f"INSERT INTO donations ({', '.join(IMPORT_COLUMNS)}) "
+    f"VALUES ({', '.join(['%s'] * len(IMPORT_COLUMNS))})"
+)
+
+# Upper bounds of the DECIMAL columns in donations
+DECIMAL_LIMITS = {
+    'hemoglobin_level': (Decimal('99.99'), 2),
+    'weight': (Decimal('999.99'), 2),
+    'temperature': (Decimal('999.9'), 1)
+}
+
+
+def _normalize_header(name):
+    key = (name or '').strip().lower().replace(' ', '_').replace('-', '_')
+    return HEADER_ALIASES.get(key, key)
+
+
+def _text(row, column):
+    value = row.get(column)
+    value = value.strip() if value is not None else ''
+    return value or None
+
+
+def _datetime(value, column):
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f'{column} must be an ISO 8601 date or date and time')
+
+
+def _integer(value, column, minimum, maximum):
+    try:
+        number = int(value)
+    except ValueError:
+        raise ValueError(f'{column} must be an integer')
+    if not minimum <= number <= maximum:
+        raise ValueError(f'{column} must be between {minimum} and {maximum}')
+    return number
+
+
+def _decimal(value, column):
+    maximum, places = DECIMAL_LIMITS[column]
+    try:
+        number = Decimal(value)
+    except InvalidOperation:
+        raise ValueError(f'{column} must be a number')
+    if not number.is_finite() or not 0 < number <= maximum:
+        raise ValueError(f'{column} must be between 0 and {maximum}')
+    return number.quantize(Decimal(1).scaleb(-places))
+
+
+def parse_record(row):
+    """Validate one CSV row against the donations schema.
+
+    Returns ``(record, errors)``; the donor is left as ``user_id`` or
+    ``email`` to be resolved for the whole chunk at once.
+    """
+    record = {}
+    errors = []
+
+    def check(column, parse):
+        value = _text(row, column)
+        if value is None:
+            record[column] = None
+            return
+        try:
+            record[column] = parse(value)
+        except ValueError as e:
+            errors.append(str(e))
+
+    user_id = _text(row, 'user_id')
+    email = _text(row, 'email')
+    if user_id is not None:
+        check('user_id', lambda value: _integer(value, 'user_id', 1, 2 ** 31 - 1))
+    elif email is not None:
+        record['email'] = email.lower()
+    else:
+        errors.append('user_id or email is required')
+
+    blood_type = (_text(row, 'blood_type') or '').upper()
+    if blood_type not in BLOOD_TYPES:
+        errors.append('blood_type must be a valid blood type')
+    record['blood_type'] = blood_type
+
+    try:
+        record['quantity'] = parse_quantity(_text(row, 'quantity'))
+        if record['quantity'] > Decimal('99999999.99'):
+            raise ValueError('Quantity is too large')
+    except ValueError as e:
+        errors.append(str(e))
+
+    status = (_text(row, 'status') or 'completed').lower()
+    if status not in DONATION_STATUSES:
+        errors.append(f"status must be one of: {', '.join(DONATION_STATUSES)}")
+    record['status'] = status
+
+    check('donation_date', lambda value: _datetime(value, 'donation_date'))
+    if record.get('donation_date') is None and not any('donation_date' in error for error in errors):
+        errors.append('donation_date is required')
+    check('expiry_date', lambda value: _datetime(value, 'expiry_date'))
+    check('location_id', lambda value: _integer(value, 'location_id', 1, 2 ** 31 - 1))
+    check('blood_pressure_systolic', lambda value: _integer(value, 'blood_pressure_systolic', 40, 300))
+    check('blood_pressure_diastolic', lambda value: _integer(value, 'blood_pressure_diastolic', 20, 200))
+    for column in DECIMAL_LIMITS:
+        check(column, lambda value, column=column: _decimal(value, column))
+
+    bag = _text(row, 'collection_bag_number')
+    if bag is not None and len(bag) > 50:
+        errors.append('collection_bag_number must be at most 50 characters')
+    record['collection_bag_number'] = bag
+    record['processing_notes'] = _text(row, 'processing_notes')
+    return record, errors
+
+
+class DonationImport:
+    """Streaming import of collection records into ``donations``.
+
+    Rows are read one at a time from a text stream and processed in chunks.
+    Every chunk is one transaction: donor lookups, one ``executemany`` for
+    the rows, one ``blood_inventory`` UPDATE per blood type with the
+    aggregated completed volume, and the donors' last donation date. A chunk
+    that fails at the database is rolled back and reported as a whole;
+    later chunks still run.
+
+    Re-running an upload imports nothing twice: a row is a duplicate when its
+    bag number, or for rows without one its donor and donation date, is
+    already in ``donations`` or earlier in the upload. If the stream turns
+    out not to be valid UTF-8 or CSV part way through, the rows read so far
+    are still imported and the report's ``stopped_after_line`` says where
+    reading stopped.
+    """
+
+    def __init__(self, chunk_size=500, max_errors=1000):
+        self.chunk_size = chunk_size
+        self.max_errors = max_errors
+        self.rows = 0
+        self.imported = 0
+        self.failed = 0
+        self.errors = []
+        self.inventory = {}
+        self.stopped_after_line = None
+        self.stop_reason = None
+        self._bags = set()
+        self._collections = set()
+        self._rejected = set()
+
+    def run(self, text_stream):
+        """Import every row of a CSV text stream and return the report."""
+        started = time.perf_counter()
+        reader = csv.DictReader(text_stream)
+        if reader.fieldnames is None:
+            raise ValueError('The upload is empty')
+        reader.fieldnames = [_normalize_header(name) for name in reader.fieldnames]
+        missing = {'blood_type', 'quantity', 'donation_date'} - set(reader.fieldnames)
+        if not {'user_id', 'email'} & set(reader.fieldnames):
+            missing.add('user_id or email')
+        if missing:
+            raise ValueError(f"Missing columns: {', '.join(sorted(missing))}")
+
+        chunk = []
+        line = reader.line_num
+        try:
+            for row in reader:
+                line = reader.line_num
+                self.rows += 1
+                record, errors = parse_record(row)
+                if errors:
+                    self._fail(line, errors)
+                    continue
+                chunk.append((line, record))
+                if len(chunk) >= self.chunk_size:
+                    self._import_chunk(chunk)
+                    chunk = []
+        except (UnicodeDecodeError, csv.Error) as e:
+            # Nothing past the last complete row was read; the rows up to it still count
+            self.stopped_after_line = line
+            self.stop_reason = f'Invalid CSV: {str(e)}'
+            logger.warning('Donation import stopped', extra={'line': line, 'reason': str(e)})
+        if chunk:
+            self._import_chunk(chunk)
+
+        elapsed = time.perf_counter() - started
+        return {
+            'rows': self.rows,
+            'imported': self.imported,
+            'failed': self.failed,
+            'elapsed_seconds': round(elapsed, 3),
+            'rows_per_second': round(self.rows / elapsed, 1) if elapsed > 0 else None,
+            'inventory_received': {blood_type: float(total) for blood_type, total in sorted(self.inventory.items())},
+            'errors': self.errors,
+            'errors_truncated': self.failed > len(self.errors),
+            'stopped_after_line': self.stopped_after_line,
+            'stop_reason': self.stop_reason
+        }
+
+    def _fail(self, line, errors):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({'line': line, 'errors': errors})
+
+    def _import_chunk(self, chunk):
+        self._rejected = set()
+        try:
+            with db.transaction() as cursor:
+                accepted = self._resolve_donors(cursor, chunk)
+                accepted = self._drop_duplicates(cursor, accepted)
+                if not accepted:
+                    return
+
+                cursor.executemany(
+                    INSERT_QUERY,
+                    [tuple(record[column] for column in IMPORT_COLUMNS) for _, record in accepted]
+                )
+
+                received = {}
+                received_at = {}
+                last_donation = {}
+                for _, record in accepted:
+                    if record['status'] != 'completed':
+                        continue
+                    blood_type = record['blood_type']
+                    received[blood_type] = received.get(blood_type, 0) + record['quantity']
+                    received_at[blood_type] = max(received_at.get(blood_type, record['donation_date']), record['donation_date'])
+                    user_id = record['user_id']
+                    last_donation[user_id] = max(last_donation.get(user_id, record['donation_date']), record['donation_date'])
+
+                # Sorted so that concurrent imports lock inventory rows in the same order
+                for blood_type in sorted(received):
+                    cursor.execute(
+                        "UPDATE blood_inventory SET current_stock = current_stock + %s, "
+                        "units_received_today = units_received_today + %s, "
+                        "last_donation_date = GREATEST(COALESCE(last_donation_date, %s), %s) "
+                        "WHERE blood_type = %s",
+                        (received[blood_type], received[blood_type],
+                         received_at[blood_type], received_at[blood_type], blood_type)
+                    )
+                if last_donation:
+                    cursor.executemany(
+                        "UPDATE users SET last_donation_date = GREATEST(COALESCE(last_donation_date, %s), %s), "
+                        "is_eligible = FALSE WHERE id = %s",
+                        [(moment, moment, user_id) for user_id, moment in sorted(last_donation.items())]
+                    )
+        except Exception as e:
+            logger.exception('Donation import chunk error')
+            for line, _ in chunk:
+                if line not in self._rejected:
+                    self._fail(line, ['Could not be saved; the rows of this chunk were rolled back'])
+            self._bags.difference_update(record['collection_bag_number'] for _, record in chunk)
+            self._collections.difference_update((record['user_id'], record['donation_date']) for _, record in chunk)
+            return
+
+        self.imported += len(accepted)
+        for blood_type, total in received.items():
+            self.inventory[blood_type] = self.inventory.get(blood_type, 0) + total
+        for user_id in last_donation:
+            user_cache.invalidate(user_id)
+
+    def _resolve_donors(self, cursor, chunk):
+        """Fill in ``user_id`` from email and check donors exist and match blood types."""
+        ids = {record['user_id'] for _, record in chunk if record.get('user_id')}
+        emails = {record['email'] for _, record in chunk if record.get('email')}
+        donors = {}
+        by_email = {}
+        if ids:
+            cursor.execute(
+                f"SELECT id, email, blood_type FROM users WHERE id IN ({', '.join(['%s'] * len(ids))})",
+                tuple(ids)
+            )
+            donors.update({row['id']: row for row in cursor.fetchall()})
+        if emails:
+            cursor.execute(
+                f"SELECT id, email, blood_type FROM users WHERE email IN ({', '.join(['%s'] * len(emails))})",
+                tuple(emails)
+            )
+            for row in cursor.fetchall():
+                donors[row['id']] = row
+                by_email[row['email'].lower()] = row['id']
+
+        accepted = []
+        for line, record in chunk:
+            if record.get('email'):
+                record['user_id'] = by_email.get(record.pop('email'))
+            donor = donors.get(record['user_id'])
+            if donor is None:
+                self._reject(line, ['Donor not found'])
+            elif donor['blood_type'] and donor['blood_type'] != record['blood_type']:
+                self._reject(line, [f"blood_type {record['blood_type']} does not match the donor's {donor['blood_type']}"])
+            else:
+                accepted.append((line, record))
+        return accepted
+
+    def _drop_duplicates(self, cursor, accepted):
+        """Reject donations seen earlier in the upload or already in donations.
+
+        Rows with a bag number are matched on it; rows without one on the
+        donor and donation date (``idx_donations_user_date``), as a donor
+        gives one donation at a time.
+        """
+        bags = {record['collection_bag_number'] for _, record in accepted if record['collection_bag_number']}
+        collections = {
+            (record['user_id'], record['donation_date'])
+            for _, record in accepted if not record['collection_bag_number']
+        }
+        existing = set()
+        if bags:
+            cursor.execute(
+                f"SELECT collection_bag_number FROM donations "
+                f"WHERE collection_bag_number IN ({', '.join(['%s'] * len(bags))})",
+                tuple(bags)
+            )
+            existing = {row['collection_bag_number'] for row in cursor.fetchall()}
+        if collections:
+            cursor.execute(
+                f"SELECT user_id, donation_date FROM donations "
+                f"WHERE (user_id, donation_date) IN ({', '.join(['(%s, %s)'] * len(collections))})",
+                tuple(value for collection in collections for value in collection)
+            )
+            existing.update((row['user_id'], row['donation_date']) for row in cursor.fetchall())
+
+        kept = []
+        for line, record in accepted:
+            bag = record['collection_bag_number']
+            key = bag or (record['user_id'], record['donation_date'])
+            what = f'Bag {bag}' if bag else f"Donation of donor {record['user_id']} on {record['donation_date']}"
+            if key in existing:
+                self._reject(line, [f'{what} has already been imported'])
+            elif key in (self._bags if bag else self._collections):
+                self._reject(line, [f'{what} appears more than once in this upload'])
+            else:
+                (self._bags if bag else self._collections).add(key)
+                kept.append((line, record))
+        return kept
+
+    def _reject(self, line, errors):
+        self._rejected.add(line)
+        self._fail(line, errors)
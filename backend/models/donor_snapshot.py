@@ -0,0 +1,302 @@
+import threading
+import time
+from datetime import date, datetime
+import numpy as np
+from models.inventory import BLOOD_TYPES
+from utils.database import db
+
+# Donor blood types each recipient can receive red cells from
+COMPATIBLE_DONORS = {
+    'O-': ('O-',),
+    'O+': ('O+', 'O-'),
+    'A-': ('A-', 'O-'),
+    'A+': ('A+', 'A-', 'O+', 'O-'),
+    'B-': ('B-', 'O-'),
+    'B+': ('B+', 'B-', 'O+', 'O-'),
+    'AB-': ('AB-', 'A-', 'B-', 'O-'),
+    'AB+': BLOOD_TYPES
+}
+
+TYPE_BITS = {blood_type: 1 << index for index, blood_type in enumerate(BLOOD_TYPES)}
+
+FLAG_ACTIVE = 1
+FLAG_ELIGIBLE = 2
+FLAG_DONOR = 4
+FLAGS_CALLABLE = FLAG_ACTIVE | FLAG_ELIGIBLE | FLAG_DONOR
+
+# Donors who never donated sort as if their last donation was this long ago
+NEVER_DONATED = np.iinfo(np.int32).min
+
+SNAPSHOT_COLUMNS = "id, blood_type, role, is_active, is_eligible, city, last_donation_date, updated_at"
+DONOR_COLUMNS = (
+    "id, first_name, last_name, email, phone_number, blood_type, city, state, "
+    "last_donation_date"
+)
+LOAD_CHUNK_SIZE = 50000
+
+SNAPSHOT_STATE = (
+    '_size', '_ids', '_types', '_flags', '_last_donation', '_cities',
+    '_positions', '_city_codes', '_order', '_city_counts', '_high_water'
+)
+
+# Cities holding less than 1/SMALL_CITY_RATIO of the donors are looked up directly
+SMALL_CITY_RATIO = 20
+
+
+def recipient_mask(recipient):
+    """8-bit mask of donor blood types compatible with ``recipient``."""
+    mask = 0
+    for blood_type in COMPATIBLE_DONORS[recipient]:
+        mask |= TYPE_BITS[blood_type]
+    return mask
+
+
+def _day_number(value):
+    if value is None:
+        return NEVER_DONATED
+    if isinstance(value, datetime):
+        value = value.date()
+    return value.toordinal() if isinstance(value, date) else NEVER_DONATED
+
+
+class DonorSnapshot:
+    """Columnar in-memory copy of the donor columns of ``users``.
+
+    Each donor is one position in a set of NumPy arrays: id, blood type as a
+    one-hot 8-bit mask, status flags, day number of the last donation and an
+    integer city code. The positions are also kept sorted by last donation,
+    so finding compatible donors is a few vector comparisons over a prefix of
+    that order rather than a multi-join SQL scan.
+
+    The snapshot loads on first use, applies rows changed since the last
+    ``updated_at`` high-water mark every ``refresh_interval`` seconds, and
+    reloads completely every ``full_reload_interval`` seconds to drop deleted
+    users.
+    """
+
+    def __init__(self):
+        self.refresh_interval = 30
+        self.full_reload_interval = 3600
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._reset()
+
+    def init_app(self, app):
+        """Configure refresh intervals."""
+        self.refresh_interval = app.config['DONOR_SNAPSHOT_REFRESH_INTERVAL']
+        self.full_reload_interval = app.config['DONOR_SNAPSHOT_FULL_RELOAD_INTERVAL']
+        with self._lock:
+            self._reset()
+
+    def _reset(self, capacity=1024):
+        self._size = 0
+        self._ids = np.zeros(capacity, dtype=np.int32)
+        self._types = np.zeros(capacity, dtype=np.uint8)
+        self._flags = np.zeros(capacity, dtype=np.uint8)
+        self._last_donation = np.full(capacity, NEVER_DONATED, dtype=np.int32)
+        self._cities = np.zeros(capacity, dtype=np.int32)
+        self._positions = {}
+        self._city_codes = {}
+        self._order = self._ids[:0]
+        self._city_counts = np.zeros(1, dtype=np.int64)
+        self._high_water = None
+        self._loaded_at = None
+        self._refreshed_at = None
+
+    def __len__(self):
+        return self._size
+
+    def load(self):
+        """Rebuild the snapshot from the users table, reading it in id order chunks.
+
+        The new copy is built on the side and swapped in at the end, so
+        queries keep being answered from the previous one meanwhile.
+        """
+        staging = DonorSnapshot()
+        last_id = 0
+        while True:
+            chunk = db.execute_query(
+                f"SELECT {SNAPSHOT_COLUMNS} FROM users WHERE id > %s ORDER BY id LIMIT %s",
+                (last_id, LOAD_CHUNK_SIZE)
+            )
+            staging._apply(chunk)
+            if len(chunk) < LOAD_CHUNK_SIZE:
+                break
+            last_id = chunk[-1]['id']
+        staging._sort()
+
+        with self._lock:
+            for name in SNAPSHOT_STATE:
+                setattr(self, name, getattr(staging, name))
+            self._loaded_at = self._refreshed_at = time.monotonic()
+
+    def refresh(self):
+        """Apply users changed since the last load or refresh."""
+        if self._high_water is None:
+            return self.load()
+        rows = db.execute_query(
+            f"SELECT {SNAPSHOT_COLUMNS} FROM users WHERE updated_at >= %s",
+            (self._high_water,)
+        )
+        with self._lock:
+            if rows:
+                self._apply(rows)
+                self._sort()
+            self._refreshed_at = time.monotonic()
+
+    def ensure_fresh(self):
+        """Load or refresh the snapshot if it is due."""
+        if self._loaded_at is None:
+            with self._refresh_lock:
+                if self._loaded_at is None:
+                    self.load()
+            return
+
+        now = time.monotonic()
+        full = now - self._loaded_at >= self.full_reload_interval
+        if not full and now - self._refreshed_at < self.refresh_interval:
+            return
+        if not self._refresh_lock.acquire(blocking=False):
+            return
+        try:
+            if full:
+                self.load()
+            else:
+                self.refresh()
+        finally:
+            self._refresh_lock.release()
+
+    def _apply(self, rows):
+        """Insert or overwrite rows (lock held)."""
+        for row in rows:
+            position = self._positions.get(row['id'])
+            if position is None:
+                position = self._size
+                if position == len(self._ids):
+                    self._grow()
+                self._positions[row['id']] = position
+                self._size += 1
+
+            flags = 0
+            if row['is_active']:
+                flags |= FLAG_ACTIVE
+            if row['is_eligible']:
+                flags |= FLAG_ELIGIBLE
+            if row['role'] == 'donor':
+                flags |= FLAG_DONOR
+
+            self._ids[position] = row['id']
+            self._types[position] = TYPE_BITS.get(row['blood_type'], 0)
+            self._flags[position] = flags
+            self._last_donation[position] = _day_number(row['last_donation_date'])
+            self._cities[position] = self._city_code(row['city'])
+
+            updated_at = row['updated_at']
+            if updated_at is not None and (self._high_water is None or updated_at > self._high_water):
+                self._high_water = updated_at
+
+    def _sort(self):
+        """Recompute the positions ordered by last donation, oldest first (lock held)."""
+        self._order = np.argsort(self._last_donation[:self._size], kind='stable').astype(np.int32)
+        self._city_counts = np.bincount(self._cities[:self._size], minlength=len(self._city_codes) + 1)
+
+    def _grow(self):
+        capacity = len(self._ids) * 2
+        for name in ('_ids', '_types', '_flags', '_last_donation', '_cities'):
+            old = getattr(self, name)
+            fill = NEVER_DONATED if name == '_last_donation' else 0
+            new = np.full(capacity, fill, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def _city_code(self, city):
+        """Stable small integer for a city name; 0 means unknown."""
+        if not city:
+            return 0
+        key = city.strip().lower()
+        code = self._city_codes.get(key)
+        if code is None:
+            code = len(self._city_codes) + 1
+            self._city_codes[key] = code
+        return code
+
+    def compatible(self, recipient, city=None, limit=50):
+        """Ids of callable donors compatible with ``recipient``, best first.
+
+        Donors in ``city`` come first; within each group, the donors whose last
+        donation is longest ago (or who never donated) come first.
+        """
+        self.ensure_fresh()
+        mask_bits = recipient_mask(recipient)
+
+        with self._lock:
+            code = self._city_codes.get(city.strip().lower()) if city else None
+            if code is None:
+                positions = self._scan(mask_bits, limit)
+            elif self._city_counts[code] * SMALL_CITY_RATIO < self._size:
+                # Few donors live there: select them directly, then fill from the rest
+                local = np.flatnonzero(self._cities[:self._size] == code)
+                local = self._callable(local, mask_bits)
+                local = local[np.argsort(self._last_donation[local], kind='stable')][:limit]
+                rest = self._scan(mask_bits, limit - len(local), exclude_city=code)
+                positions = np.concatenate((local, rest))
+            else:
+                positions = self._scan(mask_bits, limit, city=code)
+            return self._ids[positions].tolist()
+
+    def _callable(self, positions, mask_bits):
+        """Keep the positions of callable donors whose type matches ``mask_bits``."""
+        positions = positions[(self._types[positions] & mask_bits) != 0]
+        return positions[(self._flags[positions] & FLAGS_CALLABLE) == FLAGS_CALLABLE]
+
+    def _scan(self, mask_bits, limit, city=None, exclude_city=None):
+        """Walk the last-donation order until ``limit`` matches are found (lock held).
+
+        Chunks double in size, so a query usually stops after the first few
+        thousand rows instead of filtering and sorting the whole snapshot.
+        With ``city``, its donors are preferred and the others only fill up.
+        """
+        order = self._order
+        preferred = []
+        others = []
+        found = 0
+        spare = 0
+        start = 0
+        step = max(4096, limit * 16)
+        while start < len(order) and found < limit:
+            chunk = self._callable(order[start:start + step], mask_bits)
+            if exclude_city is not None:
+                chunk = chunk[self._cities[chunk] != exclude_city]
+            if city is None:
+                preferred.append(chunk)
+                found += len(chunk)
+            else:
+                local = self._cities[chunk] == city
+                preferred.append(chunk[local])
+                found += int(local.sum())
+                if spare < limit:
+                    others.append(chunk[~local])
+                    spare += len(others[-1])
+            start += step
+            step *= 2
+
+        if not preferred:
+            return order[:0]
+        return np.concatenate(preferred + others)[:limit]
+
+    @staticmethod
+    def contact_details(ids):
+        """Contact rows for ``ids`` in one query, keeping the order of ``ids``."""
+        if not ids:
+            return []
+        placeholders = ', '.join(['%s'] * len(ids))
+        rows = db.execute_query(
+            f"SELECT {DONOR_COLUMNS} FROM users WHERE id IN ({placeholders})",
+            tuple(ids)
+        )
+        by_id = {row['id']: row for row in rows}
+        return [by_id[donor_id] for donor_id in ids if donor_id in by_id]
+
+
+# Global donor snapshot instance
+donor_snapshot = DonorSnapshot()
@@ -0,0 +1,99 @@
+from decimal import Decimal
+from utils.database import db
+
+USER_RANGE_SIZE = 1000
+
+# Totals recomputed from donations for a range of user ids
+AGGREGATE_QUERY = """
+    SELECT user_id, COUNT(*) AS total_donations,
+        SUM(CASE WHEN status = 'completed' THEN quantity ELSE 0 END) AS total_volume_donated,
+        MAX(donation_date) AS last_donation_date_actual
+    FROM donations
+    WHERE user_id > %s AND user_id <= %s
+    GROUP BY user_id
+"""
+
+TOTAL_COLUMNS = ('total_donations', 'total_volume_donated', 'last_donation_date_actual')
+
+
+class DonorStats:
+    """Per-donor totals kept in ``donor_stats_totals``.
+
+    The donations triggers maintain the totals on every insert, status
+    change and delete, so reading a donor's statistics is a primary-key
+    lookup instead of a GROUP BY over their donations. ``backfill`` and
+    ``check`` recompute the totals from scratch for setup and auditing.
+    """
+
+    @staticmethod
+    def get(user_id):
+        """Statistics row of one donor from the donor_stats view, or None."""
+        return db.execute_single("SELECT * FROM donor_stats WHERE id = %s", (user_id,))
+
+    @staticmethod
+    def _ranges():
+        row = db.execute_single("SELECT MAX(id) AS max_id FROM users")
+        max_id = row['max_id'] or 0
+        for start in range(0, max_id, USER_RANGE_SIZE):
+            yield start, start + USER_RANGE_SIZE
+
+    @classmethod
+    def backfill(cls):
+        """Recompute every donor's totals; returns the number of donors written."""
+        written = 0
+        for start, end in cls._ranges():
+            with db.transaction() as cursor:
+                cursor.execute(AGGREGATE_QUERY, (start, end))
+                rows = cursor.fetchall()
+                if rows:
+                    cursor.executemany(
+                        "INSERT INTO donor_stats_totals "
+                        "(user_id, total_donations, total_volume_donated, last_donation_date_actual) "
+                        "VALUES (%s, %s, %s, %s) "
+                        "ON DUPLICATE KEY UPDATE total_donations = VALUES(total_donations), "
+                        "total_volume_donated = VALUES(total_volume_donated), "
+                        "last_donation_date_actual = VALUES(last_donation_date_actual)",
+                        [(row['user_id'],) + tuple(row[column] for column in TOTAL_COLUMNS) for row in rows]
+                    )
+                # Donors whose donations are all gone
+                cursor.execute(
+                    "UPDATE donor_stats_totals SET total_donations = 0, total_volume_donated = 0, "
+                    "last_donation_date_actual = NULL "
+                    "WHERE user_id > %s AND user_id <= %s AND total_donations != 0 "
+                    "AND NOT EXISTS (SELECT 1 FROM donations d WHERE d.user_id = donor_stats_totals.user_id)",
+                    (start, end)
+                )
+            written += len(rows)
+        return written
+
+    @classmethod
+    def check(cls):
+        """Compare the stored totals with donations; returns a list of mismatches."""
+        empty = {'total_donations': 0, 'total_volume_donated': Decimal('0'), 'last_donation_date_actual': None}
+        mismatches = []
+        for start, end in cls._ranges():
+            actual = {row['user_id']: row for row in db.execute_query(AGGREGATE_QUERY, (start, end))}
+            stored = {
+                row['user_id']: row for row in db.execute_query(
+                    "SELECT user_id, total_donations, total_volume_donated, last_donation_date_actual "
+                    "FROM donor_stats_totals WHERE user_id > %s AND user_id <= %s",
+                    (start, end)
+                )
+            }
+            for user_id in sorted(actual.keys() | stored.keys()):
+                expected = actual.get(user_id, empty)
+                found = stored.get(user_id, empty)
+                differences = {
+                    column: {'expected': expected[column], 'stored': found[column]}
+                    for column in TOTAL_COLUMNS
+                    if not cls._same(expected[column], found[column])
+                }
+                if differences:
+                    mismatches.append({'user_id': user_id, 'differences': differences})
+        return mismatches
+
+    @staticmethod
+    def _same(expected, stored):
+        if isinstance(expected, (int, float, Decimal)) and isinstance(stored, (int, float, Decimal)):
+            return Decimal(str(expected)) == Decimal(str(stored))
+        return expected == stored
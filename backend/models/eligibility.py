@@ -0,0 +1,274 @@
+import heapq
+import threading
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from utils.database import db
+from models.user_cache import user_cache
+
+LOAD_CHUNK_SIZE = 5000
+UPDATE_BATCH_SIZE = 500
+
+# High-water mark used when a table is still empty
+EPOCH = datetime(1970, 1, 1)
+
+# Everything the deferral rules need, one row per donor
+DONOR_RULES_QUERY = """
+    SELECT u.id, u.birth_date, u.gender, u.is_eligible, u.last_donation_date,
+        (SELECT MAX(d.donation_date) FROM donations d
+         WHERE d.user_id = u.id AND d.status = 'completed') AS last_completed_donation,
+        (SELECT d.hemoglobin_level FROM donations d
+         WHERE d.user_id = u.id AND d.hemoglobin_level IS NOT NULL
+         ORDER BY d.donation_date DESC, d.id DESC LIMIT 1) AS hemoglobin_level,
+        (SELECT d.donation_date FROM donations d
+         WHERE d.user_id = u.id AND d.hemoglobin_level IS NOT NULL
+         ORDER BY d.donation_date DESC, d.id DESC LIMIT 1) AS hemoglobin_date
+    FROM users u
+    WHERE u.role = 'donor' AND {condition}
+"""
+
+
+def _as_datetime(value):
+    if value is None or isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    return datetime.fromisoformat(str(value))
+
+
+def _add_years(day, years):
+    try:
+        return day.replace(year=day.year + years)
+    except ValueError:
+        # Born on February 29th
+        return day.replace(year=day.year + years, month=3, day=1)
+
+
+class DeferralRules:
+    """When a donor may give blood again.
+
+    A donor is deferred until every rule is satisfied: enough time since the
+    last completed donation, old enough, and, if the most recent hemoglobin
+    reading was too low, enough time since that reading.
+    """
+
+    def __init__(self, interval_days=56, min_age=17, min_hemoglobin_female=Decimal('12.5'),
+                 min_hemoglobin_male=Decimal('13.0'), hemoglobin_deferral_days=30):
+        self.interval = timedelta(days=interval_days)
+        self.min_age = min_age
+        self.min_hemoglobin = {
+            'Female': Decimal(str(min_hemoglobin_female)),
+            'Male': Decimal(str(min_hemoglobin_male))
+        }
+        self.hemoglobin_deferral = timedelta(days=hemoglobin_deferral_days)
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            interval_days=config['ELIGIBILITY_DONATION_INTERVAL_DAYS'],
+            min_age=config['ELIGIBILITY_MIN_AGE'],
+            min_hemoglobin_female=config['ELIGIBILITY_MIN_HEMOGLOBIN_FEMALE'],
+            min_hemoglobin_male=config['ELIGIBILITY_MIN_HEMOGLOBIN_MALE'],
+            hemoglobin_deferral_days=config['ELIGIBILITY_HEMOGLOBIN_DEFERRAL_DAYS']
+        )
+
+    def eligible_at(self, donor):
+        """Moment the donor becomes eligible, or None if no rule defers them."""
+        moments = []
+
+        last_donations = [
+            _as_datetime(donor.get(column))
+            for column in ('last_completed_donation', 'last_donation_date')
+        ]
+        last_donations = [moment for moment in last_donations if moment is not None]
+        if last_donations:
+            moments.append(max(last_donations) + self.interval)
+
+        birth_date = _as_datetime(donor.get('birth_date'))
+        if birth_date is not None:
+            moments.append(_add_years(birth_date, self.min_age))
+
+        hemoglobin = donor.get('hemoglobin_level')
+        hemoglobin_date = _as_datetime(donor.get('hemoglobin_date'))
+        if hemoglobin is not None and hemoglobin_date is not None:
+            # Unknown gender falls back to the lower of the two thresholds
+            threshold = self.min_hemoglobin.get(donor.get('gender'), min(self.min_hemoglobin.values()))
+            if Decimal(str(hemoglobin)) < threshold:
+                moments.append(hemoglobin_date + self.hemoglobin_deferral)
+
+        return max(moments) if moments else None
+
+
+class EligibilityEngine:
+    """Keeps ``users.is_eligible`` in line with the deferral rules.
+
+    A full sweep evaluates every donor once. After that only changes are
+    followed: users and donations modified since the last poll are
+    re-evaluated, and deferred donors wait in a min-heap keyed by the moment
+    they become eligible. Each tick pops the donors whose time has come and
+    flips them with batched UPDATEs, so the work is proportional to what
+    changed rather than to the size of the table.
+    """
+
+    def __init__(self):
+        self.rules = DeferralRules()
+        self.poll_interval = 60
+        self.sweep_interval = 86400
+        self._heap = []
+        self._scheduled = {}
+        self._users_high_water = None
+        self._donations_high_water = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """Read the deferral rules and intervals from the app config."""
+        self.rules = DeferralRules.from_config(app.config)
+        self.poll_interval = app.config['ELIGIBILITY_POLL_INTERVAL']
+        self.sweep_interval = app.config['ELIGIBILITY_SWEEP_INTERVAL']
+
+    def sweep(self, now=None):
+        """Evaluate every donor and rebuild the schedule; returns counters."""
+        now = now or datetime.now()
+        with self._lock:
+            # Taken first so that changes made during the sweep are seen by the next poll
+            users_mark = db.execute_single("SELECT MAX(updated_at) AS mark FROM users")['mark']
+            donations_mark = db.execute_single("SELECT MAX(updated_at) AS mark FROM donations")['mark']
+
+            self._heap = []
+            self._scheduled = {}
+            result = {'checked': 0, 'made_eligible': 0, 'made_ineligible': 0}
+            last_id = 0
+            while True:
+                donors = db.execute_query(
+                    DONOR_RULES_QUERY.format(condition='u.id > %s') + " ORDER BY u.id LIMIT %s",
+                    (last_id, LOAD_CHUNK_SIZE)
+                )
+                self._merge(result, self._evaluate(donors, now))
+                if len(donors) < LOAD_CHUNK_SIZE:
+                    break
+                last_id = donors[-1]['id']
+
+            self._users_high_water = users_mark or EPOCH
+            self._donations_high_water = donations_mark or EPOCH
+            return result
+
+    def poll(self, now=None):
+        """Re-evaluate donors whose user row or donations changed since the last poll."""
+        if self._users_high_water is None:
+            return self.sweep(now)
+        now = now or datetime.now()
+        with self._lock:
+            rows = db.execute_query(
+                "SELECT id, updated_at FROM users WHERE role = 'donor' AND updated_at >= %s",
+                (self._users_high_water,)
+            )
+            user_ids = {row['id'] for row in rows}
+            self._users_high_water = max([self._users_high_water] + [row['updated_at'] for row in rows])
+
+            rows = db.execute_query(
+                "SELECT user_id, updated_at FROM donations WHERE updated_at >= %s",
+                (self._donations_high_water,)
+            )
+            user_ids.update(row['user_id'] for row in rows)
+            self._donations_high_water = max([self._donations_high_water] + [row['updated_at'] for row in rows])
+
+            result = {'checked': 0, 'made_eligible': 0, 'made_ineligible': 0}
+            user_ids = sorted(user_ids)
+            for start in range(0, len(user_ids), UPDATE_BATCH_SIZE):
+                batch = user_ids[start:start + UPDATE_BATCH_SIZE]
+                placeholders = ', '.join(['%s'] * len(batch))
+                donors = db.execute_query(
+                    DONOR_RULES_QUERY.format(condition=f'u.id IN ({placeholders})'),
+                    tuple(batch)
+                )
+                self._merge(result, self._evaluate(donors, now))
+            return result
+
+    def release_due(self, now=None):
+        """Make eligible every scheduled donor whose deferral has ended; returns the count."""
+        now = now or datetime.now()
+        with self._lock:
+            due = []
+            while self._heap and self._heap[0][0] <= now:
+                eligible_at, user_id = heapq.heappop(self._heap)
+                # Entries replaced by a later evaluation are skipped
+                if self._scheduled.get(user_id) == eligible_at:
+                    del self._scheduled[user_id]
+                    due.append(user_id)
+            # A donation completed since the last poll keeps the donor deferred
+            cutoff = now - self.rules.interval
+            return self._set_eligible(due, True, recent_donation_cutoff=cutoff)
+
+    def next_due(self):
+        """Earliest scheduled eligibility moment, or None."""
+        with self._lock:
+            return self._heap[0][0] if self._heap else None
+
+    def run(self, stop=None):
+        """Sweep, then follow changes and release deferrals until ``stop`` is set."""
+        stop = stop or threading.Event()
+        self.sweep()
+        last_sweep = time.monotonic()
+        while not stop.is_set():
+            if time.monotonic() - last_sweep >= self.sweep_interval:
+                self.sweep()
+                last_sweep = time.monotonic()
+            else:
+                self.poll()
+            self.release_due()
+
+            wait = self.poll_interval
+            next_due = self.next_due()
+            if next_due is not None:
+                wait = min(wait, max(0.0, (next_due - datetime.now()).total_seconds()))
+            stop.wait(wait)
+
+    def _evaluate(self, donors, now):
+        """Apply the rules to donor rows and fix the ones whose flag is wrong (lock held)."""
+        to_eligible = []
+        to_ineligible = []
+        for donor in donors:
+            eligible_at = self.rules.eligible_at(donor)
+            eligible = eligible_at is None or eligible_at <= now
+            if eligible:
+                self._scheduled.pop(donor['id'], None)
+                if not donor['is_eligible']:
+                    to_eligible.append(donor['id'])
+            else:
+                if self._scheduled.get(donor['id']) != eligible_at:
+                    self._scheduled[donor['id']] = eligible_at
+                    heapq.heappush(self._heap, (eligible_at, donor['id']))
+                if donor['is_eligible']:
+                    to_ineligible.append(donor['id'])
+
+        return {
+            'checked': len(donors),
+            'made_eligible': self._set_eligible(to_eligible, True),
+            'made_ineligible': self._set_eligible(to_ineligible, False)
+        }
+
+    @staticmethod
+    def _set_eligible(user_ids, eligible, recent_donation_cutoff=None):
+        """Batched UPDATE of ``is_eligible``; returns the number of rows changed."""
+        changed = 0
+        for start in range(0, len(user_ids), UPDATE_BATCH_SIZE):
+            batch = user_ids[start:start + UPDATE_BATCH_SIZE]
+            placeholders = ', '.join(['%s'] * len(batch))
+            query = f"UPDATE users SET is_eligible = %s WHERE id IN ({placeholders}) AND is_eligible != %s"
+            params = [eligible, *batch, eligible]
+            if recent_donation_cutoff is not None:
+                query += " AND (last_donation_date IS NULL OR last_donation_date <= %s)"
+                params.append(recent_donation_cutoff)
+            changed += db.execute_update(query, tuple(params))
+            for user_id in batch:
+                user_cache.invalidate(user_id)
+        return changed
+
+    @staticmethod
+    def _merge(total, result):
+        for key, value in result.items():
+            total[key] += value
+
+
+# Global eligibility engine instance
+eligibility_engine = EligibilityEngine()
@@ -0,0 +1,244 @@
+import heapq
+import threading
+from datetime import datetime
+from utils.database import db
+
+LOAD_CHUNK_SIZE = 5000
+
+# High-water mark used when the table is still empty
+EPOCH = datetime(1970, 1, 1)
+
+# A unit is in stock while it is completed, not dispensed and not expired
+IN_STOCK = "status = 'completed' AND dispensed_at IS NULL AND expired_at IS NULL"
+
+# The rest of an opened bag leaves the bank with it, but only out of unreserved stock
+OPENED_BAG_UPDATE = (
+    "UPDATE blood_inventory SET current_stock = current_stock - %(q)s, "
+    "units_dispensed_today = units_dispensed_today + %(q)s "
+    "WHERE blood_type = %(t)s AND current_stock - reserved_stock >= %(q)s"
+)
+
+
+class UnitShortage(Exception):
+    """Raised when the units in stock cannot cover volume taken from ``current_stock``."""
+    pass
+
+
+class LeftoverReserved(Exception):
+    """Raised when the rest of an opened bag would have to come out of reserved stock."""
+    pass
+
+
+class ExpiryScheduler:
+    """Moves expired units out of ``current_stock``.
+
+    Units in stock wait in a min-heap keyed by ``expiry_date``. The scheduler
+    sleeps until the earliest expiry (or the next poll for new units), pops
+    every unit that is due and expires them in batched transactions: the
+    units are marked ``expired_at`` and their volume moves from
+    ``current_stock`` to ``expired_stock`` with one UPDATE per blood type.
+    Units dispensed or cancelled meanwhile are dropped when their change is
+    polled and are skipped by the conditional UPDATE in any case, so no scan
+    of ``donations`` is ever needed after the initial load.
+    """
+
+    def __init__(self):
+        self.poll_interval = 60
+        self.batch_size = 500
+        self._heap = []
+        self._scheduled = {}
+        self._high_water = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """Read the intervals from the app config."""
+        self.poll_interval = app.config['EXPIRY_POLL_INTERVAL']
+        self.batch_size = app.config['EXPIRY_BATCH_SIZE']
+
+    def load(self):
+        """Schedule every unit in stock; returns the number of units scheduled."""
+        with self._lock:
+            # Taken first so that changes made during the load are seen by the next poll
+            mark = db.execute_single("SELECT MAX(updated_at) AS mark FROM donations")['mark']
+
+            self._heap = []
+            self._scheduled = {}
+            last_id = 0
+            while True:
+                units = db.execute_query(
+                    f"SELECT id, expiry_date FROM donations "
+                    f"WHERE id > %s AND {IN_STOCK} AND expiry_date IS NOT NULL "
+                    f"ORDER BY id LIMIT %s",
+                    (last_id, LOAD_CHUNK_SIZE)
+                )
+                for unit in units:
+                    self._scheduled[unit['id']] = unit['expiry_date']
+                    self._heap.append((unit['expiry_date'], unit['id']))
+                if len(units) < LOAD_CHUNK_SIZE:
+                    break
+                last_id = units[-1]['id']
+            heapq.heapify(self._heap)
+
+            self._high_water = mark or EPOCH
+            return len(self._scheduled)
+
+    def poll(self):
+        """Follow donations changed since the last poll; returns units (re)scheduled."""
+        if self._high_water is None:
+            return self.load()
+        with self._lock:
+            rows = db.execute_query(
+                "SELECT id, status, expiry_date, dispensed_at, expired_at, updated_at "
+                "FROM donations WHERE updated_at >= %s",
+                (self._high_water,)
+            )
+            scheduled = 0
+            for row in rows:
+                in_stock = (row['status'] == 'completed' and row['dispensed_at'] is None
+                            and row['expired_at'] is None and row['expiry_date'] is not None)
+                if not in_stock:
+                    # Its heap entry is skipped when popped
+                    self._scheduled.pop(row['id'], None)
+                elif self._scheduled.get(row['id']) != row['expiry_date']:
+                    self._scheduled[row['id']] = row['expiry_date']
+                    heapq.heappush(self._heap, (row['expiry_date'], row['id']))
+                    scheduled += 1
+            self._high_water = max([self._high_water] + [row['updated_at'] for row in rows])
+            return scheduled
+
+    def expire_due(self, now=None):
+        """Expire every scheduled unit past its expiry date; returns counters."""
+        now = now or datetime.now()
+        with self._lock:
+            due = []
+            while self._heap and self._heap[0][0] <= now:
+                expiry_date, unit_id = heapq.heappop(self._heap)
+                # Entries replaced or dropped by a later poll are skipped
+                if self._scheduled.get(unit_id) == expiry_date:
+                    del self._scheduled[unit_id]
+                    due.append(unit_id)
+
+        result = {'expired': 0, 'volume': {}}
+        for start in range(0, len(due), self.batch_size):
+            expired, volume = self._expire_batch(due[start:start + self.batch_size], now)
+            result['expired'] += expired
+            for blood_type, total in volume.items():
+                result['volume'][blood_type] = result['volume'].get(blood_type, 0) + float(total)
+        return result
+
+    def next_due(self):
+        """Earliest scheduled expiry, or None."""
+        with self._lock:
+            while self._heap and self._scheduled.get(self._heap[0][1]) != self._heap[0][0]:
+                heapq.heappop(self._heap)
+            return self._heap[0][0] if self._heap else None
+
+    def run(self, stop=None):
+        """Load, then follow changes and expire units on time until ``stop`` is set."""
+        stop = stop or threading.Event()
+        self.load()
+        while not stop.is_set():
+            self.poll()
+            self.expire_due()
+
+            wait = self.poll_interval
+            next_due = self.next_due()
+            if next_due is not None:
+                wait = min(wait, max(0.0, (next_due - datetime.now()).total_seconds()))
+            stop.wait(wait)
+
+    @staticmethod
+    def _expire_batch(unit_ids, now):
+        """Expire one batch of units in a transaction; returns ``(count, volume by blood type)``."""
+        placeholders = ', '.join(['%s'] * len(unit_ids))
+        with db.transaction() as cursor:
+            # Locked and re-checked: a unit dispensed since it was scheduled stays dispensed
+            cursor.execute(
+                f"SELECT id, blood_type, quantity FROM donations "
+                f"WHERE id IN ({placeholders}) AND {IN_STOCK} AND expiry_date <= %s FOR UPDATE",
+                (*unit_ids, now)
+            )
+            units = cursor.fetchall()
+            if not units:
+                return 0, {}
+
+            cursor.execute(
+                f"UPDATE donations SET expired_at = %s WHERE id IN ({', '.join(['%s'] * len(units))})",
+                (now, *[unit['id'] for unit in units])
+            )
+            volume = {}
+            for unit in units:
+                volume[unit['blood_type']] = volume.get(unit['blood_type'], 0) + unit['quantity']
+
+            # Sorted so that concurrent writers lock inventory rows in the same order.
+            # Reservations are capped to what is left so the stock constraint holds.
+            for blood_type in sorted(volume):
+                cursor.execute(
+                    "UPDATE blood_inventory SET "
+                    "reserved_stock = LEAST(reserved_stock, GREATEST(current_stock - %(q)s, 0)), "
+                    "current_stock = GREATEST(current_stock - %(q)s, 0), "
+                    "expired_stock = expired_stock + %(q)s "
+                    "WHERE blood_type = %(t)s",
+                    {'q': volume[blood_type], 't': blood_type}
+                )
+        return len(units), volume
+
+
+def pick_units(cursor, blood_type, quantity, now):
+    """Mark units dispensed first-expiring-first-out until ``quantity`` is covered.
+
+    Runs inside the caller's transaction, after the stock UPDATE succeeded.
+    Each pick is an index seek on ``idx_units_in_stock`` for the unit that
+    expires next; locked units are skipped so concurrent dispenses pick
+    different bags. Units without an expiry date go last.
+
+    The last unit may be only partly used. An opened bag does not return to
+    stock, so what is left of it is taken from ``current_stock`` as well;
+    LeftoverReserved is raised when that would eat into stock others have
+    reserved. Stock recorded before units were tracked has no donations
+    behind it: once the units run out, the rest of ``quantity`` is taken from
+    that untracked stock, and UnitShortage is raised only when
+    ``current_stock`` would fall below the units still in stock. Either
+    error rolls back the caller's transaction. Returns the picked units.
+    """
+    picked = []
+    remaining = quantity
+    for condition, params, order in (
+        ("expiry_date > %s", (now,), "expiry_date, id"),
+        ("expiry_date IS NULL", (), "id")
+    ):
+        while remaining > 0:
+            cursor.execute(
+                f"SELECT id, collection_bag_number, quantity, expiry_date FROM donations "
+                f"WHERE blood_type = %s AND {IN_STOCK} AND {condition} "
+                f"ORDER BY {order} LIMIT 1 FOR UPDATE SKIP LOCKED",
+                (blood_type, *params)
+            )
+            unit = cursor.fetchone()
+            if unit is None:
+                break
+            cursor.execute(
+                f"UPDATE donations SET dispensed_at = %s WHERE id = %s AND {IN_STOCK}",
+                (now, unit['id'])
+            )
+            picked.append(unit)
+            remaining -= unit['quantity']
+
+    if remaining > 0:
+        cursor.execute(
+            f"SELECT current_stock, (SELECT COALESCE(SUM(quantity), 0) FROM donations "
+            f"WHERE blood_type = %s AND {IN_STOCK}) AS units FROM blood_inventory WHERE blood_type = %s",
+            (blood_type, blood_type)
+        )
+        stock = cursor.fetchone()
+        if stock['current_stock'] < stock['units']:
+            raise UnitShortage(f'Only {quantity - remaining} of {quantity} of {blood_type} is in units in stock')
+    elif remaining < 0 and cursor.execute(OPENED_BAG_UPDATE, {'q': -remaining, 't': blood_type}) != 1:
+        raise LeftoverReserved(
+            f'The rest of an opened {blood_type} bag ({-remaining}) would take reserved stock'
+        )
+    return picked
+
+
+# Global expiry scheduler instance
+expiry_scheduler = ExpiryScheduler()
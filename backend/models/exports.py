@@ -0,0 +1,32 @@
+from utils.database import db
+
+DONOR_STATS_COLUMNS = (
+    'id', 'username', 'email', 'first_name', 'last_name', 'blood_type', 'city', 'state',
+    'is_eligible', 'last_donation_date', 'total_donations', 'total_volume_donated',
+    'last_donation_date_actual'
+)
+
+DONATION_COLUMNS = (
+    'id', 'user_id', 'blood_type', 'quantity', 'donation_date', 'location_id', 'status',
+    'hemoglobin_level', 'blood_pressure_systolic', 'blood_pressure_diastolic', 'weight',
+    'temperature', 'collection_bag_number', 'expiry_date', 'processing_notes',
+    'created_at', 'updated_at'
+)
+
+# Export name -> (columns, query)
+EXPORTS = {
+    'donor-stats': (
+        DONOR_STATS_COLUMNS,
+        f"SELECT {', '.join(DONOR_STATS_COLUMNS)} FROM donor_stats ORDER BY id"
+    ),
+    'donations': (
+        DONATION_COLUMNS,
+        f"SELECT {', '.join(DONATION_COLUMNS)} FROM donations ORDER BY id"
+    )
+}
+
+
+def export_batches(name, batch_size=1000):
+    """Columns of export ``name`` and a lazy iterator over its row batches."""
+    columns, query = EXPORTS[name]
+    return columns, db.stream(query, batch_size=batch_size)
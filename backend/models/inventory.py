@@ -0,0 +1,283 @@
+import logging
+import threading
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from utils.database import db
+from models.expiry import LeftoverReserved, UnitShortage, pick_units
+
+logger = logging.getLogger(__name__)
+
+BLOOD_TYPES = ('A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-')
+
+INVENTORY_COLUMNS = (
+    "blood_type, current_stock, reserved_stock, "
+    "current_stock - reserved_stock AS available_stock, expired_stock, "
+    "min_threshold, max_capacity, units_dispensed_today, units_received_today, "
+    "last_updated, last_donation_date, last_dispensed_date"
+)
+
+# Every operation is a single conditional UPDATE: the WHERE clause refuses any
+# change that would drive a stock figure negative, so concurrent requests can
+# never oversell even across workers. Parameters: (quantity, blood_type).
+OPERATIONS = {
+    'reserve': (
+        "UPDATE blood_inventory SET reserved_stock = reserved_stock + %(q)s "
+        "WHERE blood_type = %(t)s AND current_stock - reserved_stock >= %(q)s"
+    ),
+    'release': (
+        "UPDATE blood_inventory SET reserved_stock = reserved_stock - %(q)s "
+        "WHERE blood_type = %(t)s AND reserved_stock >= %(q)s"
+    ),
+    'commit': (
+        "UPDATE blood_inventory SET current_stock = current_stock - %(q)s, "
+        "reserved_stock = reserved_stock - %(q)s, "
+        "units_dispensed_today = units_dispensed_today + %(q)s, "
+        "last_dispensed_date = NOW() "
+        "WHERE blood_type = %(t)s AND reserved_stock >= %(q)s AND current_stock >= %(q)s"
+    ),
+    'dispense': (
+        "UPDATE blood_inventory SET current_stock = current_stock - %(q)s, "
+        "units_dispensed_today = units_dispensed_today + %(q)s, "
+        "last_dispensed_date = NOW() "
+        "WHERE blood_type = %(t)s AND current_stock - reserved_stock >= %(q)s"
+    )
+}
+
+# Operations that take stock out of the bank and therefore use up units
+DISPENSING = ('commit', 'dispense')
+
+
+class InsufficientStock(Exception):
+    """Raised when an inventory operation would make stock negative."""
+    pass
+
+
+def parse_quantity(value):
+    """Validate a positive quantity with at most two decimals."""
+    try:
+        quantity = Decimal(str(value))
+    except (InvalidOperation, ValueError):
+        raise ValueError('Quantity must be a number')
+    if not quantity.is_finite() or quantity <= 0:
+        raise ValueError('Quantity must be greater than zero')
+    if quantity != quantity.quantize(Decimal('0.01')):
+        raise ValueError('Quantity may have at most two decimals')
+    return quantity
+
+
+class _Pending:
+    """One caller's delta waiting to be applied."""
+
+    __slots__ = ('amount', 'done', 'ok', 'row', 'units', 'error', 'lead')
+
+    def __init__(self, amount):
+        self.amount = amount
+        self.done = threading.Event()
+        self.ok = False
+        self.row = None
+        self.units = []
+        self.error = None
+        self.lead = False
+
+
+class DeltaCoalescer:
+    """Combines concurrent deltas for the same key into one write.
+
+    The first caller for a key becomes the leader and applies everything that
+    queued up meanwhile as one batch; the others just wait. Once its own
+    delta is applied the leader hands the role to the oldest waiter, so a
+    steady stream of requests cannot keep one caller busy forever.
+    """
+
+    def __init__(self, apply_batch):
+        self._apply_batch = apply_batch
+        self._queues = {}
+        self._active = set()
+        self._lock = threading.Lock()
+
+    def submit(self, key, amount):
+        """Apply ``amount`` under ``key``; returns the settled pending item."""
+        item = _Pending(amount)
+        with self._lock:
+            self._queues.setdefault(key, []).append(item)
+            if key not in self._active:
+                self._active.add(key)
+                item.lead = True
+
+        if not item.lead:
+            item.done.wait()
+            if not item.lead:
+                return self._result(item)
+
+        # Leader: drain batches until our own delta has been applied
+        while True:
+            with self._lock:
+                batch = self._queues.pop(key, [])
+
+            if batch:
+                try:
+                    self._apply_batch(key, batch)
+                except Exception as e:
+                    for pending in batch:
+                        pending.error = e
+                for pending in batch:
+                    if pending is not item:
+                        pending.done.set()
+
+            if item in batch or not batch:
+                break
+
+        with self._lock:
+            waiting = self._queues.get(key)
+            if waiting:
+                successor = waiting.pop(0)
+                if not waiting:
+                    del self._queues[key]
+                successor.lead = True
+                successor.done.set()
+                # The successor is still queued for its own delta
+                self._queues.setdefault(key, []).insert(0, successor)
+            else:
+                self._active.discard(key)
+
+        return self._result(item)
+
+    @staticmethod
+    def _result(item):
+        if item.error is not None:
+            raise item.error
+        return item
+
+
+class InventoryService:
+    """Reservation and dispensing operations on ``blood_inventory``.
+
+    Every operation returns the settled item: ``row`` is the inventory of the
+    blood type after the write, and for dispensing operations ``units`` lists
+    the donations picked to cover the volume.
+    """
+
+    def __init__(self):
+        self._coalescer = DeltaCoalescer(self._apply_batch)
+
+    @staticmethod
+    def get_all():
+        """Current inventory for every blood type."""
+        return db.execute_query(
+            f"SELECT {INVENTORY_COLUMNS} FROM blood_inventory ORDER BY blood_type"
+        )
+
+    @staticmethod
+    def get(blood_type):
+        """Current inventory for one blood type."""
+        return db.execute_single(
+            f"SELECT {INVENTORY_COLUMNS} FROM blood_inventory WHERE blood_type = %s",
+            (blood_type,)
+        )
+
+    @staticmethod
+    def reset_daily_counters():
+        """Start a new day: zero ``units_dispensed_today`` and ``units_received_today``.
+
+        Normally done at midnight by the ``reset_inventory_daily_counters``
+        event; returns the number of rows reset.
+        """
+        return db.execute_update(
+            "UPDATE blood_inventory SET units_dispensed_today = 0, units_received_today = 0 "
+            "WHERE units_dispensed_today <> 0 OR units_received_today <> 0"
+        )
+
+    @staticmethod
+    def version():
+        """Sum of the per-row update counters; changes with every write to the table."""
+        row = db.execute_single("SELECT COALESCE(SUM(version), 0) AS version, COUNT(*) AS types FROM blood_inventory")
+        return int(row['version']), row['types']
+
+    def reserve(self, blood_type, quantity):
+        """Hold ``quantity`` of available stock for a pending request."""
+        return self._run('reserve', blood_type, quantity)
+
+    def release(self, blood_type, quantity):
+        """Return previously reserved stock to the available pool."""
+        return self._run('release', blood_type, quantity)
+
+    def commit(self, blood_type, quantity):
+        """Dispense previously reserved stock."""
+        return self._run('commit', blood_type, quantity)
+
+    def dispense(self, blood_type, quantity):
+        """Dispense available (unreserved) stock directly."""
+        return self._run('dispense', blood_type, quantity)
+
+    def _run(self, operation, blood_type, quantity):
+        if blood_type not in BLOOD_TYPES:
+            raise ValueError('Invalid blood type')
+        quantity = parse_quantity(quantity)
+
+        try:
+            item = self._coalescer.submit((operation, blood_type), quantity)
+        except UnitShortage as e:
+            # current_stock promised more than the units hold; the batch was rolled back
+            logger.error('Inventory does not match the units in stock: %s', e, extra={'blood_type': blood_type})
+            raise InsufficientStock(str(e))
+        except LeftoverReserved as e:
+            raise InsufficientStock(str(e))
+        if not item.ok:
+            raise InsufficientStock(f'Insufficient stock to {operation} {quantity} of {blood_type}')
+        return item
+
+    @classmethod
+    def _apply_batch(cls, key, batch):
+        """Apply a batch of deltas for one operation and blood type.
+
+        The combined delta is tried first as a single UPDATE. If it does not
+        fit, the deltas are applied one by one in arrival order so that as
+        many as possible still succeed. Dispensed volume is then taken from
+        the units in stock, first-expiring-first-out. If picking the units
+        fails, the batch is rolled back and every delta is retried in a
+        transaction of its own, so only the deltas that cannot be covered
+        fail.
+        """
+        try:
+            cls._apply(key, batch)
+        except (UnitShortage, LeftoverReserved):
+            if len(batch) == 1:
+                raise
+            for pending in batch:
+                pending.ok = False
+                pending.units = []
+                try:
+                    cls._apply(key, [pending])
+                except (UnitShortage, LeftoverReserved) as e:
+                    pending.error = e
+
+    @staticmethod
+    def _apply(key, batch):
+        operation, blood_type = key
+        query = OPERATIONS[operation]
+        with db.transaction() as cursor:
+            total = sum(pending.amount for pending in batch)
+            if cursor.execute(query, {'q': total, 't': blood_type}) == 1:
+                for pending in batch:
+                    pending.ok = True
+            elif len(batch) > 1:
+                for pending in batch:
+                    pending.ok = cursor.execute(query, {'q': pending.amount, 't': blood_type}) == 1
+
+            if operation in DISPENSING:
+                now = datetime.now()
+                for pending in batch:
+                    if pending.ok:
+                        pending.units = pick_units(cursor, blood_type, pending.amount, now)
+
+            cursor.execute(
+                f"SELECT {INVENTORY_COLUMNS} FROM blood_inventory WHERE blood_type = %s",
+                (blood_type,)
+            )
+            row = cursor.fetchone()
+        for pending in batch:
+            pending.row = row
+
+
+# Global inventory service instance
+inventory = InventoryService()
@@ -0,0 +1,277 @@
+import hashlib
+import heapq
+import threading
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from utils.database import db
+from utils.geo import GridIndex
+from utils.schedule import WeeklyScheduleIndex, weekly_intervals, MINUTES_PER_WEEK
+
+DAYS = ('monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday')
+ALWAYS_OPEN_TEXT = ('24/7', '24 hours', '24 horas')
+
+
+def _serialize(value):
+    """Convert database values to JSON-friendly ones."""
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, timedelta):
+        # pymysql returns TIME columns as timedelta
+        minutes = int(value.total_seconds()) // 60
+        return f'{minutes // 60:02d}:{minutes % 60:02d}'
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+class Location:
+    """Donation center / mobile unit model."""
+
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+        self.latitude = float(self.latitude) if self.latitude is not None else None
+        self.longitude = float(self.longitude) if self.longitude is not None else None
+
+    @classmethod
+    def from_row(cls, row):
+        """Build a Location from a database row."""
+        return cls(**row) if row else None
+
+    @classmethod
+    def find_all(cls):
+        """Load every location."""
+        rows = db.execute_query("SELECT * FROM locations")
+        return [cls.from_row(row) for row in rows]
+
+    @classmethod
+    def find_updated_since(cls, since):
+        """Load locations modified at or after ``since``."""
+        rows = db.execute_query("SELECT * FROM locations WHERE updated_at >= %s", (since,))
+        return [cls.from_row(row) for row in rows]
+
+    @property
+    def languages(self):
+        """Normalized set of spoken languages."""
+        return {
+            language.strip().lower()
+            for language in (self.languages_spoken or '').split(',')
+            if language.strip()
+        }
+
+    def weekly_hours(self):
+        """Opening hours as sorted minute-of-week intervals.
+
+        The per-day columns are authoritative; the free-text ``opening_hours``
+        is only consulted to recognize round-the-clock locations.
+        """
+        intervals = weekly_intervals([
+            (getattr(self, f'{day}_open', None), getattr(self, f'{day}_close', None))
+            for day in DAYS
+        ])
+        if not intervals:
+            text = (getattr(self, 'opening_hours', None) or '').lower()
+            if any(marker in text for marker in ALWAYS_OPEN_TEXT):
+                intervals = [(0, MINUTES_PER_WEEK)]
+        return intervals
+
+    def to_dict(self):
+        """Convert location to dictionary."""
+        return {key: _serialize(value) for key, value in self.__dict__.items()}
+
+    def digest(self):
+        """Stable 128-bit digest of every column, for change detection."""
+        state = repr(sorted(self.__dict__.items())).encode()
+        return int.from_bytes(hashlib.blake2b(state, digest_size=16).digest(), 'big')
+
+
+class LocationDirectory:
+    """In-memory copy of the locations table with spatial and schedule indexes.
+
+    Besides the grid used for radius queries, every location is assigned a
+    bit slot. Opening hours, location type, languages and status flags are
+    kept as integer bitmasks over those slots, so a filtered "open at T"
+    query is a handful of ``&`` operations over all locations at once.
+
+    The directory is loaded on first use and then refreshed incrementally by
+    ``updated_at`` at most every ``refresh_interval`` seconds. A full reload
+    every ``full_reload_interval`` seconds picks up deleted rows.
+
+    ``version`` is the XOR of every location's digest. It changes with any
+    column of any location and is the same in every worker holding the same
+    rows, so it can serve as an ETag without reading the table.
+    """
+
+    def __init__(self):
+        self.refresh_interval = 60
+        self.full_reload_interval = 900
+        self.cell_size = 0.25
+        self._lock = threading.RLock()
+        self._refresh_lock = threading.Lock()
+        self._reset()
+
+    def init_app(self, app):
+        """Configure refresh intervals and index resolution."""
+        self.refresh_interval = app.config['LOCATIONS_REFRESH_INTERVAL']
+        self.full_reload_interval = app.config['LOCATIONS_FULL_RELOAD_INTERVAL']
+        self.cell_size = app.config['LOCATIONS_GRID_CELL_SIZE']
+        with self._lock:
+            self._reset()
+
+    def _reset(self):
+        self._locations = {}
+        self._grid = GridIndex(self.cell_size)
+        self._slots = {}
+        self._slot_ids = []
+        self._schedule = WeeklyScheduleIndex()
+        self._type_masks = {}
+        self._language_masks = {}
+        self._active_mask = 0
+        self._accepting_mask = 0
+        self._digests = {}
+        self._fingerprint = 0
+        self._high_water = None
+        self._loaded_at = None
+        self._refreshed_at = None
+
+    def load(self):
+        """Load every location and rebuild the indexes."""
+        locations = Location.find_all()
+        with self._lock:
+            self._reset()
+            for location in locations:
+                self._apply(location)
+            self._loaded_at = self._refreshed_at = time.monotonic()
+
+    def refresh(self):
+        """Apply rows changed since the last load or refresh."""
+        if self._high_water is None:
+            return self.load()
+        locations = Location.find_updated_since(self._high_water)
+        with self._lock:
+            for location in locations:
+                self._apply(location)
+            self._refreshed_at = time.monotonic()
+
+    def ensure_fresh(self):
+        """Load or refresh the directory if it is due.
+
+        Only the first load blocks; while one thread refreshes, the others
+        keep answering from the current copy.
+        """
+        if self._loaded_at is None:
+            with self._refresh_lock:
+                if self._loaded_at is None:
+                    self.load()
+            return
+
+        now = time.monotonic()
+        full = now - self._loaded_at >= self.full_reload_interval
+        if not full and now - self._refreshed_at < self.refresh_interval:
+            return
+        if not self._refresh_lock.acquire(blocking=False):
+            return
+        try:
+            if full:
+                self.load()
+            else:
+                self.refresh()
+        finally:
+            self._refresh_lock.release()
+
+    def _apply(self, location):
+        """Insert or replace one location in every index (lock held)."""
+        self._locations[location.id] = location
+        digest = location.digest()
+        self._fingerprint ^= self._digests.get(location.id, 0) ^ digest
+        self._digests[location.id] = digest
+        if location.latitude is not None and location.longitude is not None:
+            self._grid.insert(location.id, location.latitude, location.longitude)
+        else:
+            self._grid.remove(location.id)
+
+        slot = self._slots.get(location.id)
+        if slot is None:
+            slot = len(self._slot_ids)
+            self._slots[location.id] = slot
+            self._slot_ids.append(location.id)
+        bit = 1 << slot
+
+        # Clear the slot from every attribute mask, then set the current values
+        for masks in (self._type_masks, self._language_masks):
+            for key in masks:
+                masks[key] &= ~bit
+        self._active_mask &= ~bit
+        self._accepting_mask &= ~bit
+
+        if location.location_type:
+            key = location.location_type.lower()
+            self._type_masks[key] = self._type_masks.get(key, 0) | bit
+        for language in location.languages:
+            self._language_masks[language] = self._language_masks.get(language, 0) | bit
+        if location.is_active:
+            self._active_mask |= bit
+        if location.is_accepting_donations:
+            self._accepting_mask |= bit
+        self._schedule.set(slot, location.weekly_hours())
+
+        updated_at = location.updated_at
+        if updated_at is not None and (self._high_water is None or updated_at > self._high_water):
+            self._high_water = updated_at
+
+    @property
+    def version(self):
+        """Fingerprint of the current contents of the directory."""
+        self.ensure_fresh()
+        with self._lock:
+            return f'{self._fingerprint:032x}'
+
+    def get(self, location_id):
+        """Return a location by id."""
+        self.ensure_fresh()
+        return self._locations.get(location_id)
+
+    def search(self, open_minute=None, location_type=None, languages=(), accepting_only=False):
+        """Active locations matching every given filter, ordered by name.
+
+        ``open_minute`` is a minute of the week (see utils.schedule); when
+        given, only locations open at that minute are returned.
+        """
+        self.ensure_fresh()
+        with self._lock:
+            mask = self._active_mask
+            if accepting_only:
+                mask &= self._accepting_mask
+            if location_type:
+                mask &= self._type_masks.get(location_type.lower(), 0)
+            for language in languages:
+                mask &= self._language_masks.get(language.lower(), 0)
+            if open_minute is not None and mask:
+                mask &= self._schedule.open_mask(open_minute)
+
+            matches = []
+            while mask:
+                lowest = mask & -mask
+                matches.append(self._locations[self._slot_ids[lowest.bit_length() - 1]])
+                mask ^= lowest
+
+        matches.sort(key=lambda location: location.name or '')
+        return matches
+
+    def nearby(self, lat, lon, radius_km, limit=10, accepting_only=True):
+        """Return ``(location, distance_km)`` pairs ordered by distance."""
+        self.ensure_fresh()
+        with self._lock:
+            matches = []
+            for location_id, distance in self._grid.within(lat, lon, radius_km):
+                location = self._locations[location_id]
+                if not location.is_active:
+                    continue
+                if accepting_only and not location.is_accepting_donations:
+                    continue
+                matches.append((location, distance))
+        return heapq.nsmallest(limit, matches, key=lambda match: match[1])
+
+
+# Global location directory instance
+location_directory = LocationDirectory()
@@ -0,0 +1,70 @@
+import pymysql
+from utils.database import db
+
+USER_INSERT_COLUMNS = (
+    'username', 'email', 'password_hash', 'role', 'first_name', 'last_name',
+    'phone_number', 'birth_date', 'gender', 'blood_type', 'address', 'city',
+    'state', 'zip_code', 'country', 'is_active', 'is_eligible', 'last_donation_date'
+)
+
+USER_INSERT_QUERY = (
+    f"INSERT INTO users ({', '.join(USER_INSERT_COLUMNS)}) "
+    f"VALUES ({', '.join(['%s'] * len(USER_INSERT_COLUMNS))})"
+)
+
+
+class UserBatch:
+    """Set-based user operations for bulk registration."""
+
+    @staticmethod
+    def existing_values(column, values):
+        """Return the lower-cased subset of ``values`` already stored in ``column``."""
+        if column not in ('email', 'username'):
+            raise ValueError(f'Unsupported lookup column: {column}')
+        values = list(values)
+        if not values:
+            return set()
+
+        placeholders = ', '.join(['%s'] * len(values))
+        rows = db.execute_query(
+            f"SELECT {column} FROM users WHERE {column} IN ({placeholders})",
+            values
+        )
+        return {row[column].lower() for row in rows}
+
+    @staticmethod
+    def insert_chunk(users):
+        """Insert a chunk of user dicts in one transaction.
+
+        Returns a list of ``(user, user_id, error)`` tuples where ``error`` is
+        None for rows that were stored. If the multi-row insert hits a
+        duplicate key (another registration raced us), the chunk falls back to
+        row-by-row inserts so only the conflicting rows are reported as failed.
+        """
+        rows = [tuple(user[column] for column in USER_INSERT_COLUMNS) for user in users]
+        try:
+            with db.transaction() as cursor:
+                cursor.executemany(USER_INSERT_QUERY, rows)
+                # Read the ids back in the same transaction; auto-increment
+                # values of a multi-row insert are not guaranteed contiguous.
+                emails = [user['email'] for user in users]
+                placeholders = ', '.join(['%s'] * len(emails))
+                cursor.execute(
+                    f"SELECT id, email FROM users WHERE email IN ({placeholders})",
+                    emails
+                )
+                ids = {row['email'].lower(): row['id'] for row in cursor.fetchall()}
+            return [(user, ids.get(user['email'].lower()), None) for user in users]
+        except pymysql.err.IntegrityError:
+            pass
+
+        results = []
+        for user, row in zip(users, rows):
+            try:
+                with db.transaction() as cursor:
+                    cursor.execute(USER_INSERT_QUERY, row)
+                    user_id = cursor.lastrowid
+                results.append((user, user_id, None))
+            except pymysql.err.IntegrityError:
+                results.append((user, None, 'Email address or username is already registered'))
+        return results
@@ -0,0 +1,155 @@
+import copy
+import logging
+import sys
+import threading
+from functools import wraps
+from models.user import User
+from utils.cache import TTLCache, FileChannel
+from utils.database import db
+
+logger = logging.getLogger(__name__)
+
+
+def _user_size(user):
+    """Approximate memory footprint of a cached User in bytes."""
+    attributes = getattr(user, '__dict__', {})
+    return sys.getsizeof(user) + sum(sys.getsizeof(value) for value in attributes.values())
+
+
+class UserCache:
+    """Read-through cache of User records keyed by id.
+    
+    Cached users never carry ``password_hash``, so a stale entry can never be
+    used to authenticate. Anything that needs the hash or intends to save the
+    user (login, password changes, profile updates) must load it with
+    ``User.find_by_id`` / ``User.find_by_email`` instead.
+    
+    Misses are loaded from the primary, never from a read replica.
+    
+    ``User.save`` invalidates the saved user itself (see ``_invalidating``),
+    so writers going through it never call ``invalidate``; code that
+    updates ``users`` rows with its own SQL must.
+    
+    Invalidations are also broadcast through a shared file
+    (``USER_CACHE_CHANNEL_PATH``, under ``instance/`` by default) so every
+    gunicorn worker drops its copy.
+    """
+    
+    def __init__(self):
+        self.enabled = True
+        self._cache = TTLCache(sizeof=_user_size)
+        self._channel = None
+        self._generation = 0
+        self._lock = threading.Lock()
+    
+    def init_app(self, app):
+        """Configure the cache from the app config."""
+        self.enabled = app.config['USER_CACHE_ENABLED']
+        self._cache = TTLCache(
+            max_entries=app.config['USER_CACHE_MAX_ENTRIES'],
+            max_bytes=app.config['USER_CACHE_MAX_BYTES'],
+            ttl=app.config['USER_CACHE_TTL'],
+            sizeof=_user_size
+        )
+        path = app.config['USER_CACHE_CHANNEL_PATH']
+        # Invalidations only matter to running workers, which clear their cache when the file is compacted
+        self._channel = FileChannel(path, max_bytes=app.config['CHANNEL_MAX_BYTES']) if path else None
+    
+    def get(self, user_id):
+        """Return a read-only copy of the user, loading it on a miss."""
+        if not self.enabled:
+            return self._read_only(User.find_by_id(user_id))
+        
+        self._sync()
+        user = self._cache.get(user_id)
+        if user is not None:
+            return copy.copy(user)
+        
+        # Only populate from a fresh read: an older snapshot in this request's
+        # transaction, or an invalidation racing the load, could be stale.
+        generation = self._generation
+        fresh = not db.in_transaction()
+        # A replica could hand back the row an invalidation just replaced
+        with db.primary():
+            user = self._read_only(User.find_by_id(user_id))
+        if user is not None and fresh and generation == self._generation:
+            self._cache.set(user_id, user)
+            return copy.copy(user)
+        return user
+    
+    def peek(self, user_id):
+        """Return a read-only copy of the user if it is cached, without loading it."""
+        if not self.enabled:
+            return None
+        self._sync()
+        user = self._cache.get(user_id)
+        return copy.copy(user) if user is not None else None
+    
+    def invalidate(self, user_id):
+        """Drop a user now and again once the current transaction commits."""
+        self._forget(user_id)
+        db.after_commit(lambda: self._invalidate_committed(user_id))
+    
+    def stats(self):
+        """Return cache counters."""
+        stats = self._cache.stats()
+        stats['enabled'] = self.enabled
+        return stats
+    
+    def _invalidate_committed(self, user_id):
+        self._forget(user_id)
+        if self._channel is not None:
+            try:
+                self._channel.publish(str(user_id))
+            except OSError as e:
+                logger.error('User cache channel error: %s', e)
+    
+    def _forget(self, user_id):
+        with self._lock:
+            self._generation += 1
+        self._cache.invalidate(user_id)
+    
+    def _sync(self):
+        """Apply invalidations published by other workers."""
+        if self._channel is None:
+            return
+        try:
+            messages, reset = self._channel.poll()
+        except OSError as e:
+            logger.error('User cache channel error: %s', e)
+            return
+        
+        if reset:
+            with self._lock:
+                self._generation += 1
+            self._cache.clear()
+        for message in messages:
+            try:
+                user_id = int(message)
+            except ValueError:
+                logger.warning('Skipping malformed user cache invalidation: %r', message)
+                continue
+            self._forget(user_id)
+    
+    @staticmethod
+    def _read_only(user):
+        if user is None:
+            return None
+        user = copy.copy(user)
+        user.password_hash = None
+        return user
+
+
+def _invalidating(save):
+    """Wrap ``User.save`` to invalidate the user once the write succeeds."""
+    @wraps(save)
+    def wrapper(user, *args, **kwargs):
+        saved = save(user, *args, **kwargs)
+        if saved and getattr(user, 'id', None) is not None:
+            user_cache.invalidate(user.id)
+        return saved
+    return wrapper
+
+# Global user cache instance
+user_cache = UserCache()
+User.save = _invalidating(User.save)
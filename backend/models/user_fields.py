@@ -0,0 +1,69 @@
+from datetime import date, datetime
+from decimal import Decimal
+
+# Fields a client may request with ``?fields=``; password_hash is never exposed
+USER_FIELDS = (
+    'id', 'username', 'email', 'role', 'first_name', 'last_name', 'phone_number',
+    'birth_date', 'gender', 'blood_type', 'address', 'city', 'state', 'zip_code',
+    'country', 'is_active', 'is_eligible', 'last_donation_date', 'created_at', 'updated_at'
+)
+
+_FLAG_FIELDS = ('is_active', 'is_eligible')
+
+
+def parse_user_fields(value):
+    """Validate a comma-separated ``fields`` parameter.
+
+    Returns None when no fields were requested (the full payload), otherwise
+    a tuple of field names that always includes ``id``.
+    """
+    if not value:
+        return None
+    fields = ['id']
+    for field in value.split(','):
+        field = field.strip()
+        if not field or field in fields:
+            continue
+        if field not in USER_FIELDS:
+            raise ValueError(f'Unknown field: {field}')
+        fields.append(field)
+    return tuple(fields)
+
+
+def _serialize(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def user_payload(user, fields=None):
+    """The user as returned by the API, restricted to ``fields`` if given.
+
+    Without fields this is ``user.to_dict()``. With fields only the requested
+    attributes are serialized and encoded; the user itself is still loaded
+    whole.
+    """
+    if fields is None:
+        return user.to_dict()
+    return {field: _serialize(getattr(user, field, None)) for field in fields}
+
+
+def user_etag_values(user):
+    """The values a profile ETag is computed from, for a User or a raw ``users`` row.
+
+    Serialized as in the payload, with the flags as booleans, so the sync
+    and async profile endpoints tag the same record alike.
+    """
+    get = user.get if isinstance(user, dict) else lambda field: getattr(user, field, None)
+    values = []
+    for field in USER_FIELDS:
+        value = get(field)
+        values.append(bool(value) if field in _FLAG_FIELDS and value is not None else _serialize(value))
+    return tuple(values)
+
+
+def row_payload(row, fields=None):
+    """user_payload for a raw ``users`` row, for code that reads the table without a User."""
+    return {field: _serialize(row.get(field)) for field in fields or USER_FIELDS}
@@ -2,5 +2,12 @@
 
 from .auth import auth_bp
 from .users import users_bp
+from .locations import locations_bp
+from .inventory import inventory_bp
+from .donors import donors_bp
+from .donations import donations_bp
+from .exports import exports_bp
+from .stats import stats_bp
+from .lab import lab_bp
 
-__all__ = ['auth_bp', 'users_bp'] 
\ No newline at end of file
+__all__ = ['auth_bp', 'users_bp', 'locations_bp', 'inventory_bp', 'donors_bp', 'donations_bp', 'exports_bp', 'stats_bp', 'lab_bp'] 
\ No newline at end of file
@@ -0,0 +1,66 @@
+import logging
+from models.user_cache import user_cache
+from models.user_fields import USER_FIELDS, parse_user_fields, row_payload, user_etag_values, user_payload
+from utils.asgi import AsyncResponse
+from utils.async_database import async_db
+from utils.etag import etag_for
+
+logger = logging.getLogger(__name__)
+
+# Never selects password_hash
+USER_QUERY = f"SELECT {', '.join(USER_FIELDS)} FROM users WHERE id = %s"
+
+
+async def get_profile(views, request):
+    """Get current user's profile; async variant of auth.get_profile.
+    
+    A user in ``user_cache`` is served from there; a miss reads the row from
+    the primary, as the cache's own fills do, without blocking the loop on
+    the sync pool. Either way the ETag matches the sync endpoint's.
+    """
+    claims, error = views.authenticate(request)
+    if error is not None:
+        return error
+    
+    try:
+        try:
+            user_fields = parse_user_fields(request.arg('fields'))
+        except ValueError as e:
+            return views.json({
+                'success': False,
+                'message': str(e)
+            }, 400)
+        
+        user_id = int(claims['sub'])
+        user = user_cache.peek(user_id)
+        if user is None:
+            user = await async_db.execute_single(USER_QUERY, (user_id,))
+        
+        if not user:
+            return views.json({
+                'success': False,
+                'message': 'User not found'
+            }, 404)
+        
+        etag = etag_for(request.path, request.args, *user_etag_values(user))
+        headers = {'ETag': f'"{etag}"', 'Cache-Control': 'private, no-cache', 'Vary': 'Authorization'}
+        if request.if_none_match(etag):
+            return AsyncResponse(304, headers=headers)
+        return views.json({
+            'success': True,
+            'user': row_payload(user, user_fields) if isinstance(user, dict) else user_payload(user, user_fields)
+        }, 200, headers)
+    
+    except Exception:
+        logger.exception('Profile retrieval error')
+        return views.json({
+            'success': False,
+            'message': 'An error occurred while retrieving profile'
+        }, 500)
+
+
+# (method, path) -> view, served by asgi.py ahead of the Flask app. The profile
+# is the only read handler of auth.py and users.py; the rest write or issue tokens
+ROUTES = {
+    ('GET', '/api/auth/profile'): get_profile
+}
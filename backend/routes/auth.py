@@ -1,15 +1,79 @@
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import create_access_token, create_refresh_token, jwt_required, get_jwt_identity
+import logging
+from flask import Blueprint, current_app, request, jsonify
+from flask_jwt_extended import create_access_token, jwt_required, get_jwt, get_jwt_identity
 from models.user import User
+from models.user_batch import UserBatch
+from models.user_cache import user_cache
+from models.user_fields import parse_user_fields, user_etag_values, user_payload
 from utils.validators import UserValidator, ValidationError
+from utils.passwords import hasher, HasherBusy
+from utils.tokens import create_token_pair, revoke_session, roles_required, token_claims
+from utils.etag import compute_etag, conditional_response
+from utils.database import db
 from datetime import datetime
 
+logger = logging.getLogger(__name__)
+
 auth_bp = Blueprint('auth', __name__)
 
+def validate_registration(data):
+    """Validate a registration payload and return the user fields.
+    
+    The plain-text password is returned under ``password``; everything else
+    maps directly onto ``User`` attributes. Raises ValidationError.
+    """
+    email = UserValidator.validate_email(data.get('email'))
+    username = UserValidator.validate_username(data.get('username'))
+    password = UserValidator.validate_password(data.get('password'))
+    confirm_password = data.get('confirmPassword')
+    
+    # Check password confirmation
+    if password != confirm_password:
+        raise ValidationError('Passwords do not match')
+    
+    # Donation information
+    last_donation_date = None
+    if data.get('lastDonationDate'):
+        last_donation_date = UserValidator.validate_last_donation_date(data.get('lastDonationDate'))
+    
+    return {
+        'username': username,
+        'email': email,
+        'password': password,
+        'role': 'donor',  # Default role
+        
+        # Personal information
+        'first_name': UserValidator.validate_name(data.get('firstName'), 'First name'),
+        'last_name': UserValidator.validate_name(data.get('lastName'), 'Last name'),
+        'phone_number': UserValidator.validate_phone_number(data.get('phone')),
+        'birth_date': UserValidator.validate_birth_date(data.get('birthDate')),
+        'gender': UserValidator.validate_gender(data.get('gender')),
+        'blood_type': UserValidator.validate_blood_type(data.get('bloodType')),
+        
+        # Address information
+        'address': UserValidator.validate_address(data.get('address')),
+        'city': UserValidator.validate_city(data.get('city')),
+        'state': UserValidator.validate_state(data.get('state')),
+        'zip_code': UserValidator.validate_zip_code(data.get('zipCode')),
+        'country': UserValidator.validate_country(data.get('country')),
+        
+        'is_active': True,
+        'is_eligible': data.get('canDonateNow', 'no') == 'yes',
+        'last_donation_date': last_donation_date
+    }
+
 @auth_bp.route('/register', methods=['POST'])
 def register():
     """Register a new user."""
     try:
+        try:
+            user_fields = parse_user_fields(request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
+        
         data = request.get_json()
         
         # Validate required fields
@@ -21,39 +85,7 @@ def register():
         
         # Extract and validate all fields
         try:
-            email = UserValidator.validate_email(data.get('email'))
-            username = UserValidator.validate_username(data.get('username'))
-            password = UserValidator.validate_password(data.get('password'))
-            confirm_password = data.get('confirmPassword')
-            
-            # Check password confirmation
-            if password != confirm_password:
-                return jsonify({
-                    'success': False,
-                    'message': 'Passwords do not match'
-                }), 400
-            
-            # Personal information
-            first_name = UserValidator.validate_name(data.get('firstName'), 'First name')
-            last_name = UserValidator.validate_name(data.get('lastName'), 'Last name')
-            phone_number = UserValidator.validate_phone_number(data.get('phone'))
-            birth_date = UserValidator.validate_birth_date(data.get('birthDate'))
-            gender = UserValidator.validate_gender(data.get('gender'))
-            blood_type = UserValidator.validate_blood_type(data.get('bloodType'))
-            
-            # Address information
-            address = UserValidator.validate_address(data.get('address'))
-            city = UserValidator.validate_city(data.get('city'))
-            state = UserValidator.validate_state(data.get('state'))
-            zip_code = UserValidator.validate_zip_code(data.get('zipCode'))
-            country = UserValidator.validate_country(data.get('country'))
-            
-            # Donation information
-            can_donate_now = data.get('canDonateNow', 'no') == 'yes'
-            last_donation_date = None
-            if data.get('lastDonationDate'):
-                last_donation_date = UserValidator.validate_last_donation_date(data.get('lastDonationDate'))
-            
+            fields = validate_registration(data)
         except ValidationError as e:
             return jsonify({
                 'success': False,
@@ -61,52 +93,35 @@ def register():
             }), 400
         
         # Check if user already exists
-        if User.email_exists(email):
+        if User.email_exists(fields['email']):
             return jsonify({
                 'success': False,
                 'message': 'Email address is already registered'
             }), 409
         
-        if User.username_exists(username):
+        if User.username_exists(fields['username']):
             return jsonify({
                 'success': False,
                 'message': 'Username is already taken'
             }), 409
         
         # Create new user
-        user = User(
-            username=username,
-            email=email,
-            password_hash=User.hash_password(password),
-            role='donor',  # Default role
-            first_name=first_name,
-            last_name=last_name,
-            phone_number=phone_number,
-            birth_date=birth_date,
-            gender=gender,
-            blood_type=blood_type,
-            address=address,
-            city=city,
-            state=state,
-            zip_code=zip_code,
-            country=country,
-            is_active=True,
-            is_eligible=can_donate_now,
-            last_donation_date=last_donation_date
-        )
+        password = fields.pop('password')
+        user = User(password_hash=hasher.hash(password), **fields)
         
         # Save user to database
         user_id = user.save()
         
         if user_id:
+            # The client has no token yet; its next reads must still see the new account
+            db.pin_session(user_id)
             # Create JWT tokens (convert ID to string for JWT)
-            access_token = create_access_token(identity=str(user_id))
-            refresh_token = create_refresh_token(identity=str(user_id))
+            access_token, refresh_token = create_token_pair(user_id, user.role, user.is_active)
             
             return jsonify({
                 'success': True,
                 'message': 'Registration successful',
-                'user': user.to_dict(),
+                'user': user_payload(user, user_fields),
                 'access_token': access_token,
                 'refresh_token': refresh_token
             }), 201
@@ -116,17 +131,130 @@ def register():
                 'message': 'Failed to create user account'
             }), 500
     
+    except HasherBusy:
+        return jsonify({
+            'success': False,
+            'message': 'Server is busy, please try again shortly'
+        }), 503, {'Retry-After': '1'}
+    
     except Exception as e:
-        print(f"Registration error: {str(e)}")
+        logger.exception('Registration error')
         return jsonify({
             'success': False,
             'message': 'An error occurred during registration'
         }), 500
 
+@auth_bp.route('/register/batch', methods=['POST'])
+@roles_required('admin', 'lab')
+def register_batch():
+    """Register many donors at once (blood drives). Staff only."""
+    try:
+        data = request.get_json()
+        donors = data.get('donors') if isinstance(data, dict) else data
+        
+        if not donors or not isinstance(donors, list):
+            return jsonify({
+                'success': False,
+                'message': 'A list of donors is required'
+            }), 400
+        
+        max_size = current_app.config['BATCH_REGISTER_MAX_SIZE']
+        if len(donors) > max_size:
+            return jsonify({
+                'success': False,
+                'message': f'A batch may contain at most {max_size} donors'
+            }), 413
+        
+        results = [None] * len(donors)
+        pending = []
+        seen_emails = set()
+        seen_usernames = set()
+        
+        # Validate every row and catch duplicates within the batch itself
+        for index, row in enumerate(donors):
+            try:
+                if not isinstance(row, dict):
+                    raise ValidationError('Donor entry must be an object')
+                fields = validate_registration(row)
+            except ValidationError as e:
+                results[index] = {'index': index, 'success': False, 'message': str(e)}
+                continue
+            
+            email_key = fields['email'].lower()
+            username_key = fields['username'].lower()
+            if email_key in seen_emails:
+                results[index] = {'index': index, 'success': False, 'message': 'Duplicate email in batch'}
+                continue
+            if username_key in seen_usernames:
+                results[index] = {'index': index, 'success': False, 'message': 'Duplicate username in batch'}
+                continue
+            
+            seen_emails.add(email_key)
+            seen_usernames.add(username_key)
+            fields['index'] = index
+            pending.append(fields)
+        
+        # One set-based lookup per unique key
+        existing_emails = UserBatch.existing_values('email', [fields['email'] for fields in pending])
+        existing_usernames = UserBatch.existing_values('username', [fields['username'] for fields in pending])
+        
+        accepted = []
+        for fields in pending:
+            if fields['email'].lower() in existing_emails:
+                message = 'Email address is already registered'
+            elif fields['username'].lower() in existing_usernames:
+                message = 'Username is already taken'
+            else:
+                accepted.append(fields)
+                continue
+            results[fields['index']] = {'index': fields['index'], 'success': False, 'message': message}
+        
+        # Hash in parallel on the password worker pool
+        hashes = hasher.hash_many([fields.pop('password') for fields in accepted])
+        for fields, password_hash in zip(accepted, hashes):
+            fields['password_hash'] = password_hash
+        
+        chunk_size = current_app.config['BATCH_INSERT_CHUNK_SIZE']
+        for start in range(0, len(accepted), chunk_size):
+            for fields, user_id, error in UserBatch.insert_chunk(accepted[start:start + chunk_size]):
+                if error:
+                    results[fields['index']] = {'index': fields['index'], 'success': False, 'message': error}
+                else:
+                    results[fields['index']] = {
+                        'index': fields['index'],
+                        'success': True,
+                        'id': user_id,
+                        'email': fields['email']
+                    }
+        
+        created = sum(1 for result in results if result['success'])
+        return jsonify({
+            'success': True,
+            'message': f'Registered {created} of {len(donors)} donors',
+            'created': created,
+            'failed': len(donors) - created,
+            'results': results
+        }), 200
+    
+    except Exception as e:
+        logger.exception('Batch registration error')
+        return jsonify({
+            'success': False,
+            'message': 'An error occurred during batch registration'
+        }), 500
+
 @auth_bp.route('/login', methods=['POST'])
 def login():
     """Login a user."""
     try:
+        try:
+            user_fields = parse_user_fields(request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
+        
         data = request.get_json()
         
         if not data:
@@ -154,7 +282,7 @@ def login():
             }), 401
         
         # Verify password
-        if not User.verify_password(password, user.password_hash):
+        if not hasher.verify(password, user.password_hash):
             return jsonify({
                 'success': False,
                 'message': 'Invalid email or password'
@@ -167,20 +295,33 @@ def login():
                 'message': 'Account is deactivated. Please contact support.'
             }), 401
         
+        # Upgrade hashes made with an outdated work factor
+        if hasher.needs_rehash(user.password_hash):
+            try:
+                user.password_hash = hasher.hash(password)
+                user.save()
+            except HasherBusy:
+                pass
+        
         # Create JWT tokens (convert ID to string for JWT)
-        access_token = create_access_token(identity=str(user.id))
-        refresh_token = create_refresh_token(identity=str(user.id))
+        access_token, refresh_token = create_token_pair(user.id, user.role, user.is_active)
         
         return jsonify({
             'success': True,
             'message': 'Login successful',
-            'user': user.to_dict(),
+            'user': user_payload(user, user_fields),
             'access_token': access_token,
             'refresh_token': refresh_token
         }), 200
     
+    except HasherBusy:
+        return jsonify({
+            'success': False,
+            'message': 'Server is busy, please try again shortly'
+        }), 503, {'Retry-After': '1'}
+    
     except Exception as e:
-        print(f"Login error: {str(e)}")
+        logger.exception('Login error')
         return jsonify({
             'success': False,
             'message': 'An error occurred during login'
@@ -192,7 +333,7 @@ def refresh():
     """Refresh access token."""
     try:
         current_user_id = int(get_jwt_identity())  # Convert string back to int
-        user = User.find_by_id(current_user_id)
+        user = user_cache.get(current_user_id)
         
         if not user or not user.is_active:
             return jsonify({
@@ -200,7 +341,11 @@ def refresh():
                 'message': 'Invalid user or account deactivated'
             }), 401
         
-        new_access_token = create_access_token(identity=str(current_user_id))
+        new_access_token = create_access_token(
+            identity=str(current_user_id),
+            # Logging out with the new token revokes the refresh token used here
+            additional_claims={**token_claims(current_user_id, user.role, user.is_active), 'rjti': get_jwt()['jti']}
+        )
         
         return jsonify({
             'success': True,
@@ -208,7 +353,7 @@ def refresh():
         }), 200
     
     except Exception as e:
-        print(f"Token refresh error: {str(e)}")
+        logger.exception('Token refresh error')
         return jsonify({
             'success': False,
             'message': 'An error occurred during token refresh'
@@ -219,8 +364,16 @@ def refresh():
 def get_profile():
     """Get current user's profile."""
     try:
+        try:
+            user_fields = parse_user_fields(request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
+        
         current_user_id = int(get_jwt_identity())  # Convert string back to int
-        user = User.find_by_id(current_user_id)
+        user = user_cache.get(current_user_id)
         
         if not user:
             return jsonify({
@@ -228,13 +381,20 @@ def get_profile():
                 'message': 'User not found'
             }), 404
         
-        return jsonify({
-            'success': True,
-            'user': user.to_dict()
-        }), 200
+        # The cached user fixes the body, so a revalidation needs no DB read or serialization
+        etag = compute_etag(*user_etag_values(user))
+        return conditional_response(
+            etag,
+            'private, no-cache',
+            lambda: (jsonify({
+                'success': True,
+                'user': user_payload(user, user_fields)
+            }), 200),
+            vary=('Authorization',)
+        )
     
     except Exception as e:
-        print(f"Profile retrieval error: {str(e)}")
+        logger.exception('Profile retrieval error')
         return jsonify({
             'success': False,
             'message': 'An error occurred while retrieving profile'
@@ -243,7 +403,8 @@ def get_profile():
 @auth_bp.route('/logout', methods=['POST'])
 @jwt_required()
 def logout():
-    """Logout user (client-side token removal)."""
+    """Logout user by revoking the access token used for this request and its refresh token."""
+    revoke_session(get_jwt())
     return jsonify({
         'success': True,
         'message': 'Logout successful. Please remove tokens from client.'
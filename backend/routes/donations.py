@@ -0,0 +1,77 @@
+import logging
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt, get_jwt_identity
+from models.donation import Donation, parse_fields
+
+logger = logging.getLogger(__name__)
+
+donations_bp = Blueprint('donations', __name__)
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+@donations_bp.route('', methods=['GET'])
+@jwt_required()
+def list_donations():
+    """Donation history, newest first, one keyset page at a time."""
+    try:
+        current_user_id = int(get_jwt_identity())  # Convert string back to int
+        is_staff = get_jwt().get('role') in ('admin', 'lab')
+        
+        user_id = request.args.get('user_id')
+        if user_id:
+            try:
+                user_id = int(user_id)
+            except ValueError:
+                return jsonify({
+                    'success': False,
+                    'message': 'user_id must be an integer'
+                }), 400
+        else:
+            # Staff may browse every donation; donors always get their own
+            user_id = None if is_staff else current_user_id
+        
+        if not is_staff and user_id != current_user_id:
+            return jsonify({
+                'success': False,
+                'message': 'You do not have permission to perform this action'
+            }), 403
+        
+        try:
+            limit = int(request.args.get('limit') or DEFAULT_LIMIT)
+            if not 1 <= limit <= MAX_LIMIT:
+                raise ValueError
+        except ValueError:
+            return jsonify({
+                'success': False,
+                'message': f'limit must be an integer between 1 and {MAX_LIMIT}'
+            }), 400
+        
+        try:
+            fields = parse_fields(request.args.get('fields'))
+            donations, next_cursor = Donation.page(
+                user_id=user_id,
+                after=request.args.get('after') or None,
+                limit=limit,
+                fields=fields
+            )
+        except ValueError as e:
+            # InvalidCursor is a ValueError too
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
+        
+        return jsonify({
+            'success': True,
+            'donations': donations,
+            'next_cursor': next_cursor,
+            'has_more': next_cursor is not None
+        }), 200
+    
+    except Exception as e:
+        logger.exception('Donation history error')
+        return jsonify({
+            'success': False,
+            'message': 'An error occurred while retrieving donations'
+        }), 500
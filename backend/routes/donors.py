@@ -0,0 +1,97 @@
+import logging
+from datetime import date, datetime
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt, get_jwt_identity
+from models.donor_snapshot import donor_snapshot, COMPATIBLE_DONORS
+from models.donor_stats import DonorStats
+from utils.tokens import roles_required
+
+logger = logging.getLogger(__name__)
+
+donors_bp = Blueprint('donors', __name__)
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+@donors_bp.route('/compatible', methods=['GET'])
+@roles_required('admin', 'lab')
+def compatible_donors():
+    """Rank active, eligible donors who can give to a recipient blood type."""
+    try:
+        # A literal '+' in the query string decodes to a space
+        recipient = request.args.get('recipient', '').replace(' ', '+').strip().upper()
+        if recipient not in COMPATIBLE_DONORS:
+            return jsonify({
+                'success': False,
+                'message': 'recipient must be a valid blood type'
+            }), 400
+        
+        try:
+            limit = int(request.args.get('limit') or DEFAULT_LIMIT)
+        except ValueError:
+            return jsonify({
+                'success': False,
+                'message': 'limit must be an integer'
+            }), 400
+        if not 1 <= limit <= MAX_LIMIT:
+            return jsonify({
+                'success': False,
+                'message': f'limit must be between 1 and {MAX_LIMIT}'
+            }), 400
+        
+        city = request.args.get('city', '').strip() or None
+        donor_ids = donor_snapshot.compatible(recipient, city=city, limit=limit)
+        donors = donor_snapshot.contact_details(donor_ids)
+        
+        today = date.today()
+        for donor in donors:
+            last_donation = donor['last_donation_date']
+            if isinstance(last_donation, datetime):
+                last_donation = last_donation.date()
+            donor['days_since_last_donation'] = (today - last_donation).days if last_donation else None
+        
+        return jsonify({
+            'success': True,
+            'recipient': recipient,
+            'compatible_blood_types': list(COMPATIBLE_DONORS[recipient]),
+            'count': len(donors),
+            'donors': donors
+        }), 200
+    
+    except Exception as e:
+        logger.exception('Compatible donors error')
+        return jsonify({
+            'success': False,
+            'message': 'An error occurred while searching for donors'
+        }), 500
+
+@donors_bp.route('/<int:user_id>/stats', methods=['GET'])
+@jwt_required()
+def donor_stats(user_id):
+    """Donation totals of one donor; donors may only read their own."""
+    try:
+        current_user_id = int(get_jwt_identity())  # Convert string back to int
+        if user_id != current_user_id and get_jwt().get('role') not in ('admin', 'lab'):
+            return jsonify({
+                'success': False,
+                'message': 'You do not have permission to perform this action'
+            }), 403
+        
+        stats = DonorStats.get(user_id)
+        if not stats:
+            return jsonify({
+                'success': False,
+                'message': 'Donor not found'
+            }), 404
+        
+        return jsonify({
+            'success': True,
+            'stats': stats
+        }), 200
+    
+    except Exception as e:
+        logger.exception('Donor stats error')
+        return jsonify({
+            'success': False,
+            'message': 'An error occurred while retrieving donor statistics'
+        }), 500
@@ -0,0 +1,55 @@
+import logging
+from datetime import date
+from flask import Blueprint, Response, request, jsonify
+from models.exports import EXPORTS, export_batches
+from utils.streaming import csv_chunks, ndjson_chunks, gzip_chunks
+from utils.tokens import roles_required
+
+logger = logging.getLogger(__name__)
+
+exports_bp = Blueprint('exports', __name__)
+
+FORMATS = {
+    'csv': (csv_chunks, 'text/csv'),
+    'ndjson': (ndjson_chunks, 'application/x-ndjson')
+}
+
+@exports_bp.route('/<name>', methods=['GET'])
+@roles_required('admin')
+def export(name):
+    """Stream a full export as CSV or NDJSON, optionally gzipped."""
+    try:
+        if name not in EXPORTS:
+            return jsonify({
+                'success': False,
+                'message': f"Unknown export. Available: {', '.join(sorted(EXPORTS))}"
+            }), 404
+        
+        export_format = request.args.get('format', 'csv').lower()
+        if export_format not in FORMATS:
+            return jsonify({
+                'success': False,
+                'message': 'format must be csv or ndjson'
+            }), 400
+        compress = request.args.get('gzip', '').lower() in ('1', 'true', 'yes')
+        
+        encode, mimetype = FORMATS[export_format]
+        columns, batches = export_batches(name)
+        chunks = encode(columns, batches)
+        filename = f"{name}-{date.today().isoformat()}.{export_format}"
+        headers = {'X-Accel-Buffering': 'no'}  # let nginx pass chunks through
+        if compress:
+            chunks = gzip_chunks(chunks)
+            mimetype = 'application/gzip'
+            filename += '.gz'
+        headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+        
+        # The generator only touches its own connection, never the request's
+        return Response(chunks, mimetype=mimetype, headers=headers)
+    
+    except Exception as e:
+        logger.exception('Export error')
+        return jsonify({
+            'success': False,
+            'message': 'An error occurred while preparing the export'
+        }), 500
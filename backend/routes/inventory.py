@@ -0,0 +1,115 @@
+import logging
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required
+from models.inventory import inventory, InsufficientStock, DISPENSING
+from utils.tokens import roles_required
+from utils.etag import compute_etag, conditional_response
+
+logger = logging.getLogger(__name__)
+
+inventory_bp = Blueprint('inventory', __name__)
+
+@inventory_bp.route('', methods=['GET'])
+@jwt_required()
+def get_inventory():
+    """Get current stock for every blood type."""
+    try:
+        return conditional_response(
+            compute_etag(inventory.version()),
+            'private, no-cache',
+            lambda: (jsonify({
+                'success': True,
+                'inventory': inventory.get_all()
+            }), 200),
+            vary=('Authorization',)
+        )
+    
+    except Exception as e:
+        logger.exception('Inventory retrieval error')
+        return jsonify({
+            'success': False,
+            'message': 'An error occurred while retrieving inventory'
+        }), 500
+
+def _apply_operation(operation):
+    """Run one inventory operation from a JSON body with bloodType and quantity."""
+    data = request.get_json()
+    if not data:
+        return jsonify({
+            'success': False,
+            'message': 'No data provided'
+        }), 400
+    
+    try:
+        result = getattr(inventory, operation)(data.get('bloodType'), data.get('quantity'))
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    except InsufficientStock as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 409
+    
+    response = {
+        'success': True,
+        'message': f'Inventory {operation} successful',
+        'inventory': result.row
+    }
+    if operation in DISPENSING:
+        response['units'] = result.units
+    return jsonify(response), 200
+
+@inventory_bp.route('/reserve', methods=['POST'])
+@roles_required('admin', 'lab')
+def reserve_stock():
+    """Reserve available stock for a hospital request."""
+    try:
+        return _apply_operation('reserve')
+    except Exception as e:
+        logger.exception('Inventory reserve error')
+        return jsonify({
+            'success': False,
+            'message': 'An error occurred while reserving stock'
+        }), 500
+
+@inventory_bp.route('/commit', methods=['POST'])
+@roles_required('admin', 'lab')
+def commit_stock():
+    """Dispense previously reserved stock."""
+    try:
+        return _apply_operation('commit')
+    except Exception as e:
+        logger.exception('Inventory commit error')
+        return jsonify({
+            'success': False,
+            'message': 'An error occurred while committing reserved stock'
+        }), 500
+
+@inventory_bp.route('/release', methods=['POST'])
+@roles_required('admin', 'lab')
+def release_stock():
+    """Release previously reserved stock."""
+    try:
+        return _apply_operation('release')
+    except Exception as e:
+        logger.exception('Inventory release error')
+        return jsonify({
+            'success': False,
+            'message': 'An error occurred while releasing reserved stock'
+        }), 500
+
+@inventory_bp.route('/dispense', methods=['POST'])
+@roles_required('admin', 'lab')
+def dispense_stock():
+    """Dispense available stock directly."""
+    try:
+        return _apply_operation('dispense')
+    except Exception as e:
+        logger.exception('Inventory dispense error')
+        return jsonify({
+            'success': False,
+            'message': 'An error occurred while dispensing stock'
+        }), 500
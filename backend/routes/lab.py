@@ -0,0 +1,71 @@
+import logging
+import csv
+import io
+from flask import Blueprint, current_app, request, jsonify
+from werkzeug.exceptions import RequestEntityTooLarge
+from models.donation_import import DonationImport
+from utils.tokens import roles_required
+
+logger = logging.getLogger(__name__)
+
+lab_bp = Blueprint('lab', __name__)
+
+@lab_bp.route('/donations/import', methods=['POST'])
+@roles_required('lab', 'admin')
+def import_donations():
+    """Import collection records from a device CSV export.
+    
+    Accepts the CSV as the raw request body (``Content-Type: text/csv``),
+    which is parsed as it is read from ``request.stream``, or as a multipart
+    upload in the ``file`` field. Werkzeug spools a multipart file whole
+    before the view runs (to a temporary file past 500 KB), so parsing only
+    starts once it has arrived; ``MAX_CONTENT_LENGTH`` caps either kind.
+    Rows are committed chunk by chunk, so an upload that breaks part way
+    returns the report of what was imported with ``stopped_after_line``
+    set; uploading it again is safe.
+    """
+    try:
+        if request.mimetype == 'multipart/form-data':
+            upload = request.files.get('file')
+            if upload is None:
+                return jsonify({
+                    'success': False,
+                    'message': 'No file provided'
+                }), 400
+            stream = upload.stream
+        else:
+            stream = request.stream
+        
+        importer = DonationImport(
+            chunk_size=current_app.config['LAB_IMPORT_CHUNK_SIZE'],
+            max_errors=current_app.config['LAB_IMPORT_MAX_ERRORS']
+        )
+        try:
+            report = importer.run(io.TextIOWrapper(stream, encoding='utf-8-sig', newline=''))
+        except (ValueError, UnicodeDecodeError, csv.Error) as e:
+            return jsonify({
+                'success': False,
+                'message': f'Invalid CSV: {str(e)}'
+            }), 400
+        
+        message = f"Imported {report['imported']} of {report['rows']} rows"
+        if report['stopped_after_line'] is not None:
+            message += f"; stopped after line {report['stopped_after_line']}: {report['stop_reason']}"
+        return jsonify({
+            'success': report['failed'] == 0 and report['stopped_after_line'] is None,
+            'message': message,
+            **report
+        }), 200
+    
+    except RequestEntityTooLarge:
+        return jsonify({
+            'success': False,
+            'message': 'Upload exceeds MAX_CONTENT_LENGTH'
+        }), 413
+    
+    except Exception as e:
+        logger.exception('Donation import error')
+        return jsonify({
+            'success': False,
+            'message': 'An error occurred while importing donations'
+        }), 500
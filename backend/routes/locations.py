@@ -0,0 +1,131 @@
+import logging
+from datetime import datetime
+from zoneinfo import ZoneInfo
+from flask import Blueprint, current_app, request, jsonify
+from models.location import location_directory
+from utils.schedule import minute_of_week
+from utils.etag import compute_etag, conditional_response
+
+logger = logging.getLogger(__name__)
+
+locations_bp = Blueprint('locations', __name__)
+
+MAX_RADIUS_KM = 500
+MAX_LIMIT = 100
+
+def _float_arg(name, minimum, maximum, default=None):
+    """Read a bounded float query parameter; raises ValueError with a message."""
+    value = request.args.get(name)
+    if value is None or value == '':
+        if default is None:
+            raise ValueError(f'{name} is required')
+        return default
+    try:
+        value = float(value)
+    except ValueError:
+        raise ValueError(f'{name} must be a number')
+    if not minimum <= value <= maximum:
+        raise ValueError(f'{name} must be between {minimum} and {maximum}')
+    return value
+
+def _local_time(value):
+    """Parse ``open_at`` (ISO 8601) into the locations' local time zone."""
+    zone = ZoneInfo(current_app.config['LOCATIONS_TIMEZONE'])
+    if value is None:
+        return datetime.now(zone)
+    try:
+        moment = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError('open_at must be an ISO 8601 date and time')
+    if moment.tzinfo is None:
+        return moment.replace(tzinfo=zone)
+    return moment.astimezone(zone)
+
+def _cache_control():
+    """Locations are public reference data refreshed every LOCATIONS_REFRESH_INTERVAL."""
+    return f"public, max-age={current_app.config['LOCATIONS_CACHE_MAX_AGE']}"
+
+@locations_bp.route('', methods=['GET'])
+def list_locations():
+    """List active locations, optionally filtered by opening time, type and language."""
+    try:
+        open_at = request.args.get('open_at')
+        open_now = request.args.get('open_now', '').lower() == 'true'
+        languages = [
+            language.strip()
+            for language in request.args.get('languages_spoken', '').split(',')
+            if language.strip()
+        ]
+        
+        open_minute = None
+        if open_at or open_now:
+            try:
+                open_minute = minute_of_week(_local_time(open_at))
+            except ValueError as e:
+                return jsonify({
+                    'success': False,
+                    'message': str(e)
+                }), 400
+        
+        def build():
+            matches = location_directory.search(
+                open_minute=open_minute,
+                location_type=request.args.get('location_type'),
+                languages=languages,
+                accepting_only=request.args.get('accepting', '').lower() == 'true'
+            )
+            return jsonify({
+                'success': True,
+                'count': len(matches),
+                'locations': [location.to_dict() for location in matches]
+            }), 200
+        
+        # open_now answers differ from one minute to the next
+        return conditional_response(
+            compute_etag(location_directory.version, open_minute),
+            _cache_control(),
+            build
+        )
+    
+    except Exception as e:
+        logger.exception('Location list error')
+        return jsonify({
+            'success': False,
+            'message': 'An error occurred while retrieving locations'
+        }), 500
+
+@locations_bp.route('/nearby', methods=['GET'])
+def nearby_locations():
+    """Find the nearest active donation centers accepting donations."""
+    try:
+        try:
+            lat = _float_arg('lat', -90, 90)
+            lon = _float_arg('lon', -180, 180)
+            radius = _float_arg('radius', 0, MAX_RADIUS_KM, default=25)
+            limit = int(_float_arg('limit', 1, MAX_LIMIT, default=10))
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
+        
+        def build():
+            locations = []
+            for location, distance in location_directory.nearby(lat, lon, radius, limit=limit):
+                data = location.to_dict()
+                data['distance_km'] = round(distance, 3)
+                locations.append(data)
+            return jsonify({
+                'success': True,
+                'count': len(locations),
+                'locations': locations
+            }), 200
+        
+        return conditional_response(compute_etag(location_directory.version), _cache_control(), build)
+    
+    except Exception as e:
+        logger.exception('Nearby locations error')
+        return jsonify({
+            'success': False,
+            'message': 'An error occurred while searching for locations'
+        }), 500
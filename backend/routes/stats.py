@@ -0,0 +1,73 @@
+import logging
+from datetime import datetime, timedelta
+from flask import Blueprint, request, jsonify
+from models.inventory import BLOOD_TYPES
+from models.rollups import InventoryRollups
+from utils.tokens import roles_required
+
+logger = logging.getLogger(__name__)
+
+stats_bp = Blueprint('stats', __name__)
+
+DEFAULT_SPAN = {
+    'hour': timedelta(hours=24),
+    'day': timedelta(days=30)
+}
+
+def _datetime_arg(name):
+    """Parse an optional ISO 8601 query parameter; raises ValueError with a message."""
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        moment = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f'{name} must be an ISO 8601 date or date and time')
+    # Rollups are stored in the database's local time
+    return moment.replace(tzinfo=None) if moment.tzinfo is None else moment.astimezone().replace(tzinfo=None)
+
+@stats_bp.route('/timeseries', methods=['GET'])
+@roles_required('admin', 'lab')
+def timeseries():
+    """Collected, dispensed and expired volume and stock level per hour or day."""
+    try:
+        bucket = request.args.get('bucket', 'day').lower()
+        blood_type = request.args.get('blood_type', '').replace(' ', '+').strip().upper() or None
+        location_id = request.args.get('location_id')
+        
+        try:
+            if bucket not in DEFAULT_SPAN:
+                raise ValueError('bucket must be hour or day')
+            if blood_type and blood_type not in BLOOD_TYPES:
+                raise ValueError('Invalid blood type')
+            if location_id:
+                try:
+                    location_id = int(location_id)
+                except ValueError:
+                    raise ValueError('location_id must be an integer')
+            else:
+                location_id = None
+            
+            end = _datetime_arg('to') or datetime.now()
+            start = _datetime_arg('from') or end - DEFAULT_SPAN[bucket]
+            points = InventoryRollups.timeseries(start, end, bucket, blood_type, location_id)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
+        
+        return jsonify({
+            'success': True,
+            'bucket': bucket,
+            'from': start.isoformat(),
+            'to': end.isoformat(),
+            'points': points
+        }), 200
+    
+    except Exception as e:
+        logger.exception('Timeseries error')
+        return jsonify({
+            'success': False,
+            'message': 'An error occurred while retrieving statistics'
+        }), 500
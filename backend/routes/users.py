@@ -1,7 +1,13 @@
+import logging
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from models.user import User
+from models.user_fields import parse_user_fields, user_payload
 from utils.validators import UserValidator, ValidationError
+from utils.passwords import hasher, HasherBusy
+from utils.tokens import denylist
+
+logger = logging.getLogger(__name__)
 
 users_bp = Blueprint('users', __name__)
 
@@ -10,6 +16,14 @@ users_bp = Blueprint('users', __name__)
 def update_profile():
     """Update user profile."""
     try:
+        try:
+            user_fields = parse_user_fields(request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
+        
         current_user_id = int(get_jwt_identity())  # Convert string back to int
         user = User.find_by_id(current_user_id)
         
@@ -66,7 +80,7 @@ def update_profile():
             return jsonify({
                 'success': True,
                 'message': 'Profile updated successfully',
-                'user': user.to_dict()
+                'user': user_payload(user, user_fields)
             }), 200
         else:
             return jsonify({
@@ -75,7 +89,7 @@ def update_profile():
             }), 500
     
     except Exception as e:
-        print(f"Profile update error: {str(e)}")
+        logger.exception('Profile update error')
         return jsonify({
             'success': False,
             'message': 'An error occurred while updating profile'
@@ -113,7 +127,7 @@ def change_password():
             }), 400
         
         # Verify current password
-        if not User.verify_password(current_password, user.password_hash):
+        if not hasher.verify(current_password, user.password_hash):
             return jsonify({
                 'success': False,
                 'message': 'Current password is incorrect'
@@ -136,7 +150,7 @@ def change_password():
             }), 400
         
         # Update password
-        user.password_hash = User.hash_password(new_password)
+        user.password_hash = hasher.hash(new_password)
         
         if user.save():
             return jsonify({
@@ -149,8 +163,14 @@ def change_password():
                 'message': 'Failed to change password'
             }), 500
     
+    except HasherBusy:
+        return jsonify({
+            'success': False,
+            'message': 'Server is busy, please try again shortly'
+        }), 503, {'Retry-After': '1'}
+    
     except Exception as e:
-        print(f"Password change error: {str(e)}")
+        logger.exception('Password change error')
         return jsonify({
             'success': False,
             'message': 'An error occurred while changing password'
@@ -173,6 +193,8 @@ def deactivate_account():
         user.is_active = False
         
         if user.save():
+            # Revoke every outstanding token along with the deactivation
+            denylist.bump_version(current_user_id)
             return jsonify({
                 'success': True,
                 'message': 'Account deactivated successfully'
@@ -184,7 +206,7 @@ def deactivate_account():
             }), 500
     
     except Exception as e:
-        print(f"Account deactivation error: {str(e)}")
+        logger.exception('Account deactivation error')
         return jsonify({
             'success': False,
             'message': 'An error occurred while deactivating account'
@@ -195,20 +217,25 @@ def deactivate_account():
 def update_eligibility():
     """Update donation eligibility status (is_active field)."""
     try:
+        try:
+            user_fields = parse_user_fields(request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
+        
         current_user_id = int(get_jwt_identity())  # Convert string back to int
-        print(f"Updating eligibility for user ID: {current_user_id}")
         
         user = User.find_by_id(current_user_id)
         
         if not user:
-            print(f"User not found for ID: {current_user_id}")
             return jsonify({
                 'success': False,
                 'message': 'User not found'
             }), 404
         
         data = request.get_json()
-        print(f"Received data: {data}")
         
         if not data:
             return jsonify({
@@ -217,7 +244,6 @@ def update_eligibility():
             }), 400
         
         is_eligible = data.get('isEligible')
-        print(f"isEligible value: {is_eligible}, type: {type(is_eligible)}")
         
         if is_eligible is None:
             return jsonify({
@@ -228,26 +254,26 @@ def update_eligibility():
         # Update is_active instead of is_eligible since this represents donation availability
         old_status = user.is_active
         user.is_active = bool(is_eligible)
-        print(f"Updating is_active from {old_status} to {user.is_active}")
+        logger.debug('Active status change', extra={'user_id': user.id, 'previous': old_status, 'current': user.is_active})
         
         if user.save():
-            print("User saved successfully")
+            if not user.is_active:
+                # An inactive account cannot log in; end its sessions as deactivate does
+                denylist.bump_version(current_user_id)
             return jsonify({
                 'success': True,
                 'message': 'Active status updated successfully',
-                'user': user.to_dict()
+                'user': user_payload(user, user_fields)
             }), 200
         else:
-            print("Failed to save user")
+            logger.warning('Failed to save active status', extra={'user_id': user.id})
             return jsonify({
                 'success': False,
                 'message': 'Failed to update active status'
             }), 500
     
     except Exception as e:
-        print(f"Active status update error: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception('Active status update error')
         return jsonify({
             'success': False,
             'message': f'An error occurred while updating active status: {str(e)}'
@@ -257,43 +283,36 @@ def update_eligibility():
 @jwt_required()
 def update_active_status():
     """Update user's active donation status."""
-    print("=== ACTIVE STATUS ENDPOINT HIT ===")
     try:
+        try:
+            user_fields = parse_user_fields(request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
+        
         current_user_id = int(get_jwt_identity())  # Convert string back to int
-        print(f"Updating active status for user ID: {current_user_id}")
         
         user = User.find_by_id(current_user_id)
         
         if not user:
-            print(f"User not found for ID: {current_user_id}")
             return jsonify({
                 'success': False,
                 'message': 'User not found'
             }), 404
         
-        # Debug request information
-        print(f"Request content type: {request.content_type}")
-        print(f"Request data (raw): {request.data}")
-        print(f"Request form: {request.form}")
-        print(f"Request json: {request.json}")
-        
         data = request.get_json()
-        print(f"Received data: {data}")
-        print(f"Data type: {type(data)}")
         
         if not data:
-            print("No data provided - returning 400")
             return jsonify({
                 'success': False,
                 'message': 'No data provided'
             }), 400
         
         is_active = data.get('isActive')
-        print(f"isActive value: {is_active}, type: {type(is_active)}")
         
         if is_active is None:
-            print("isActive is None - returning 422")
-            print(f"Available keys in data: {list(data.keys()) if isinstance(data, dict) else 'not a dict'}")
             return jsonify({
                 'success': False,
                 'message': 'Active status is required'
@@ -301,26 +320,26 @@ def update_active_status():
         
         old_status = user.is_active
         user.is_active = bool(is_active)
-        print(f"Updating is_active from {old_status} to {user.is_active}")
+        logger.debug('Active status change', extra={'user_id': user.id, 'previous': old_status, 'current': user.is_active})
         
         if user.save():
-            print("User saved successfully")
+            if not user.is_active:
+                # An inactive account cannot log in; end its sessions as deactivate does
+                denylist.bump_version(current_user_id)
             return jsonify({
                 'success': True,
                 'message': 'Active status updated successfully',
-                'user': user.to_dict()
+                'user': user_payload(user, user_fields)
             }), 200
         else:
-            print("Failed to save user")
+            logger.warning('Failed to save active status', extra={'user_id': user.id})
             return jsonify({
                 'success': False,
                 'message': 'Failed to update active status'
             }), 500
     
     except Exception as e:
-        print(f"Active status update error: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception('Active status update error')
         return jsonify({
             'success': False,
             'message': f'An error occurred while updating active status: {str(e)}'
@@ -0,0 +1,144 @@
+"""Benchmark of the sync (gunicorn) and async (ASGI) profile endpoint.
+
+Starts each server as a single process on 127.0.0.1, registers a few
+donors, then keeps ``--concurrency`` requests for ``GET /api/auth/profile``
+in flight for ``--duration`` seconds at every level given. The client is a
+minimal asyncio HTTP/1.1 client, so hundreds of keep-alive connections cost
+one thread. Both servers run with USER_CACHE_ENABLED=false so every request
+reaches MySQL.
+
+    sync    gunicorn, 1 worker x --threads threads, app:create_app
+    async   uvicorn, asgi:create_asgi_app (AsyncDatabase)
+
+Uses the DB_* settings of FLASK_ENV (testing by default); see
+scripts/load_test.py for a disposable database to point it at.
+
+Usage (from the backend directory):
+
+    DB_PORT=3307 python scripts/bench_async.py --concurrency 10,100,400 --duration 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from load_test import BACKEND, PERCENTILES, Donor, HTTPClient, summarize, wait_until_up  # noqa: E402
+
+SERVERS = {
+    'sync': lambda port, threads: [
+        sys.executable, '-m', 'gunicorn', '--workers', '1', '--threads', str(threads),
+        '--bind', f'127.0.0.1:{port}', "app:create_app('testing')"
+    ],
+    'async': lambda port, threads: [
+        sys.executable, '-m', 'uvicorn', '--factory', 'asgi:create_asgi_app',
+        '--host', '127.0.0.1', '--port', str(port), '--no-access-log'
+    ]
+}
+
+
+async def fetch(reader, writer, request):
+    """Send one request on a keep-alive connection and return its status."""
+    writer.write(request)
+    status_line = await reader.readline()
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.partition(b':')
+        if name.strip().lower() == b'content-length':
+            length = int(value)
+    if length:
+        await reader.readexactly(length)
+    return int(status_line.split()[1])
+
+
+async def connection(port, requests, deadline, samples, errors):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    try:
+        index = 0
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                status = await fetch(reader, writer, requests[index % len(requests)])
+            except (ConnectionError, asyncio.IncompleteReadError, ValueError, IndexError):
+                errors['profile'] = errors.get('profile', 0) + 1
+                writer.close()
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+                continue
+            samples.setdefault('profile', []).append(time.perf_counter() - started)
+            if status != 200:
+                errors['profile'] = errors.get('profile', 0) + 1
+            index += 1
+    finally:
+        writer.close()
+
+
+async def run_level(port, requests, concurrency, duration):
+    samples, errors = {}, {}
+    deadline = time.perf_counter() + duration
+    await asyncio.gather(*[
+        connection(port, requests[number::concurrency] or requests, deadline, samples, errors)
+        for number in range(concurrency)
+    ])
+    return summarize(samples, errors, duration)['profile']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--concurrency', default='10,100,400', help='comma-separated in-flight request counts')
+    parser.add_argument('--duration', type=float, default=10, help='seconds per level')
+    parser.add_argument('--threads', type=int, default=8, help='gunicorn threads of the sync server')
+    parser.add_argument('--donors', type=int, default=20)
+    parser.add_argument('--port', type=int, default=8098)
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    args = parser.parse_args()
+    levels = [int(level) for level in args.concurrency.split(',')]
+
+    env = dict(os.environ, FLASK_ENV=os.environ.get('FLASK_ENV', 'testing'), USER_CACHE_ENABLED='false')
+    results = {}
+    for name, command in SERVERS.items():
+        server = subprocess.Popen(command(args.port, args.threads), cwd=BACKEND, env=env)
+        try:
+            base_url = f'http://127.0.0.1:{args.port}'
+            wait_until_up(base_url, 30)
+            client = HTTPClient(base_url)
+            requests = []
+            for number in range(args.donors):
+                donor = Donor(client, f'{name}{os.getpid()}', number, random.Random(number))
+                donor.setup()
+                requests.append(
+                    f'GET /api/auth/profile HTTP/1.1\r\nHost: 127.0.0.1\r\n'
+                    f'Authorization: Bearer {donor.token}\r\n\r\n'.encode()
+                )
+            results[name] = {}
+            for level in levels:
+                results[name][level] = asyncio.run(run_level(args.port, requests, level, args.duration))
+        finally:
+            server.terminate()
+            server.wait()
+
+    print(f"{'server':6s} {'in flight':>9s} {'requests':>8s} {'errors':>6s} {'req/s':>8s} "
+          + ' '.join(f"{f'p{p} ms':>8s}" for p in PERCENTILES))
+    for name, by_level in results.items():
+        for level, entry in by_level.items():
+            print(f"{name:6s} {level:9d} {entry['requests']:8d} {entry['errors']:6d} {entry['throughput_rps']:8.1f} "
+                  + ' '.join(f"{entry[f'p{p}_ms'] or 0:8.2f}" for p in PERCENTILES))
+    for level in levels:
+        sync, fast = results['sync'][level]['throughput_rps'], results['async'][level]['throughput_rps']
+        if sync:
+            print(f'{level} in flight: async serves {fast / sync:.2f}x the sync throughput')
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""Micro-benchmark of user payload serialization.
+
+Builds the login and profile responses for a typical donor and times them
+with the standard library JSON provider and with FastJSONProvider (orjson),
+both for the full user and for a sparse ``?fields=`` payload. No database is
+needed.
+
+Usage (from the backend directory):
+
+    python scripts/bench_json.py --iterations 20000
+"""
+import argparse
+import os
+import sys
+import timeit
+from datetime import date, datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask.json.provider import DefaultJSONProvider  # noqa: E402
+from app import create_app  # noqa: E402
+from models.user import User  # noqa: E402
+from models.user_fields import parse_user_fields, user_payload  # noqa: E402
+from utils.json_provider import FastJSONProvider  # noqa: E402
+
+SPARSE_FIELDS = 'first_name,blood_type,is_eligible'
+
+# Stand-in for a JWT; only its length matters here
+TOKEN = 'x' * 320
+
+
+def sample_user():
+    user = User(
+        username='jdoe', email='jane.doe@example.com', password_hash='$2b$12$' + 'x' * 53,
+        role='donor', first_name='Jane', last_name='Doe', phone_number='555-1234567',
+        birth_date=date(1990, 1, 1), gender='Female', blood_type='O-',
+        address='123 Test Street', city='Test City', state='Test State', zip_code='12345',
+        country='Test Country', is_active=True, is_eligible=True,
+        last_donation_date=datetime(2025, 1, 15, 10, 30)
+    )
+    user.id = 42
+    return user
+
+
+def responses(app, user):
+    """Callables building each response the way the routes do."""
+    return {
+        'login': lambda fields: app.json.response({
+            'success': True,
+            'message': 'Login successful',
+            'user': user_payload(user, fields),
+            'access_token': TOKEN,
+            'refresh_token': TOKEN
+        }),
+        'profile': lambda fields: app.json.response({
+            'success': True,
+            'user': user_payload(user, fields)
+        })
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=20000)
+    args = parser.parse_args()
+
+    app = create_app('testing')
+    app.config['DEBUG'] = False
+    user = sample_user()
+    providers = {'stdlib': DefaultJSONProvider(app), 'fast': FastJSONProvider(app)}
+    if not providers['fast'].fast:
+        print('orjson is not installed: the fast provider falls back to the standard library')
+
+    results = {}
+    with app.app_context():
+        builders = responses(app, user)
+        sparse = parse_user_fields(SPARSE_FIELDS)
+        for provider_name, provider in providers.items():
+            app.json = provider
+            for name, build in builders.items():
+                for variant, fields in (('full', None), ('sparse', sparse)):
+                    body = build(fields).get_data()
+                    elapsed = timeit.timeit(lambda: build(fields), number=args.iterations)
+                    results[(provider_name, name, variant)] = elapsed
+                    print(f"{provider_name:7s} {name:8s} {variant:7s} {len(body):5d} B  "
+                          f"{elapsed / args.iterations * 1e6:7.2f} us/response")
+
+    print()
+    for name in builders:
+        baseline = results[('stdlib', name, 'full')]
+        for variant in ('full', 'sparse'):
+            print(f"{name:8s} {variant:7s} fast provider: {baseline / results[('fast', name, variant)]:.2f}x "
+                  f"the stdlib full payload")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,413 @@
+"""Load test of the auth and user API.
+
+Every worker thread plays one donor: it registers and logs in during setup
+(not measured), then picks operations from a weighted mix until the run
+ends. Profile reads send the last ETag back, like a polling client. The
+active-status operation always sets the donor active: a deactivation would
+revoke its tokens and lock it out for the rest of the run. Reports throughput and
+p50/p95/p99 latency per operation; ``--output`` saves them as JSON and
+``--baseline`` compares against an earlier output, exiting with status 1
+when an operation regressed by more than ``--threshold`` percent.
+
+Targets:
+
+    (default)      create_app('testing') in this process, through the Flask test client
+    --gunicorn     a gunicorn (gunicorn.conf.py) started on 127.0.0.1 for the run and stopped afterwards
+    --url URL      a server that is already running
+
+Run it against a disposable database, never one with real data: the run
+leaves its donors behind. The queries are MySQL-specific, so the stand-in
+is a throwaway MySQL server loaded with the schema, e.g.
+
+    docker run -d --name vitapink-bench -e MYSQL_ROOT_PASSWORD=admin -p 3307:3306 mysql:8.0
+    mysql -h 127.0.0.1 -P 3307 -u root -padmin < ../database/schema.sql
+
+Usage (from the backend directory; FLASK_ENV defaults to testing):
+
+    DB_PORT=3307 python scripts/load_test.py --duration 30 --concurrency 16 --output bench.json
+    DB_PORT=3307 python scripts/load_test.py --gunicorn --workers 4 --baseline bench.json --threshold 15
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import secrets
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+# Read by Database and create_app at import time
+os.environ.setdefault('FLASK_ENV', 'testing')
+
+DEFAULT_MIX = 'profile=50,login=15,update_profile=20,active_status=10,register=5'
+OPERATIONS = ('register', 'login', 'profile', 'update_profile', 'active_status')
+PERCENTILES = (50, 95, 99)
+PASSWORD = 'Bench-password-1'
+
+CITIES = ('Springfield', 'Riverside', 'Fairview', 'Greenville', 'Madison')
+BLOOD_TYPES = ('A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-')
+
+
+class InProcessClient:
+    """Flask test client with the same interface as HTTPClient."""
+
+    def __init__(self, app):
+        self._client = app.test_client()
+
+    def request(self, method, path, body=None, headers=None):
+        response = self._client.open(path, method=method, json=body, headers=headers)
+        return response.status_code, response.headers, response.get_json(silent=True)
+
+
+class HTTPClient:
+    """Keep-alive HTTP session against a running server."""
+
+    def __init__(self, base_url):
+        import requests
+
+        self._base_url = base_url.rstrip('/')
+        self._session = requests.Session()
+
+    def request(self, method, path, body=None, headers=None):
+        response = self._session.request(method, self._base_url + path, json=body, headers=headers)
+        try:
+            payload = response.json()
+        except ValueError:
+            payload = None
+        return response.status_code, response.headers, payload
+
+
+class Donor:
+    """One simulated donor and the state a real client would keep."""
+
+    def __init__(self, client, run_id, number, rng):
+        self.client = client
+        self.rng = rng
+        self.email = f'bench-{run_id}-{number}@example.com'
+        self.username = f'bench{run_id}{number}'
+        self.token = None
+        self.etag = None
+        self._registered = 0
+        self._run_id = run_id
+        self._number = number
+
+    def registration(self, email, username):
+        return {
+            'email': email,
+            'username': username,
+            'password': PASSWORD,
+            'confirmPassword': PASSWORD,
+            'firstName': 'Bench',
+            'lastName': 'Donor',
+            'phone': f'555-{self.rng.randrange(1000000, 9999999)}',
+            'birthDate': '1990-01-01',
+            'gender': self.rng.choice(('Male', 'Female')),
+            'bloodType': self.rng.choice(BLOOD_TYPES),
+            'address': '123 Test Street',
+            'city': self.rng.choice(CITIES),
+            'state': 'Test State',
+            'zipCode': '12345',
+            'country': 'Test Country',
+            'canDonateNow': 'yes'
+        }
+
+    def _auth(self, extra=None):
+        headers = {'Authorization': f'Bearer {self.token}'}
+        headers.update(extra or {})
+        return headers
+
+    def setup(self):
+        status, _, payload = self.client.request(
+            'POST', '/api/auth/register', self.registration(self.email, self.username)
+        )
+        if status != 201:
+            raise RuntimeError(f'Setup registration failed with {status}: {payload}')
+        self.token = payload['access_token']
+
+    def register(self):
+        # A fresh account each time; the worker's own donor is left alone
+        self._registered += 1
+        suffix = f'{self._number}x{self._registered}'
+        status, _, _ = self.client.request('POST', '/api/auth/register', self.registration(
+            f'bench-{self._run_id}-{suffix}@example.com', f'bench{self._run_id}{suffix}'
+        ))
+        return status == 201
+
+    def login(self):
+        status, _, payload = self.client.request(
+            'POST', '/api/auth/login', {'email': self.email, 'password': PASSWORD}
+        )
+        if status == 200:
+            self.token = payload['access_token']
+        return status == 200
+
+    def profile(self):
+        headers = self._auth({'If-None-Match': self.etag} if self.etag else None)
+        status, response_headers, _ = self.client.request('GET', '/api/auth/profile', headers=headers)
+        if status == 200:
+            self.etag = response_headers.get('ETag')
+        return status in (200, 304)
+
+    def update_profile(self):
+        status, _, _ = self.client.request('PUT', '/api/users/profile', {
+            'city': self.rng.choice(CITIES),
+            'phone': f'555-{self.rng.randrange(1000000, 9999999)}'
+        }, self._auth())
+        return status == 200
+
+    def active_status(self):
+        status, _, _ = self.client.request(
+            'PUT', '/api/users/active-status', {'isActive': True}, self._auth()
+        )
+        return status == 200
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f'Unknown operation {name!r}; expected one of {", ".join(OPERATIONS)}')
+        try:
+            mix[name] = float(weight)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f'Invalid weight for {name!r}: {weight!r}')
+    if not any(weight > 0 for weight in mix.values()):
+        raise argparse.ArgumentTypeError('The mix needs at least one positive weight')
+    return mix
+
+
+def percentile(ordered, p):
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return None
+    rank = max(1, -(-len(ordered) * p // 100))
+    return ordered[int(rank) - 1]
+
+
+def worker(donor, mix, warmup_until, stop, samples, errors, lock):
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    local_samples = defaultdict(list)
+    local_errors = defaultdict(int)
+    while not stop.is_set():
+        name = donor.rng.choices(names, weights)[0]
+        started = time.perf_counter()
+        try:
+            ok = getattr(donor, name)()
+        except Exception:
+            ok = False
+        elapsed = time.perf_counter() - started
+        if started < warmup_until:
+            continue
+        local_samples[name].append(elapsed)
+        if not ok:
+            local_errors[name] += 1
+    with lock:
+        for name, values in local_samples.items():
+            samples[name].extend(values)
+        for name, count in local_errors.items():
+            errors[name] += count
+
+
+def summarize(samples, errors, duration):
+    def stats(values, failed):
+        ordered = sorted(values)
+        entry = {
+            'requests': len(ordered),
+            'errors': failed,
+            'throughput_rps': round(len(ordered) / duration, 2) if duration else 0.0,
+            'mean_ms': round(sum(ordered) / len(ordered) * 1000, 3) if ordered else None,
+            'max_ms': round(ordered[-1] * 1000, 3) if ordered else None
+        }
+        for p in PERCENTILES:
+            value = percentile(ordered, p)
+            entry[f'p{p}_ms'] = round(value * 1000, 3) if value is not None else None
+        return entry
+
+    results = {name: stats(values, errors.get(name, 0)) for name, values in sorted(samples.items())}
+    results['all'] = stats([value for values in samples.values() for value in values], sum(errors.values()))
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Regressions of p95 latency and throughput beyond ``threshold`` percent."""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous or not previous.get('requests') or not current.get('requests'):
+            continue
+        if previous['p95_ms'] and current['p95_ms'] > previous['p95_ms'] * (1 + threshold / 100):
+            regressions.append(f"{name}: p95 {previous['p95_ms']:.2f} -> {current['p95_ms']:.2f} ms")
+        if previous['throughput_rps'] and current['throughput_rps'] < previous['throughput_rps'] * (1 - threshold / 100):
+            regressions.append(
+                f"{name}: throughput {previous['throughput_rps']:.1f} -> {current['throughput_rps']:.1f} req/s"
+            )
+    return regressions
+
+
+def print_report(results, baseline=None):
+    header = f"{'operation':15s} {'requests':>8s} {'errors':>6s} {'req/s':>8s} " + ' '.join(
+        f"{f'p{p} ms':>8s}" for p in PERCENTILES
+    )
+    print(header)
+    for name, entry in results.items():
+        line = f"{name:15s} {entry['requests']:8d} {entry['errors']:6d} {entry['throughput_rps']:8.1f} " + ' '.join(
+            f"{entry[f'p{p}_ms']:8.2f}" if entry[f'p{p}_ms'] is not None else f"{'-':>8s}" for p in PERCENTILES
+        )
+        previous = (baseline or {}).get(name)
+        if previous and previous.get('p95_ms') and entry['p95_ms'] is not None:
+            line += f"   p95 {(entry['p95_ms'] / previous['p95_ms'] - 1) * 100:+.1f}% vs baseline"
+        print(line)
+
+
+def wait_until_up(base_url, timeout):
+    import requests
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(base_url + '/health', timeout=1).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f'Server at {base_url} did not come up within {timeout} seconds')
+
+
+def start_gunicorn(port, workers, threads):
+    command = [
+        sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py',
+        '--workers', str(workers), '--threads', str(threads),
+        '--bind', f'127.0.0.1:{port}',
+        "app:create_app('testing')"
+    ]
+    process = subprocess.Popen(command, cwd=BACKEND, env=dict(os.environ))
+    try:
+        wait_until_up(f'http://127.0.0.1:{port}', 30)
+    except Exception:
+        process.terminate()
+        process.wait()
+        raise
+    return process
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument('--gunicorn', action='store_true', help='start a local gunicorn for the run')
+    target.add_argument('--url', help='base URL of a running server')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn worker processes')
+    parser.add_argument('--threads', type=int, default=4, help='gunicorn threads per worker')
+    parser.add_argument('--port', type=int, default=8099, help='gunicorn port')
+    parser.add_argument('--concurrency', type=int, default=8, help='simulated donors running at once')
+    parser.add_argument('--duration', type=float, default=20, help='measured seconds')
+    parser.add_argument('--warmup', type=float, default=3, help='seconds run before measuring')
+    parser.add_argument('--mix', type=parse_mix, default=DEFAULT_MIX, help=f'default: {DEFAULT_MIX}')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    parser.add_argument('--baseline', help='JSON output of an earlier run to compare against')
+    parser.add_argument('--threshold', type=float, default=10, help='allowed regression in percent')
+    args = parser.parse_args()
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+
+    server = None
+    if args.url:
+        target_name = args.url
+        make_client = lambda: HTTPClient(args.url)  # noqa: E731
+    elif args.gunicorn:
+        target_name = f'gunicorn ({args.workers} workers x {args.threads} threads)'
+        server = start_gunicorn(args.port, args.workers, args.threads)
+        make_client = lambda: HTTPClient(f'http://127.0.0.1:{args.port}')  # noqa: E731
+    else:
+        from app import create_app
+
+        target_name = 'in-process'
+        app = create_app('testing')
+        make_client = lambda: InProcessClient(app)  # noqa: E731
+
+    try:
+        run_id = secrets.token_hex(3)
+        donors = [
+            Donor(make_client(), run_id, number, random.Random(args.seed * 1000 + number))
+            for number in range(args.concurrency)
+        ]
+        for donor in donors:
+            donor.setup()
+
+        samples = defaultdict(list)
+        errors = defaultdict(int)
+        lock = threading.Lock()
+        stop = threading.Event()
+        warmup_until = time.perf_counter() + args.warmup
+        threads = [
+            threading.Thread(target=worker, args=(donor, args.mix, warmup_until, stop, samples, errors, lock))
+            for donor in donors
+        ]
+        for thread in threads:
+            thread.start()
+        time.sleep(args.warmup + args.duration)
+        stop.set()
+        measured = time.perf_counter() - warmup_until
+        for thread in threads:
+            thread.join()
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    results = summarize(samples, errors, measured)
+    print(f'{target_name}, {args.concurrency} donors, {measured:.1f}s measured')
+    print_report(results, baseline)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'meta': {
+                    'started_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                    'revision': git_revision(),
+                    'target': target_name,
+                    'concurrency': args.concurrency,
+                    'duration': round(measured, 3),
+                    'warmup': args.warmup,
+                    'mix': args.mix,
+                    'seed': args.seed,
+                    'python': platform.python_version()
+                },
+                'results': results
+            }, f, indent=2)
+        print(f'Results written to {args.output}')
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f'\nRegressions beyond {args.threshold:g}%:')
+            for regression in regressions:
+                print(f'  {regression}')
+            sys.exit(1)
+        print(f'\nNo regression beyond {args.threshold:g}% against {args.baseline}')
+
+
+if __name__ == '__main__':
+    main()
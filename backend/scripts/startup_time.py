@@ -0,0 +1,100 @@
+"""Startup time of gunicorn with and without preloading.
+
+Starts gunicorn with gunicorn.conf.py ``--runs`` times per mode and
+measures the wall time from launching it until ``/health`` first answers.
+Each run then polls ``/health`` until every worker has answered once and
+reads their startup phases (utils/startup.py): ``ready`` is the time from
+the worker's fork to the end of its warmup, ``create_app`` the time spent
+building the app (in the master when preloading, in every worker
+otherwise). Reports medians over the runs.
+
+Uses the DB_* settings of FLASK_ENV (testing by default); the preload and
+warmup queries need a reachable database. See scripts/load_test.py for a
+disposable one.
+
+Usage (from the backend directory):
+
+    DB_PORT=3307 python scripts/startup_time.py --workers 4 --runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from load_test import BACKEND  # noqa: E402
+
+MODES = {'preload': 'true', 'no-preload': 'false'}
+
+
+def measure(mode, workers, port, timeout):
+    import requests
+
+    env = dict(
+        os.environ, FLASK_ENV=os.environ.get('FLASK_ENV', 'testing'), GUNICORN_PRELOAD=MODES[mode],
+        GUNICORN_WORKERS=str(workers), GUNICORN_BIND=f'127.0.0.1:{port}'
+    )
+    url = f'http://127.0.0.1:{port}/health'
+    started = time.monotonic()
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py'],
+        cwd=BACKEND, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        first_response = None
+        seen = {}
+        deadline = started + timeout
+        while len(seen) < workers and time.monotonic() < deadline:
+            try:
+                # A new connection each time, so the workers take turns
+                response = requests.get(url, timeout=1, headers={'Connection': 'close'})
+            except requests.RequestException:
+                time.sleep(0.05)
+                continue
+            if first_response is None:
+                first_response = time.monotonic() - started
+            phases = response.json().get('startup', {})
+            seen[phases.get('pid')] = phases
+        if first_response is None:
+            raise RuntimeError(f'gunicorn did not answer within {timeout} seconds')
+        return {
+            'first_response': first_response,
+            'workers_seen': len(seen),
+            'ready': statistics.mean(phases.get('ready', 0) for phases in seen.values()),
+            'create_app': statistics.mean(phases.get('create_app', 0) for phases in seen.values())
+        }
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--port', type=int, default=8099)
+    parser.add_argument('--timeout', type=float, default=60, help='seconds to wait for every worker of a run')
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    args = parser.parse_args()
+
+    results = {}
+    for mode in MODES:
+        runs = [measure(mode, args.workers, args.port, args.timeout) for _ in range(args.runs)]
+        results[mode] = {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+
+    print(f"{'mode':10s} {'first response s':>16s} {'worker ready s':>14s} {'create_app s':>12s} {'workers seen':>12s}")
+    for mode, entry in results.items():
+        print(f"{mode:10s} {entry['first_response']:16.3f} {entry['ready']:14.3f} "
+              f"{entry['create_app']:12.3f} {entry['workers_seen']:12.0f}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,15 @@
+import os
+import sys
+import types
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+# The package __init__ files re-export the user model and validators, which
+# these tests do not use. Register the packages bare so each module under
+# test imports only what it needs itself.
+for package in ('models', 'utils'):
+    if package not in sys.modules:
+        module = types.ModuleType(package)
+        module.__path__ = [os.path.join(BACKEND, package)]
+        sys.modules[package] = module
@@ -0,0 +1,73 @@
+import time
+
+from utils.cache import TTLCache
+
+
+def test_get_returns_what_was_set():
+    cache = TTLCache()
+    cache.set('a', 1)
+
+    assert cache.get('a') == 1
+    assert cache.get('b') is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_entries_expire_after_the_ttl():
+    cache = TTLCache(ttl=0.01)
+    cache.set('a', 1)
+    time.sleep(0.02)
+
+    assert cache.get('a') is None
+    assert cache.expirations == 1
+
+
+def test_least_recently_used_entry_is_evicted_first():
+    cache = TTLCache(max_entries=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+    assert cache.evictions == 1
+
+
+def test_memory_bound_evicts_and_skips_oversized_values():
+    cache = TTLCache(max_bytes=10, sizeof=len)
+    cache.set('a', 'xxxx')
+    cache.set('b', 'yyyy')
+    cache.set('c', 'zzzz')
+
+    assert cache.get('a') is None
+    assert cache.get('b') == 'yyyy'
+
+    cache.set('big', 'x' * 11)
+    assert cache.get('big') is None
+    assert cache.get('c') == 'zzzz'
+
+
+def test_replacing_an_entry_keeps_the_byte_count():
+    cache = TTLCache(max_bytes=10, sizeof=len)
+    cache.set('a', 'xxxxxx')
+    cache.set('a', 'yyyyyy')
+
+    stats = cache.stats()
+    assert stats['bytes'] == 6
+    assert stats['entries'] == 1
+    assert stats['evictions'] == 0
+
+
+def test_invalidate_and_clear_drop_entries():
+    cache = TTLCache()
+    cache.set('a', 1)
+    cache.set('b', 2)
+
+    cache.invalidate('a')
+    cache.invalidate('missing')
+    assert cache.get('a') is None
+    assert cache.invalidations == 1
+
+    cache.clear()
+    assert cache.get('b') is None
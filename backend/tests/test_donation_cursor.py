@@ -0,0 +1,30 @@
+from datetime import datetime
+
+import pytest
+
+from models.donation import InvalidCursor, decode_cursor, encode_cursor
+
+ROW = {'donation_date': datetime(2024, 2, 15, 11, 0, 30), 'id': 4}
+
+
+@pytest.mark.parametrize('user_id', [None, 3])
+def test_cursor_round_trips(user_id):
+    cursor = encode_cursor(ROW, user_id)
+
+    assert '=' not in cursor
+    assert decode_cursor(cursor, user_id) == (ROW['donation_date'], 4)
+
+
+def test_cursor_is_bound_to_its_query():
+    cursor = encode_cursor(ROW, 3)
+
+    with pytest.raises(InvalidCursor, match='does not belong'):
+        decode_cursor(cursor, 5)
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor, None)
+
+
+@pytest.mark.parametrize('cursor', ['', 'not a cursor', 'e30', 'WyJ4IiwxLG51bGxd'])
+def test_malformed_cursors_are_rejected(cursor):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor, None)
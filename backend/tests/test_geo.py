@@ -0,0 +1,51 @@
+import random
+
+import pytest
+
+from utils.geo import GridIndex, haversine_km
+
+
+def _brute_force(points, lat, lon, radius_km):
+    return {key for key, (point_lat, point_lon) in points.items() if haversine_km(lat, lon, point_lat, point_lon) <= radius_km}
+
+
+def test_haversine_of_one_degree_of_latitude():
+    assert haversine_km(0, 0, 1, 0) == pytest.approx(111.19, abs=0.01)
+
+
+def test_points_across_the_antimeridian_are_found():
+    grid = GridIndex(cell_size=0.5)
+    grid.insert('east', 0.0, 179.9)
+    grid.insert('west', 0.0, -179.9)
+
+    assert {key for key, _ in grid.within(0.0, 179.95, 50)} == {'east', 'west'}
+    assert {key for key, _ in grid.within(0.0, -179.95, 50)} == {'east', 'west'}
+
+
+def test_the_box_is_wide_enough_at_its_pole_ward_edge():
+    grid = GridIndex(cell_size=0.25)
+    # Further east than the radius reaches at the query's own latitude
+    grid.insert('north-east', 72.0, 27.0)
+
+    assert [key for key, _ in grid.within(70.0, 0.0, 1000)] == ['north-east']
+
+
+def test_a_radius_over_the_pole_reaches_every_longitude():
+    grid = GridIndex(cell_size=1.0)
+    grid.insert('far side', 89.5, 180.0 - 10)
+
+    assert [key for key, _ in grid.within(89.5, -10.0, 150)] == ['far side']
+
+
+@pytest.mark.parametrize('cell_size', [0.25, 0.7, 5.0])
+def test_within_matches_a_brute_force_search(cell_size):
+    rng = random.Random(cell_size)
+    grid = GridIndex(cell_size)
+    points = {}
+    for key in range(400):
+        points[key] = (rng.uniform(-90, 90), rng.uniform(-180, 180))
+        grid.insert(key, *points[key])
+
+    for _ in range(100):
+        lat, lon, radius = rng.uniform(-90, 90), rng.uniform(-180, 180), rng.choice([10, 300, 2000, 8000])
+        assert {key for key, _ in grid.within(lat, lon, radius)} == _brute_force(points, lat, lon, radius)
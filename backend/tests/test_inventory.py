@@ -0,0 +1,331 @@
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+import models.inventory as inventory_module
+from models.expiry import LeftoverReserved
+from models.inventory import DeltaCoalescer, InsufficientStock, InventoryService, _Pending, parse_quantity
+
+
+def _wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError('condition not reached')
+        time.sleep(0.001)
+
+
+def _queued(coalescer, key):
+    with coalescer._lock:
+        return len(coalescer._queues.get(key, []))
+
+
+def test_single_caller_applies_its_own_delta():
+    batches = []
+    coalescer = DeltaCoalescer(lambda key, batch: batches.append([pending.amount for pending in batch]))
+
+    item = coalescer.submit('k', 3)
+
+    assert item.lead
+    assert batches == [[3]]
+    assert coalescer._active == set()
+
+
+def test_waiters_are_combined_and_the_oldest_takes_over():
+    started = threading.Event()
+    unblock = threading.Event()
+    batches = []
+
+    def apply_batch(key, batch):
+        batches.append([pending.amount for pending in batch])
+        if len(batches) == 1:
+            started.set()
+            assert unblock.wait(5)
+        for pending in batch:
+            pending.ok = True
+
+    coalescer = DeltaCoalescer(apply_batch)
+    results = {}
+
+    def submit(amount):
+        results[amount] = coalescer.submit('k', amount)
+
+    leader = threading.Thread(target=submit, args=(1,))
+    leader.start()
+    assert started.wait(5)
+
+    followers = []
+    for amount in (2, 3, 4):
+        thread = threading.Thread(target=submit, args=(amount,))
+        thread.start()
+        followers.append(thread)
+        _wait_for(lambda: _queued(coalescer, 'k') == amount - 1)
+
+    unblock.set()
+    for thread in [leader] + followers:
+        thread.join(5)
+
+    # The leader stops after its own delta; the first waiter drains the rest in one batch
+    assert batches == [[1], [2, 3, 4]]
+    assert results[1].lead and results[2].lead
+    assert not results[3].lead and not results[4].lead
+    assert all(results[amount].ok for amount in (1, 2, 3, 4))
+    assert coalescer._active == set()
+    assert coalescer._queues == {}
+
+
+def test_batch_error_is_raised_to_every_caller():
+    started = threading.Event()
+    unblock = threading.Event()
+    calls = []
+
+    def apply_batch(key, batch):
+        calls.append(len(batch))
+        if len(calls) == 1:
+            started.set()
+            assert unblock.wait(5)
+            return
+        raise RuntimeError('write failed')
+
+    coalescer = DeltaCoalescer(apply_batch)
+    errors = []
+
+    def submit(amount):
+        try:
+            coalescer.submit('k', amount)
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    threads = [threading.Thread(target=submit, args=(1,))]
+    threads[0].start()
+    assert started.wait(5)
+    for amount in (2, 3):
+        thread = threading.Thread(target=submit, args=(amount,))
+        thread.start()
+        threads.append(thread)
+        _wait_for(lambda: _queued(coalescer, 'k') == amount - 1)
+
+    unblock.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert calls == [1, 2]
+    assert errors == ['write failed', 'write failed']
+    assert coalescer._active == set()
+
+
+def test_keys_do_not_share_batches():
+    batches = []
+    coalescer = DeltaCoalescer(lambda key, batch: batches.append((key, len(batch))))
+
+    coalescer.submit('a', 1)
+    coalescer.submit('b', 1)
+
+    assert batches == [('a', 1), ('b', 1)]
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('1', Decimal('1')),
+    (2.5, Decimal('2.5')),
+    ('0.01', Decimal('0.01'))
+])
+def test_parse_quantity_accepts_positive_amounts(value, expected):
+    assert parse_quantity(value) == expected
+
+
+@pytest.mark.parametrize('value', ['abc', None, '0', '-1', 'NaN', 'Infinity', '1.001'])
+def test_parse_quantity_rejects_invalid_amounts(value):
+    with pytest.raises(ValueError):
+        parse_quantity(value)
+
+
+class SQLiteDatabase:
+    """Runs the inventory statements on an in-memory SQLite table.
+
+    Only ``transaction()`` is provided, which is all ``_apply_batch`` uses;
+    the statements run unchanged apart from the placeholder style and the
+    row locks, which SQLite does not need behind the transaction lock.
+    """
+
+    def __init__(self, current_stock, reserved_stock=0):
+        self.connection = sqlite3.connect(':memory:', check_same_thread=False, isolation_level=None)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.create_function('NOW', 0, lambda: '2024-01-01 00:00:00')
+        self.connection.execute(
+            "CREATE TABLE blood_inventory (blood_type TEXT PRIMARY KEY, current_stock REAL, "
+            "reserved_stock REAL, expired_stock REAL DEFAULT 0, min_threshold REAL DEFAULT 0, "
+            "max_capacity REAL DEFAULT 0, units_dispensed_today REAL DEFAULT 0, "
+            "units_received_today REAL DEFAULT 0, last_updated TEXT, last_donation_date TEXT, "
+            "last_dispensed_date TEXT, "
+            "CHECK (current_stock >= 0 AND reserved_stock >= 0 AND reserved_stock <= current_stock))"
+        )
+        self.connection.execute(
+            "INSERT INTO blood_inventory (blood_type, current_stock, reserved_stock) VALUES ('O-', ?, ?)",
+            (current_stock, reserved_stock)
+        )
+        self.connection.execute(
+            "CREATE TABLE donations (id INTEGER PRIMARY KEY, blood_type TEXT, quantity REAL, "
+            "status TEXT, collection_bag_number TEXT, expiry_date TEXT, dispensed_at TEXT, expired_at TEXT)"
+        )
+        self.lock = threading.Lock()
+
+    def add_unit(self, quantity, expiry_date=None):
+        self.connection.execute(
+            "INSERT INTO donations (blood_type, quantity, status, expiry_date) VALUES ('O-', ?, 'completed', ?)",
+            (quantity, expiry_date)
+        )
+
+    @contextmanager
+    def transaction(self):
+        with self.lock:
+            self.connection.execute('BEGIN')
+            try:
+                yield SQLiteCursor(self.connection.cursor())
+            except Exception:
+                self.connection.execute('ROLLBACK')
+                raise
+            self.connection.execute('COMMIT')
+
+    def row(self):
+        return dict(self.connection.execute("SELECT * FROM blood_inventory").fetchone())
+
+    def dispensed(self):
+        return [row[0] for row in self.connection.execute("SELECT id FROM donations WHERE dispensed_at IS NOT NULL")]
+
+
+class SQLiteCursor:
+    """pymysql-style cursor: pyformat placeholders, ``execute`` returns the row count."""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def execute(self, query, params=()):
+        query = query.replace(' FOR UPDATE SKIP LOCKED', '')
+        params = tuple(str(value) if isinstance(value, datetime) else value for value in params) \
+            if isinstance(params, tuple) else params
+        if isinstance(params, dict):
+            query = re.sub(r'%\((\w+)\)s', r':\1', query)
+            params = {key: float(value) if isinstance(value, Decimal) else value for key, value in params.items()}
+        else:
+            query = query.replace('%s', '?')
+        self._cursor.execute(query, params)
+        return self._cursor.rowcount
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if row is None:
+            return None
+        # DECIMAL columns come back from pymysql as Decimal
+        return {key: Decimal(str(value)) if isinstance(value, float) else value for key, value in dict(row).items()}
+
+
+def test_concurrent_reservations_never_oversell(monkeypatch):
+    database = SQLiteDatabase(current_stock=1000)
+    monkeypatch.setattr(inventory_module, 'db', database)
+    service = InventoryService()
+    outcomes = []
+
+    def reserve():
+        try:
+            service.reserve('O-', 30)
+            outcomes.append(True)
+        except InsufficientStock:
+            outcomes.append(False)
+
+    threads = [threading.Thread(target=reserve) for _ in range(50)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    # 33 x 30 fits in 1000; every other request is refused rather than oversold
+    assert outcomes.count(True) == 33
+    assert outcomes.count(False) == 17
+    assert database.row()['reserved_stock'] == 990
+
+
+def test_a_batch_that_does_not_fit_is_applied_delta_by_delta(monkeypatch):
+    database = SQLiteDatabase(current_stock=100, reserved_stock=40)
+    monkeypatch.setattr(inventory_module, 'db', database)
+    batch = [_Pending(Decimal(amount)) for amount in ('30', '50', '20')]
+
+    InventoryService._apply_batch(('release', 'O-'), batch)
+
+    # Together they exceed the 40 reserved; in arrival order 30 fits, 50 does not, then 20 cannot
+    assert [pending.ok for pending in batch] == [True, False, False]
+    assert database.row()['reserved_stock'] == 10
+    assert all(pending.row['available_stock'] == 90 for pending in batch)
+
+
+def test_an_operation_that_does_not_fit_raises(monkeypatch):
+    database = SQLiteDatabase(current_stock=100, reserved_stock=80)
+    monkeypatch.setattr(inventory_module, 'db', database)
+    service = InventoryService()
+
+    with pytest.raises(InsufficientStock):
+        service.reserve('O-', 21)
+    assert service.reserve('O-', 20).row['available_stock'] == 0
+    assert database.row()['reserved_stock'] == 100
+
+
+def test_dispensing_takes_whole_bags_first_expiring_first(monkeypatch):
+    database = SQLiteDatabase(current_stock=900)
+    database.add_unit(450, '2099-02-01 00:00:00')
+    database.add_unit(450, '2099-01-01 00:00:00')
+    monkeypatch.setattr(inventory_module, 'db', database)
+
+    item = InventoryService().dispense('O-', 100)
+
+    assert [unit['id'] for unit in item.units] == [2]
+    assert database.dispensed() == [2]
+    # The rest of the opened bag leaves stock with it
+    assert database.row()['current_stock'] == 450
+    assert database.row()['units_dispensed_today'] == 450
+
+
+def test_an_opened_bag_never_takes_reserved_stock(monkeypatch):
+    database = SQLiteDatabase(current_stock=900, reserved_stock=500)
+    database.add_unit(450)
+    database.add_unit(450)
+    monkeypatch.setattr(inventory_module, 'db', database)
+
+    with pytest.raises(InsufficientStock, match='reserved stock'):
+        InventoryService().dispense('O-', 100)
+
+    assert database.row()['current_stock'] == 900
+    assert database.row()['reserved_stock'] == 500
+    assert database.dispensed() == []
+
+
+def test_stock_without_units_is_still_dispensed(monkeypatch):
+    database = SQLiteDatabase(current_stock=2000)
+    database.add_unit(450)
+    monkeypatch.setattr(inventory_module, 'db', database)
+
+    item = InventoryService().dispense('O-', 500)
+
+    assert [unit['id'] for unit in item.units] == [1]
+    assert database.row()['current_stock'] == 1500
+
+
+def test_one_uncoverable_delta_does_not_fail_its_batch(monkeypatch):
+    database = SQLiteDatabase(current_stock=900, reserved_stock=400)
+    database.add_unit(100, '2099-01-01 00:00:00')
+    database.add_unit(450, '2099-02-01 00:00:00')
+    monkeypatch.setattr(inventory_module, 'db', database)
+    batch = [_Pending(Decimal(amount)) for amount in ('100', '100')]
+
+    InventoryService._apply_batch(('dispense', 'O-'), batch)
+
+    # The second delta opens the 450 bag, whose rest would take reserved stock
+    assert batch[0].ok and batch[0].error is None
+    assert [unit['id'] for unit in batch[0].units] == [1]
+    assert isinstance(batch[1].error, LeftoverReserved)
+    assert database.row()['current_stock'] == 800
+    assert database.dispensed() == [1]
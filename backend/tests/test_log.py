@@ -0,0 +1,40 @@
+import json
+import logging
+import queue
+
+from utils.log import JsonFormatter, LocalQueueHandler
+
+
+def _through_queue(emit):
+    records = queue.SimpleQueue()
+    logger = logging.getLogger('tests.log')
+    logger.propagate = False
+    handler = LocalQueueHandler(records)
+    logger.addHandler(handler)
+    try:
+        emit(logger)
+    finally:
+        logger.removeHandler(handler)
+    return json.loads(JsonFormatter().format(records.get_nowait()))
+
+
+def test_exceptions_keep_their_own_field():
+    def emit(logger):
+        try:
+            raise ValueError('boom')
+        except ValueError:
+            logger.exception('Failed %s', 'here', extra={'user_id': 3})
+
+    entry = _through_queue(emit)
+
+    assert entry['message'] == 'Failed here'
+    assert entry['user_id'] == 3
+    assert entry['exception'].startswith('Traceback')
+    assert 'ValueError: boom' in entry['exception']
+
+
+def test_records_without_an_exception_have_no_exception_field():
+    entry = _through_queue(lambda logger: logger.warning('Plain %d', 1))
+
+    assert entry['message'] == 'Plain 1'
+    assert 'exception' not in entry
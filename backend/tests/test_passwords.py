@@ -0,0 +1,45 @@
+import threading
+
+from utils.passwords import PasswordHasher
+
+
+def make_hasher(max_queue=4, max_batch_queue=2):
+    hasher = PasswordHasher()
+    hasher.rounds = 4
+    hasher.max_workers = 1
+    hasher.max_queue = max_queue
+    hasher.max_batch_queue = max_batch_queue
+    return hasher
+
+
+def test_hash_many_preserves_order():
+    hasher = make_hasher()
+    passwords = [f'secret{number}' for number in range(6)]
+
+    hashes = hasher.hash_many(passwords)
+
+    assert [hasher.verify(password, hashed) for password, hashed in zip(passwords, hashes)] == [True] * 6
+    assert not hasher.verify('secret0', hashes[1])
+
+
+def test_a_batch_leaves_queue_slots_for_single_operations():
+    hasher = make_hasher()
+    batch = threading.Thread(target=hasher.hash_many, args=([f'secret{number}' for number in range(40)],))
+    batch.start()
+
+    # Single operations never wait for a slot; they would raise HasherBusy if the batch held them all
+    results = [hasher.verify('secret', hasher.hash('secret'))]
+    while batch.is_alive():
+        results.append(hasher.verify('secret', hasher.hash('secret')))
+    batch.join()
+
+    assert all(results)
+
+
+def test_needs_rehash_compares_the_cost():
+    hasher = make_hasher()
+    hasher.rounds = 5
+
+    assert hasher.needs_rehash(PasswordHasher._hash('secret', 4))
+    assert not hasher.needs_rehash(PasswordHasher._hash('secret', 5))
+    assert hasher.needs_rehash('not a bcrypt hash')
@@ -0,0 +1,182 @@
+import threading
+import time
+
+import pytest
+
+from utils.pool import ConnectionPool, PoolTimeout
+
+
+class FakeConnection:
+    def __init__(self, number):
+        self.number = number
+        self.closed = False
+        self.pings = 0
+
+    def ping(self, reconnect=False):
+        self.pings += 1
+
+    def close(self):
+        self.closed = True
+
+
+def make_pool(**kwargs):
+    opened = []
+
+    def connect():
+        connection = FakeConnection(len(opened) + 1)
+        opened.append(connection)
+        return connection
+
+    return ConnectionPool(connect, **kwargs), opened
+
+
+def _wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError('condition not reached')
+        time.sleep(0.001)
+
+
+def test_connections_are_created_lazily_and_reused():
+    pool, opened = make_pool(max_size=2)
+
+    first = pool.acquire()
+    pool.release(first)
+    again = pool.acquire()
+
+    assert again is first
+    assert len(opened) == 1
+    assert pool.stats()['in_use'] == 1
+
+
+def test_checkout_times_out_when_the_pool_is_exhausted():
+    pool, _ = make_pool(max_size=1, timeout=0.05)
+    pool.acquire()
+
+    started = time.monotonic()
+    with pytest.raises(PoolTimeout):
+        pool.acquire()
+
+    assert time.monotonic() - started >= 0.05
+    stats = pool.stats()
+    assert stats['timeouts'] == 1
+    assert stats['waits'] == 1
+    assert stats['waiting'] == 0
+
+
+def test_waiters_are_served_in_arrival_order():
+    pool, _ = make_pool(max_size=1, timeout=5)
+    held = pool.acquire()
+    order = []
+
+    def wait(name):
+        connection = pool.acquire()
+        order.append(name)
+        pool.release(connection)
+
+    threads = []
+    for name in ('first', 'second'):
+        thread = threading.Thread(target=wait, args=(name,))
+        thread.start()
+        threads.append(thread)
+        _wait_for(lambda: pool.stats()['waiting'] == len(threads))
+
+    pool.release(held)
+    for thread in threads:
+        thread.join(5)
+
+    assert order == ['first', 'second']
+    assert pool.stats()['idle'] == 1
+
+
+def test_a_discarded_connection_hands_its_slot_to_a_waiter():
+    pool, opened = make_pool(max_size=1, timeout=5)
+    broken = pool.acquire()
+    received = []
+
+    thread = threading.Thread(target=lambda: received.append(pool.acquire()))
+    thread.start()
+    _wait_for(lambda: pool.stats()['waiting'] == 1)
+
+    pool.release(broken, discard=True)
+    thread.join(5)
+
+    assert broken.closed
+    assert received == [opened[1]]
+    assert pool.stats()['size'] == 1
+
+
+def test_a_failed_connect_frees_its_slot():
+    attempts = []
+
+    def connect():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise OSError('refused')
+        return FakeConnection(len(attempts))
+
+    pool = ConnectionPool(connect, max_size=1, timeout=0.05)
+
+    with pytest.raises(OSError):
+        pool.acquire()
+    assert pool.stats()['size'] == 0
+    assert pool.acquire().number == 2
+
+
+def test_idle_connections_are_pinged_and_old_ones_recycled():
+    pool, opened = make_pool(max_size=1, ping_interval=0, recycle=3600)
+
+    connection = pool.acquire()
+    pool.release(connection)
+    assert pool.acquire() is connection
+    assert connection.pings == 1
+
+    pool.release(connection)
+    pool.recycle = 1e-9
+    time.sleep(0.001)
+    replacement = pool.acquire()
+
+    assert replacement is opened[1]
+    assert connection.closed
+    assert pool.stats()['recycled'] == 1
+
+
+def test_warm_opens_idle_connections_up_to_the_target():
+    pool, opened = make_pool(min_size=2, max_size=3)
+
+    pool.warm()
+    assert pool.stats()['idle'] == 2
+    pool.warm(5)
+    assert pool.stats()['idle'] == 3
+    assert len(opened) == 3
+
+
+def test_connections_beyond_min_size_are_closed_once_idle():
+    pool, opened = make_pool(min_size=1, max_size=3, idle_timeout=0.01)
+    connections = [pool.acquire() for _ in range(3)]
+    for connection in connections[:2]:
+        pool.release(connection)
+
+    time.sleep(0.02)
+    pool.release(connections[2])
+
+    assert [connection.closed for connection in opened] == [True, True, False]
+    assert pool.stats()['size'] == 1
+    assert pool.stats()['trimmed'] == 2
+
+
+def test_a_discarded_connection_is_replaced_below_min_size():
+    pool, opened = make_pool(min_size=2, max_size=3)
+    pool.warm()
+
+    pool.release(pool.acquire(), discard=True)
+
+    assert pool.stats()['size'] == 2
+    assert pool.stats()['idle'] == 2
+    assert len(opened) == 3
+
+
+def test_max_size_must_be_positive():
+    with pytest.raises(ValueError):
+        ConnectionPool(lambda: None, max_size=0)
@@ -0,0 +1,34 @@
+from utils.profiler import fingerprint
+
+
+def test_values_and_placeholders_become_question_marks():
+    assert fingerprint("SELECT * FROM users WHERE id = 42 AND email = 'a@b.c'") == \
+        'SELECT * FROM users WHERE id = ? AND email = ?'
+    assert fingerprint('SELECT * FROM users WHERE id = %s') == 'SELECT * FROM users WHERE id = ?'
+    assert fingerprint('UPDATE t SET q = %(q)s WHERE k = %(k)s') == 'UPDATE t SET q = ? WHERE k = ?'
+
+
+def test_in_lists_of_any_length_match():
+    short = fingerprint('SELECT id FROM users WHERE id IN (%s, %s)')
+    long = fingerprint('SELECT id FROM users WHERE id IN (1, 2, 3, 4)')
+
+    assert short == long == 'SELECT id FROM users WHERE id IN (?+)'
+
+
+def test_comments_and_whitespace_are_dropped():
+    query = """
+        SELECT id   -- the key
+        FROM /* hint */ users
+        WHERE name = "x"
+    """
+
+    assert fingerprint(query) == 'SELECT id FROM users WHERE name = ?'
+
+
+def test_escaped_quotes_stay_inside_the_literal():
+    assert fingerprint("SELECT 1 FROM t WHERE a = 'it''s' AND b = 'x\\'y'") == \
+        'SELECT ? FROM t WHERE a = ? AND b = ?'
+
+
+def test_identifiers_with_digits_are_kept():
+    assert fingerprint('SELECT col1 FROM t2 LIMIT 10') == 'SELECT col1 FROM t2 LIMIT ?'
@@ -0,0 +1,75 @@
+from datetime import datetime, time, timedelta
+
+from utils.schedule import (
+    MINUTES_PER_DAY, MINUTES_PER_WEEK, WeeklyScheduleIndex, minute_of_week, to_minutes, weekly_intervals
+)
+
+CLOSED = (None, None)
+
+
+def test_to_minutes_accepts_pymysql_and_python_times():
+    assert to_minutes(timedelta(hours=8, minutes=30)) == 510
+    assert to_minutes(time(8, 30)) == 510
+    assert to_minutes('08:30:00') == 510
+    assert to_minutes(None) is None
+
+
+def test_minute_of_week_starts_on_monday():
+    assert minute_of_week(datetime(2024, 1, 1, 0, 0)) == 0
+    assert minute_of_week(datetime(2024, 1, 7, 23, 59)) == MINUTES_PER_WEEK - 1
+
+
+def test_daily_hours_compile_to_week_intervals():
+    hours = [(time(8), time(17))] + [CLOSED] * 6
+
+    assert weekly_intervals(hours) == [(480, 1020)]
+
+
+def test_overnight_hours_merge_and_wrap_past_sunday():
+    hours = [(time(20), time(2)), (time(0), time(6))] + [CLOSED] * 4 + [(time(22), time(1))]
+
+    assert weekly_intervals(hours) == [
+        (0, 60),
+        (20 * 60, MINUTES_PER_DAY + 6 * 60),
+        (6 * MINUTES_PER_DAY + 22 * 60, MINUTES_PER_WEEK)
+    ]
+
+
+def test_open_mask_sets_one_bit_per_open_slot():
+    index = WeeklyScheduleIndex()
+    index.set(0, [(480, 1020)])
+    index.set(3, [(600, 700), (MINUTES_PER_DAY, MINUTES_PER_DAY + 60)])
+
+    assert index.open_mask(0) == 0
+    assert index.open_mask(480) == 0b0001
+    assert index.open_mask(650) == 0b1001
+    assert index.open_mask(700) == 0b0001
+    assert index.open_mask(1020) == 0
+    assert index.open_mask(MINUTES_PER_DAY + 30) == 0b1000
+    # Minutes wrap around the week
+    assert index.open_mask(MINUTES_PER_WEEK + 650) == 0b1001
+
+
+def test_masks_follow_updates_and_removals():
+    index = WeeklyScheduleIndex()
+    index.set(1, [(0, 100)])
+    assert index.open_mask(50) == 0b10
+
+    index.set(1, [(200, 300)])
+    index.set(2, [(0, 100)])
+    assert index.open_mask(50) == 0b100
+    assert index.open_mask(250) == 0b10
+
+    index.remove(2)
+    index.set(1, [])
+    assert index.open_mask(50) == 0
+    assert index.open_mask(250) == 0
+
+
+def test_adjacent_intervals_leave_no_gap():
+    index = WeeklyScheduleIndex()
+    index.set(0, [(0, 100)])
+    index.set(1, [(100, 200)])
+
+    assert index.open_mask(99) == 0b01
+    assert index.open_mask(100) == 0b10
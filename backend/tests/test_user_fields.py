@@ -0,0 +1,34 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from models.user_fields import USER_FIELDS, parse_user_fields, user_etag_values
+
+
+@pytest.mark.parametrize('value', [None, ''])
+def test_no_fields_means_the_full_payload(value):
+    assert parse_user_fields(value) is None
+
+
+def test_id_comes_first_and_duplicates_are_dropped():
+    assert parse_user_fields('email, role,,email,id') == ('id', 'email', 'role')
+
+
+def test_every_public_field_can_be_requested():
+    assert parse_user_fields(','.join(USER_FIELDS)) == USER_FIELDS
+
+
+@pytest.mark.parametrize('value', ['password_hash', 'email,nope'])
+def test_unknown_fields_are_rejected(value):
+    with pytest.raises(ValueError, match='Unknown field'):
+        parse_user_fields(value)
+
+
+def test_a_user_and_its_row_have_the_same_etag_values():
+    row = dict.fromkeys(USER_FIELDS)
+    row.update(id=7, email='a@b.com', is_active=1, is_eligible=0, created_at=datetime(2025, 1, 2, 3, 4))
+    user = SimpleNamespace(**{**row, 'is_active': True, 'is_eligible': False, 'password_hash': 'x'})
+
+    assert user_etag_values(row) == user_etag_values(user)
+    assert user_etag_values(row)[USER_FIELDS.index('created_at')] == '2025-01-02T03:04:00'
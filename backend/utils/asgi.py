@@ -0,0 +1,156 @@
+import logging
+import time
+from urllib.parse import parse_qsl
+from flask_jwt_extended import decode_token
+from flask_jwt_extended.exceptions import WrongTokenError
+from jwt import ExpiredSignatureError, InvalidTokenError
+from werkzeug.http import parse_etags
+from utils.metrics import metrics
+from utils.tokens import denylist
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncRequest:
+    """The parts of an ASGI HTTP request the async views need."""
+
+    def __init__(self, scope, body):
+        self.method = scope['method']
+        self.path = scope['path']
+        self.headers = {name.decode('latin-1').lower(): value.decode('latin-1') for name, value in scope['headers']}
+        self.args = parse_qsl(scope.get('query_string', b'').decode('latin-1'), keep_blank_values=True)
+        self.body = body
+
+    def arg(self, name, default=None):
+        for key, value in self.args:
+            if key == name:
+                return value
+        return default
+
+    def if_none_match(self, etag):
+        return parse_etags(self.headers.get('if-none-match')).contains_weak(etag)
+
+
+class AsyncResponse:
+    """Status, headers and an already encoded body."""
+
+    def __init__(self, status, body=b'', headers=None):
+        self.status = status
+        self.body = body
+        self.headers = dict(headers or {})
+
+
+class AsyncViews:
+    """Serves a few endpoints natively on asyncio and hands the rest to the Flask app.
+
+    ``routes`` maps ``(method, path)`` to ``async def view(views, request)``
+    returning an AsyncResponse. Anything else, CORS preflights included, goes
+    to ``fallback`` (the Flask app wrapped for ASGI), so both stacks share one
+    set of URLs. ``startup`` and ``shutdown`` coroutines run on the server's
+    lifespan events.
+    """
+
+    def __init__(self, app, routes, fallback, startup=(), shutdown=()):
+        self.app = app
+        self.routes = dict(routes)
+        self.fallback = fallback
+        self.startup = list(startup)
+        self.shutdown = list(shutdown)
+        self.cors_origins = set(app.config['CORS_ORIGINS'])
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        view = self.routes.get((scope.get('method'), scope.get('path'))) if scope['type'] == 'http' else None
+        if view is None:
+            await self.fallback(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        request = AsyncRequest(scope, await self._read_body(receive))
+        try:
+            response = await view(self, request)
+        except Exception:
+            logger.exception('Async view error')
+            response = self.json({'success': False, 'message': 'An unexpected error occurred'}, 500)
+        self._cors(request, response)
+        if response.status != 304:
+            response.headers['Content-Length'] = str(len(response.body))
+        await send({
+            'type': 'http.response.start',
+            'status': response.status,
+            'headers': [(name.encode('latin-1'), value.encode('latin-1')) for name, value in response.headers.items()]
+        })
+        await send({'type': 'http.response.body', 'body': response.body})
+        if metrics.enabled:
+            endpoint = f'async.{view.__name__}'
+            metrics.latency.observe(time.perf_counter() - started, method=request.method, endpoint=endpoint)
+            metrics.responses.inc(method=request.method, endpoint=endpoint, status=response.status)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                try:
+                    for hook in self.startup:
+                        await hook()
+                except Exception as e:
+                    logger.exception('ASGI startup error')
+                    await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+                    return
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                for hook in self.shutdown:
+                    try:
+                        await hook()
+                    except Exception:
+                        logger.exception('ASGI shutdown error')
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    @staticmethod
+    async def _read_body(receive):
+        chunks = []
+        while True:
+            message = await receive()
+            chunks.append(message.get('body', b''))
+            if not message.get('more_body'):
+                return b''.join(chunks)
+
+    def _cors(self, request, response):
+        origin = request.headers.get('origin')
+        if origin in self.cors_origins:
+            response.headers['Access-Control-Allow-Origin'] = origin
+            vary = response.headers.get('Vary')
+            response.headers['Vary'] = f'{vary}, Origin' if vary else 'Origin'
+
+    def json(self, obj, status=200, headers=None):
+        """JSON response encoded by the Flask app's provider, like ``jsonify``."""
+        body = self.app.json.dumps(obj).encode() + b'\n'
+        response = AsyncResponse(status, body, headers)
+        response.headers['Content-Type'] = 'application/json'
+        return response
+
+    def authenticate(self, request):
+        """Decode the request's access token as ``@jwt_required()`` would.
+
+        Returns ``(claims, None)``, or ``(None, response)`` with the same
+        error responses as the JWT loaders registered in create_app.
+        """
+        header = request.headers.get('authorization', '')
+        if not header.startswith('Bearer '):
+            return None, self.json({'message': 'Authorization token is required'}, 422)
+        try:
+            with self.app.app_context():
+                claims = decode_token(header[len('Bearer '):])
+        except ExpiredSignatureError:
+            return None, self.json({'message': 'Token has expired'}, 422)
+        except (InvalidTokenError, WrongTokenError) as e:
+            logger.info('JWT error: invalid token: %s', e)
+            return None, self.json({'message': 'Invalid token'}, 422)
+        if claims.get('type') != 'access':
+            return None, self.json({'message': 'Only non-refresh tokens are allowed'}, 422)
+        if denylist.is_revoked(claims):
+            return None, self.json({'message': 'Token has been revoked'}, 401)
+        return claims, None
@@ -0,0 +1,173 @@
+import asyncio
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from config import config
+from utils.pool import PoolTimeout
+
+try:
+    import aiomysql
+except ImportError:
+    aiomysql = None
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncDatabase:
+    """asyncio counterpart of Database for the ASGI entry point (asgi.py).
+
+    Same ``execute_*`` surface, awaited. Connections come from an aiomysql
+    pool opened on the running event loop by ``open()``, so a worker waiting
+    on MySQL holds a coroutine rather than a thread and one process can keep
+    hundreds of requests in flight on ASYNC_DB_POOL_MAX_SIZE connections.
+
+    Each ``execute_*`` call runs on its own autocommitted connection; use
+    ``transaction()`` for statements that must commit together. There is no
+    request-scoped unit of work and no replica routing here.
+    """
+
+    def __init__(self):
+        config_name = os.environ.get('FLASK_ENV', 'development')
+        self.config = config[config_name]
+        self._pool = None
+        self._observers = []
+
+    async def open(self):
+        """Create the pool on the current event loop; call from the ASGI lifespan startup."""
+        if aiomysql is None:
+            raise RuntimeError('AsyncDatabase requires aiomysql (pip install aiomysql)')
+        if self._pool is not None:
+            return
+        self._pool = await aiomysql.create_pool(
+            host=self.config.DB_HOST,
+            port=self.config.DB_PORT,
+            user=self.config.DB_USER,
+            password=self.config.DB_PASSWORD,
+            db=self.config.DB_NAME,
+            minsize=self.config.ASYNC_DB_POOL_MIN_SIZE,
+            maxsize=self.config.ASYNC_DB_POOL_MAX_SIZE,
+            pool_recycle=self.config.DB_POOL_RECYCLE,
+            cursorclass=aiomysql.DictCursor,
+            autocommit=True
+        )
+
+    async def close(self):
+        """Close every connection; call from the ASGI lifespan shutdown."""
+        if self._pool is None:
+            return
+        pool, self._pool = self._pool, None
+        pool.close()
+        await pool.wait_closed()
+
+    def add_observer(self, observer):
+        """Call ``observer(query, elapsed_seconds, rows)`` after every execute_* call, as Database does."""
+        if observer not in self._observers:
+            self._observers.append(observer)
+
+    def _observe(self, query, started, rows):
+        elapsed = time.perf_counter() - started
+        for observer in self._observers:
+            try:
+                observer(query, elapsed, rows)
+            except Exception:
+                logger.exception('Query observer error')
+
+    def pool_stats(self):
+        """Return connection pool statistics."""
+        if self._pool is None:
+            return {'size': 0, 'in_use': 0, 'idle': 0}
+        return {
+            'size': self._pool.size,
+            'in_use': self._pool.size - self._pool.freesize,
+            'idle': self._pool.freesize,
+            'max_size': self._pool.maxsize
+        }
+
+    @asynccontextmanager
+    async def _connection(self):
+        if self._pool is None:
+            raise RuntimeError('AsyncDatabase is not open; await open() on the serving event loop first')
+        try:
+            connection = await asyncio.wait_for(self._pool.acquire(), self.config.DB_POOL_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise PoolTimeout(f'No database connection available within {self.config.DB_POOL_TIMEOUT} seconds')
+        try:
+            yield connection
+        finally:
+            self._pool.release(connection)
+
+    @asynccontextmanager
+    async def get_cursor(self):
+        """Cursor on an autocommitted pooled connection."""
+        async with self._connection() as connection:
+            cursor = await connection.cursor()
+            try:
+                yield cursor
+            except Exception as e:
+                logger.error('Database operation error: %s', e)
+                raise
+            finally:
+                await cursor.close()
+
+    @asynccontextmanager
+    async def transaction(self):
+        """Run a block in one transaction, committed when it exits."""
+        async with self._connection() as connection:
+            await connection.begin()
+            cursor = await connection.cursor()
+            try:
+                yield cursor
+                await connection.commit()
+            except Exception as e:
+                await connection.rollback()
+                logger.error('Database operation error: %s', e)
+                raise
+            finally:
+                await cursor.close()
+
+    async def execute_query(self, query, params=None):
+        """Execute a query and return results."""
+        async with self.get_cursor() as cursor:
+            started = time.perf_counter()
+            await cursor.execute(query, params or ())
+            rows = await cursor.fetchall()
+            self._observe(query, started, len(rows))
+            return rows
+
+    async def execute_single(self, query, params=None):
+        """Execute a query and return single result."""
+        async with self.get_cursor() as cursor:
+            started = time.perf_counter()
+            await cursor.execute(query, params or ())
+            row = await cursor.fetchone()
+            self._observe(query, started, 0 if row is None else 1)
+            return row
+
+    async def execute_insert(self, query, params=None):
+        """Execute an insert query and return the inserted ID."""
+        async with self.get_cursor() as cursor:
+            started = time.perf_counter()
+            await cursor.execute(query, params or ())
+            self._observe(query, started, cursor.rowcount)
+            return cursor.lastrowid
+
+    async def execute_update(self, query, params=None):
+        """Execute an update/delete query and return affected rows."""
+        async with self.get_cursor() as cursor:
+            started = time.perf_counter()
+            await cursor.execute(query, params or ())
+            self._observe(query, started, cursor.rowcount)
+            return cursor.rowcount
+
+    async def execute_many(self, query, params_seq):
+        """Execute a statement once per parameter set in one transaction and return affected rows."""
+        async with self.transaction() as cursor:
+            started = time.perf_counter()
+            await cursor.executemany(query, params_seq)
+            self._observe(query, started, cursor.rowcount)
+            return cursor.rowcount
+
+
+# Global async database instance
+async_db = AsyncDatabase()
@@ -0,0 +1,197 @@
+import fcntl
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """Thread-safe LRU cache with per-entry expiry and a memory bound.
+
+    Entries are evicted least-recently-used first once either ``max_entries``
+    or ``max_bytes`` is exceeded. ``sizeof`` estimates the footprint of a value
+    in bytes; it defaults to ``sys.getsizeof``.
+    """
+
+    def __init__(self, max_entries=10000, max_bytes=16 * 1024 * 1024, ttl=60, sizeof=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._sizeof = sizeof or sys.getsizeof
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        """Return the cached value for ``key`` or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, expires_at, size = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self._bytes -= size
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        """Store ``value`` under ``key``, evicting old entries if needed."""
+        size = self._sizeof(value)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+
+            self._entries[key] = (value, time.monotonic() + self.ttl, size)
+            self._bytes += size
+
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def invalidate(self, key):
+        """Drop ``key`` from the cache."""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._bytes -= entry[2]
+                self.invalidations += 1
+
+    def clear(self):
+        """Drop every entry."""
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """Return cache counters."""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations
+            }
+
+
+class FileChannel:
+    """Broadcast short messages between processes through an append-only file.
+
+    ``publish`` appends one line per message (appends of a single short line
+    are atomic with ``O_APPEND``). ``poll`` returns lines written since the
+    last poll by any process; it costs a single ``stat`` call when nothing has
+    changed. If the file is truncated or replaced, ``poll`` reports a reset so
+    subscribers can drop all derived state.
+
+    Once the file grows past ``max_bytes``, the publisher that crossed the
+    limit rewrites it with ``compact(lines)``, by default nothing, and
+    swaps it in; subscribers see that as a reset and replay what was kept.
+    Publishing and compacting hold an exclusive ``flock`` on the file, so
+    no message is appended to a file that is being replaced.
+    """
+
+    def __init__(self, path, replay=False, max_bytes=1024 * 1024, compact=None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._compact = compact or (lambda lines: [])
+        # Raised after a compaction that kept a lot, so it is not redone on every publish
+        self._limit = max_bytes
+        self._lock = threading.Lock()
+        self._offset = 0
+        self._inode = None
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        if not replay:
+            try:
+                stat = os.stat(path)
+                self._offset = stat.st_size
+                self._inode = stat.st_ino
+            except FileNotFoundError:
+                pass
+
+    def publish(self, message):
+        """Append ``message`` (which must not contain newlines) to the channel."""
+        fd = self._open_locked()
+        try:
+            os.write(fd, f'{message}\n'.encode('utf-8'))
+            if self.max_bytes and os.fstat(fd).st_size > self._limit:
+                self._rewrite()
+        finally:
+            # Also releases the lock
+            os.close(fd)
+
+    def _open_locked(self):
+        """Open the current file for appending, holding its lock."""
+        while True:
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                if os.stat(self.path).st_ino == os.fstat(fd).st_ino:
+                    return fd
+            except FileNotFoundError:
+                pass
+            # Replaced by a compaction while we waited for the lock
+            os.close(fd)
+
+    def _rewrite(self):
+        """Replace the file with the lines ``compact`` keeps (called with the lock held)."""
+        with open(self.path, 'rb') as channel:
+            lines = [line for line in channel.read().decode('utf-8').splitlines() if line]
+        data = ''.join(f'{line}\n' for line in self._compact(lines)).encode('utf-8')
+
+        temporary = f'{self.path}.{os.getpid()}.tmp'
+        with open(os.open(temporary, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 'wb') as channel:
+            channel.write(data)
+        os.replace(temporary, self.path)
+        self._limit = max(self.max_bytes, 2 * len(data))
+
+    def poll(self):
+        """Return ``(messages, reset)`` for everything published since the last poll."""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return [], False
+
+        with self._lock:
+            reset = False
+            if self._inode is not None and (stat.st_ino != self._inode or stat.st_size < self._offset):
+                self._offset = 0
+                reset = True
+            self._inode = stat.st_ino
+
+            if stat.st_size == self._offset:
+                return [], reset
+
+            with open(self.path, 'rb') as channel:
+                channel.seek(self._offset)
+                data = channel.read(stat.st_size - self._offset)
+
+            # Leave a partially written trailing line for the next poll
+            end = data.rfind(b'\n') + 1
+            self._offset += end
+            lines = data[:end].decode('utf-8').splitlines()
+            return [line for line in lines if line], reset
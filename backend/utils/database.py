@@ -1,71 +1,470 @@
+import logging
 import pymysql
+import threading
+import time
 from contextlib import contextmanager
+from flask import g, has_request_context, jsonify, request
+from flask_jwt_extended import get_jwt_identity
 from config import config
+from functools import partial
+from utils.cache import FileChannel
+from utils.pool import ConnectionPool
+from utils.replicas import Replica, ReplicaSet, SessionPins, is_plain_read, parse_replicas
 import os
 
+logger = logging.getLogger(__name__)
+
+# Returned by _replica_read when the read has to go to the primary after all
+_PRIMARY = object()
+
+# Requests whose reads may come from a replica; any other method may write back what it reads
+_REPLICA_METHODS = ('GET', 'HEAD')
+
+class UnitOfWork:
+    """A connection and transaction shared by every query in one request."""
+    
+    def __init__(self, connection):
+        self.connection = connection
+        self.failed = False
+        self.callbacks = []
+
 class Database:
     """Database connection manager for VitaPink BloodBank."""
     
     def __init__(self):
         config_name = os.environ.get('FLASK_ENV', 'development')
         self.config = config[config_name]
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._replicas = None
+        self._pins = None
+        self._request_scoped = False
+        self._observers = []
+        self._cursor_wrapper = None
+    
+    def init_app(self, app):
+        """Share one lazily-opened connection per request, committed once at the end."""
+        self._request_scoped = True
+        app.after_request(self._finish_request)
+        app.teardown_request(self._teardown_request)
+    
+    def add_observer(self, observer):
+        """Call ``observer(query, elapsed_seconds, rows)`` after every execute_* call.
+        
+        ``rows`` is the number of rows returned or affected. Observers must be cheap and must not raise; they run on the request
+        thread.
+        """
+        if observer not in self._observers:
+            self._observers.append(observer)
+    
+    def _observe(self, query, started, rows):
+        elapsed = time.perf_counter() - started
+        for observer in self._observers:
+            try:
+                observer(query, elapsed, rows)
+            except Exception:
+                logger.exception('Query observer error')
+    
+    def set_cursor_wrapper(self, wrapper):
+        """Pass every cursor of get_cursor and transaction through ``wrapper(cursor)``."""
+        self._cursor_wrapper = wrapper
+    
+    def _cursor(self, connection):
+        cursor = connection.cursor()
+        if self._cursor_wrapper is not None:
+            cursor = self._cursor_wrapper(cursor)
+        return cursor
+    
+    @property
+    def pool(self):
+        """Connection pool, created on first use."""
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = self._new_pool(self._connect)
+        return self._pool
+    
+    @property
+    def replicas(self):
+        """Read replicas from DB_REPLICAS, created on first use; empty if none are configured."""
+        if self._replicas is None:
+            with self._pool_lock:
+                if self._replicas is None:
+                    replicas = ReplicaSet(
+                        [
+                            # Autocommit, so every read sees what the replica has applied so far
+                            Replica(host, port, weight, self._new_pool(partial(self._connect, host, port, autocommit=True)))
+                            for host, port, weight in parse_replicas(self.config.DB_REPLICAS)
+                        ],
+                        max_lag=self.config.DB_REPLICA_MAX_LAG,
+                        check_interval=self.config.DB_REPLICA_CHECK_INTERVAL,
+                        lag_query=self.config.DB_REPLICA_LAG_QUERY
+                    )
+                    if replicas:
+                        self._pins = SessionPins(
+                            self.config.DB_READ_YOUR_WRITES_WINDOW,
+                            FileChannel(
+                                self.config.DB_READ_YOUR_WRITES_CHANNEL_PATH, replay=True,
+                                max_bytes=self.config.CHANNEL_MAX_BYTES, compact=SessionPins.compact
+                            )
+                        )
+                    self._replicas = replicas
+        return self._replicas
+    
+    def _new_pool(self, connect):
+        return ConnectionPool(
+            connect,
+            min_size=self.config.DB_POOL_MIN_SIZE,
+            max_size=self.config.DB_POOL_MAX_SIZE,
+            timeout=self.config.DB_POOL_TIMEOUT,
+            recycle=self.config.DB_POOL_RECYCLE,
+            ping_interval=self.config.DB_POOL_PING_INTERVAL,
+            idle_timeout=self.config.DB_POOL_IDLE_TIMEOUT
+        )
+    
+    def _connect(self, host=None, port=None, autocommit=False):
+        """Open a new physical database connection, to the primary unless ``host`` is given."""
+        return pymysql.connect(
+            host=host or self.config.DB_HOST,
+            port=port or self.config.DB_PORT,
+            user=self.config.DB_USER,
+            password=self.config.DB_PASSWORD,
+            database=self.config.DB_NAME,
+            cursorclass=pymysql.cursors.DictCursor,
+            autocommit=autocommit
+        )
         
     def get_connection(self):
-        """Get a database connection."""
+        """Check out a database connection from the pool."""
         try:
-            connection = pymysql.connect(
-                host=self.config.DB_HOST,
-                port=self.config.DB_PORT,
-                user=self.config.DB_USER,
-                password=self.config.DB_PASSWORD,
-                database=self.config.DB_NAME,
-                cursorclass=pymysql.cursors.DictCursor,
-                autocommit=False
-            )
-            return connection
+            return self.pool.acquire()
         except Exception as e:
-            print(f"Database connection error: {e}")
+            logger.error('Database connection error: %s', e)
             raise
     
+    def release_connection(self, connection, discard=False):
+        """Return a connection to the pool, closing it if ``discard`` is set."""
+        self.pool.release(connection, discard=discard)
+    
+    def pool_stats(self):
+        """Return connection pool statistics."""
+        if self._pool is None:
+            return {'size': 0, 'in_use': 0, 'idle': 0}
+        return self._pool.stats()
+    
+    def replica_stats(self):
+        """Return the health and last measured lag of each read replica."""
+        if not self._replicas:
+            return []
+        return self._replicas.stats()
+    
+    def _session_key(self):
+        """Identity of the current request's JWT, if it has been verified."""
+        try:
+            return get_jwt_identity()
+        except RuntimeError:
+            return None
+    
+    def pin_session(self, key=None):
+        """Send the reads of session ``key`` to the primary for a while.
+        
+        Called after every commit made during a request, with the request's
+        JWT identity, so a client reads its own writes while replicas catch
+        up. Requests that create a session without a token yet (registration)
+        pass the new identity themselves. Pins are shared by the workers of
+        a host through DB_READ_YOUR_WRITES_CHANNEL_PATH.
+        """
+        if not self.replicas:
+            return
+        if key is None and has_request_context():
+            key = self._session_key()
+        if key is not None:
+            self._pins.pin(str(key))
+    
+    def _replica_for(self, query):
+        """Replica that may answer ``query``, or None if it must go to the primary.
+        
+        Only plain reads of GET and HEAD requests qualify. Handlers of other
+        methods read rows to change and save them, so a lagging copy would
+        be written back over newer data; reads outside a request (commands,
+        background jobs) are treated the same way.
+        """
+        replicas = self.replicas
+        if not replicas or not is_plain_read(query):
+            return None
+        if not (self._request_scoped and has_request_context()) or request.method not in _REPLICA_METHODS:
+            return None
+        # Reads after a write in the same request must see the uncommitted write
+        if g.get('_db_primary') or g.get('_db_unit_of_work') is not None:
+            return None
+        key = self._session_key()
+        if key is not None and self._pins.is_pinned(str(key)):
+            return None
+        return replicas.pick()
+    
+    @contextmanager
+    def primary(self):
+        """Send the reads made in this block to the primary.
+        
+        For reads in a GET request whose result outlives it, such as a
+        cache fill; everywhere else reads already go to the primary.
+        """
+        if not has_request_context():
+            yield
+            return
+        depth = g.get('_db_primary', 0)
+        g._db_primary = depth + 1
+        try:
+            yield
+        finally:
+            g._db_primary = depth
+    
+    def _replica_read(self, query, params, fetch):
+        """Run a plain read on a replica and return ``fetch(cursor)``.
+        
+        Returns _PRIMARY when no replica may take it. A replica that fails
+        with a connection error is ejected and the read retried on the
+        primary by the caller.
+        """
+        replica = self._replica_for(query)
+        if replica is None:
+            return _PRIMARY
+        try:
+            connection = replica.pool.acquire()
+        except Exception as e:
+            self.replicas.eject(replica, f'connection failed: {e}')
+            return _PRIMARY
+        
+        cursor = None
+        discard = False
+        try:
+            cursor = self._cursor(connection)
+            started = time.perf_counter()
+            cursor.execute(query, params or ())
+            result = fetch(cursor)
+            self._observe(query, started, len(result) if isinstance(result, (list, tuple)) else int(result is not None))
+            return result
+        except (pymysql.err.OperationalError, pymysql.err.InterfaceError) as e:
+            discard = True
+            self.replicas.eject(replica, f'read failed: {e}')
+            return _PRIMARY
+        finally:
+            if cursor is not None:
+                cursor.close()
+            replica.pool.release(connection, discard=discard)
+    
+    def _unit_of_work(self):
+        """Return the current request's unit of work, opening it on first use."""
+        unit = g.get('_db_unit_of_work')
+        if unit is None:
+            unit = UnitOfWork(self.get_connection())
+            g._db_unit_of_work = unit
+        return unit
+    
+    def _finish_request(self, response):
+        """Commit the request's transaction, or roll it back on an error response."""
+        unit = g.pop('_db_unit_of_work', None)
+        if unit is None:
+            return response
+        
+        discard = False
+        committed = False
+        try:
+            if unit.failed or response.status_code >= 400:
+                unit.connection.rollback()
+            else:
+                unit.connection.commit()
+                committed = True
+                self.pin_session()
+        except Exception as e:
+            logger.error('Database commit error: %s', e)
+            discard = True
+            try:
+                unit.connection.rollback()
+            except Exception:
+                pass
+            response = jsonify({
+                'success': False,
+                'message': 'Failed to save changes'
+            })
+            response.status_code = 500
+        finally:
+            self.release_connection(unit.connection, discard=discard)
+        
+        if committed:
+            for callback in unit.callbacks:
+                try:
+                    callback()
+                except Exception as e:
+                    logger.exception('After-commit callback error: %s', e)
+        return response
+    
+    def _teardown_request(self, exc):
+        """Roll back and release a connection left open by an unhandled error."""
+        unit = g.pop('_db_unit_of_work', None)
+        if unit is None:
+            return
+        
+        discard = False
+        try:
+            unit.connection.rollback()
+        except Exception:
+            discard = True
+        self.release_connection(unit.connection, discard=discard)
+    
+    def in_transaction(self):
+        """True if the current request already has an open unit of work."""
+        return (self._request_scoped and has_request_context()
+                and g.get('_db_unit_of_work') is not None)
+    
+    def after_commit(self, callback):
+        """Run ``callback`` once the current request's transaction commits.
+        
+        Outside a request, or before the request has touched the database,
+        there is nothing pending and the callback runs immediately.
+        """
+        if self.in_transaction():
+            g._db_unit_of_work.callbacks.append(callback)
+        else:
+            callback()
+    
     @contextmanager
     def get_cursor(self):
-        """Context manager for database operations."""
+        """Context manager for database operations.
+        
+        Inside a request the cursor comes from the request's unit of work and
+        nothing is committed until the response is ready; elsewhere each block
+        runs in its own transaction.
+        """
+        if self._request_scoped and has_request_context():
+            unit = self._unit_of_work()
+            cursor = self._cursor(unit.connection)
+            try:
+                yield cursor
+            except Exception as e:
+                unit.failed = True
+                logger.error('Database operation error: %s', e)
+                raise
+            finally:
+                cursor.close()
+            return
+        
+        with self.transaction() as cursor:
+            yield cursor
+    
+    @contextmanager
+    def transaction(self):
+        """Run a block in its own transaction on a dedicated connection.
+        
+        Unlike get_cursor this commits when the block exits, even inside a
+        request, so callers can make progress independently of the request's
+        unit of work.
+        """
         connection = self.get_connection()
+        cursor = None
+        discard = False
         try:
-            cursor = connection.cursor()
+            cursor = self._cursor(connection)
             yield cursor
             connection.commit()
+            if has_request_context():
+                self.pin_session()
         except Exception as e:
-            connection.rollback()
-            print(f"Database operation error: {e}")
+            # A connection that failed at the protocol level cannot be reused
+            discard = isinstance(e, (pymysql.err.OperationalError, pymysql.err.InterfaceError))
+            try:
+                connection.rollback()
+            except Exception:
+                discard = True
+            logger.error('Database operation error: %s', e)
             raise
         finally:
-            cursor.close()
-            connection.close()
+            if cursor is not None:
+                cursor.close()
+            self.release_connection(connection, discard=discard)
     
     def execute_query(self, query, params=None):
-        """Execute a query and return results."""
+        """Execute a query and return results.
+        
+        Plain SELECTs of GET requests go to a read replica when one is
+        configured, healthy, and the session has not written recently.
+        """
+        rows = self._replica_read(query, params, lambda cursor: cursor.fetchall())
+        if rows is not _PRIMARY:
+            return rows
         with self.get_cursor() as cursor:
+            started = time.perf_counter()
             cursor.execute(query, params or ())
-            return cursor.fetchall()
+            rows = cursor.fetchall()
+            self._observe(query, started, len(rows))
+            return rows
     
     def execute_single(self, query, params=None):
-        """Execute a query and return single result."""
+        """Execute a query and return single result, from a replica like execute_query."""
+        row = self._replica_read(query, params, lambda cursor: cursor.fetchone())
+        if row is not _PRIMARY:
+            return row
         with self.get_cursor() as cursor:
+            started = time.perf_counter()
             cursor.execute(query, params or ())
-            return cursor.fetchone()
+            row = cursor.fetchone()
+            self._observe(query, started, 0 if row is None else 1)
+            return row
     
     def execute_insert(self, query, params=None):
         """Execute an insert query and return the inserted ID."""
         with self.get_cursor() as cursor:
+            started = time.perf_counter()
             cursor.execute(query, params or ())
+            self._observe(query, started, cursor.rowcount)
             return cursor.lastrowid
     
     def execute_update(self, query, params=None):
         """Execute an update/delete query and return affected rows."""
         with self.get_cursor() as cursor:
+            started = time.perf_counter()
             cursor.execute(query, params or ())
+            self._observe(query, started, cursor.rowcount)
             return cursor.rowcount
+    
+    def execute_many(self, query, params_seq):
+        """Execute a statement once per parameter set and return affected rows."""
+        with self.get_cursor() as cursor:
+            started = time.perf_counter()
+            cursor.executemany(query, params_seq)
+            self._observe(query, started, cursor.rowcount)
+            return cursor.rowcount
+    
+    def stream(self, query, params=None, batch_size=1000):
+        """Yield the rows of a large query in lists of up to ``batch_size``.
+        
+        Rows are read with an unbuffered server-side cursor on a dedicated
+        connection outside the pool, so memory stays flat whatever the size
+        of the result and a long export never holds a pooled connection. If
+        the consumer stops early, the connection is closed rather than
+        drained.
+        """
+        connection = self._connect()
+        cursor = None
+        finished = False
+        try:
+            cursor = connection.cursor(pymysql.cursors.SSDictCursor)
+            # A slow client must not make the server give up on the result
+            cursor.execute("SET SESSION net_write_timeout = %s", (self.config.DB_STREAM_NET_WRITE_TIMEOUT,))
+            cursor.execute(query, params or ())
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield rows
+            finished = True
+        finally:
+            try:
+                if finished and cursor is not None:
+                    cursor.close()
+                connection.close()
+            except Exception:
+                pass
 
 # Global database instance
-db = Database() 
\ No newline at end of file
+db = Database()
@@ -0,0 +1,41 @@
+import hashlib
+from flask import current_app, make_response, request
+
+# Bump when the JSON layout of a cached resource changes
+REPRESENTATION_VERSION = 1
+
+
+def compute_etag(*parts):
+    """Strong ETag for the current request from the values its body depends on.
+
+    The path and query string are always included, so every filter or
+    ``fields`` combination gets its own tag.
+    """
+    return etag_for(request.path, request.args.items(multi=True), *parts)
+
+
+def etag_for(path, args, *parts):
+    """compute_etag for an explicit path and ``(name, value)`` query pairs, outside Flask."""
+    state = (REPRESENTATION_VERSION, path, sorted(args), parts)
+    return hashlib.blake2b(repr(state).encode(), digest_size=16).hexdigest()
+
+
+def conditional_response(etag, cache_control, build, vary=None):
+    """Answer 304 when the client already holds ``etag``, otherwise ``build()``.
+
+    ``build`` returns anything a view may return and is only called on a
+    miss, so a revalidated poll never queries or serializes the body. Only
+    successful responses carry the validators.
+    """
+    if request.if_none_match.contains_weak(etag):
+        response = current_app.response_class(status=304)
+    else:
+        response = make_response(build())
+        if response.status_code != 200:
+            return response
+
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = cache_control
+    for header in vary or ():
+        response.vary.add(header)
+    return response
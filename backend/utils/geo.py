@@ -0,0 +1,107 @@
+import math
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LAT = 111.32
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance between two points in kilometres."""
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class GridIndex:
+    """Uniform lat/lon grid for radius queries over a set of points.
+
+    Points are bucketed into square cells of ``cell_size`` degrees. A radius
+    query only visits the cells overlapping the query's bounding box, so its
+    cost depends on how many points are nearby rather than on the total.
+    Longitudes wrap around, so a box crossing the antimeridian visits the
+    columns on both sides, and a box reaching a pole spans every column.
+    """
+
+    def __init__(self, cell_size=0.25):
+        self.cell_size = cell_size
+        self._columns = math.ceil(360.0 / cell_size)
+        self._cells = {}
+        self._points = {}
+
+    def __len__(self):
+        return len(self._points)
+
+    def _row(self, lat):
+        return math.floor(lat / self.cell_size)
+
+    def _column(self, lon):
+        # The last column is narrower when cell_size does not divide 360
+        return min(self._columns - 1, math.floor(((lon + 180.0) % 360.0) / self.cell_size))
+
+    def _cell(self, lat, lon):
+        return (self._row(lat), self._column(lon))
+
+    def insert(self, key, lat, lon):
+        """Add or move a point."""
+        self.remove(key)
+        cell = self._cell(lat, lon)
+        self._cells.setdefault(cell, set()).add(key)
+        self._points[key] = (lat, lon, cell)
+
+    def remove(self, key):
+        """Remove a point if present."""
+        point = self._points.pop(key, None)
+        if point is None:
+            return
+        bucket = self._cells.get(point[2])
+        if bucket is not None:
+            bucket.discard(key)
+            if not bucket:
+                del self._cells[point[2]]
+
+    def _columns_within(self, lon, lon_span):
+        """Columns overlapping ``lon ± lon_span``, wrapping across the antimeridian."""
+        if 2 * lon_span + self.cell_size >= 360.0:
+            return range(self._columns)
+        first = self._column(lon - lon_span)
+        last = self._column(lon + lon_span)
+        if first <= last:
+            return range(first, last + 1)
+        return [*range(first, self._columns), *range(0, last + 1)]
+
+    def within(self, lat, lon, radius_km):
+        """Return ``(key, distance_km)`` pairs within ``radius_km``, unsorted."""
+        lat_span = radius_km / KM_PER_DEGREE_LAT
+        # Meridians converge pole-ward, so the box is widest at its highest |lat|
+        max_lat = abs(lat) + lat_span
+        cos_lat = math.cos(math.radians(max_lat)) if max_lat < 90.0 else 0.0
+        lon_span = 180.0 if cos_lat < 1e-6 else min(180.0, radius_km / (KM_PER_DEGREE_LAT * cos_lat))
+
+        row_min = self._row(max(-90.0, lat - lat_span))
+        row_max = self._row(min(90.0, lat + lat_span))
+        columns = self._columns_within(lon, lon_span)
+
+        # For very large radii it is cheaper to walk the occupied cells
+        if (row_max - row_min + 1) * len(columns) > len(self._cells):
+            wanted = set(columns)
+            cells = [
+                cell for cell in self._cells
+                if row_min <= cell[0] <= row_max and cell[1] in wanted
+            ]
+        else:
+            cells = [
+                (row, col)
+                for row in range(row_min, row_max + 1)
+                for col in columns
+            ]
+
+        results = []
+        for cell in cells:
+            for key in self._cells.get(cell, ()):
+                point_lat, point_lon, _ = self._points[key]
+                distance = haversine_km(lat, lon, point_lat, point_lon)
+                if distance <= radius_km:
+                    results.append((key, distance))
+        return results
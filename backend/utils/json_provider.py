@@ -0,0 +1,51 @@
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """JSON provider that encodes with orjson when it is installed.
+
+    Output matches the default provider: keys are sorted, dates go through
+    Flask's ``default`` hook (HTTP dates, ``Decimal`` as string) and debug
+    responses are indented. orjson writes UTF-8 instead of ``\\u`` escapes,
+    which decodes to the same values. Anything orjson refuses (integers
+    wider than 64 bits, for instance) falls back to the standard library
+    encoder, as does everything when orjson is missing.
+    """
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.fast = orjson is not None
+
+    def dumps(self, obj, **kwargs):
+        if self.fast and not kwargs:
+            try:
+                return self._encode(obj, indent=False).decode()
+            except TypeError:
+                pass
+        return super().dumps(obj, **kwargs)
+
+    def response(self, *args, **kwargs):
+        if self.fast:
+            obj = self._prepare_response_obj(args, kwargs)
+            indent = (self.compact is None and self._app.debug) or self.compact is False
+            try:
+                body = self._encode(obj, indent=indent)
+            except TypeError:
+                pass
+            else:
+                return self._app.response_class(body + b'\n', mimetype=self.mimetype)
+        return super().response(*args, **kwargs)
+
+    def _encode(self, obj, indent):
+        # Dates are handed to ``default`` so they serialize exactly as with the stdlib encoder
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=self.default, option=option)
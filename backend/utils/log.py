@@ -0,0 +1,106 @@
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import time
+
+# Attributes every LogRecord has; anything else came in through ``extra``
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+_listener = None
+_listener_pid = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message and ``extra`` fields."""
+
+    def format(self, record):
+        entry = {
+            'ts': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(record.created)) + f'.{int(record.msecs):03d}Z',
+            'level': record.levelname.lower(),
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class LocalQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler for a listener in the same process.
+
+    The stock ``prepare`` renders the traceback into the message and drops
+    ``exc_info`` so records can be pickled; here they never leave the
+    process, so the exception is kept for JsonFormatter to put in its own
+    field (and formatted on the listener thread, not the request's).
+    """
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        return record
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps only a fraction of the records at or below ``level``; the rest always pass."""
+
+    def __init__(self, rate, level=logging.DEBUG):
+        super().__init__()
+        self.rate = rate
+        self.level = level
+
+    def filter(self, record):
+        return record.levelno > self.level or self.rate >= 1 or random.random() < self.rate
+
+
+def configure_logging(app):
+    """Route every log record through a queue to a background writer.
+
+    Request threads only enqueue the record; formatting and the write to
+    stdout happen on the listener thread. DEBUG records are sampled at
+    LOG_DEBUG_SAMPLE_RATE; everything above is always kept. Safe to
+    call again in a forked worker: the listener thread does not survive a
+    fork, so a new one is started.
+    """
+    global _listener, _listener_pid
+
+    if _listener is not None and _listener_pid == os.getpid():
+        return
+    # A listener inherited from the parent has no thread; just forget it
+    _listener = None
+
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(JsonFormatter())
+
+    records = queue.SimpleQueue()
+    handler = LocalQueueHandler(records)
+    handler.addFilter(SamplingFilter(app.config['LOG_DEBUG_SAMPLE_RATE']))
+
+    root = logging.getLogger()
+    for existing in [h for h in root.handlers if isinstance(h, logging.handlers.QueueHandler)]:
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(app.config['LOG_LEVEL'])
+
+    _listener = logging.handlers.QueueListener(records, stream, respect_handler_level=True)
+    _listener.start()
+    _listener_pid = os.getpid()
+
+
+def _stop_listener():
+    if _listener is not None and _listener_pid == os.getpid():
+        _listener.stop()
+
+
+# Flush what is still queued when the process exits
+atexit.register(_stop_listener)
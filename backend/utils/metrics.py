@@ -0,0 +1,278 @@
+import bisect
+import math
+import threading
+import time
+from flask import g, request
+
+# Request and query latencies, in seconds
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+SQL_OPERATIONS = ('select', 'insert', 'update', 'delete', 'replace', 'call')
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    """A named family of series, one per combination of label values."""
+
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f'{self.name} expects labels {self.labelnames}')
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        with self._lock:
+            series = sorted(self._series.items())
+        lines.extend(self._render_series(series))
+        return lines
+
+    def _render_series(self, series):
+        return [
+            f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}'
+            for key, value in series
+        ]
+
+
+class Counter(_Metric):
+    """Monotonically increasing total."""
+
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """Value that goes up and down."""
+
+    kind = 'gauge'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = value
+
+
+class Histogram(_Metric):
+    """Observations counted into cumulative buckets, with their sum and count."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # Per-bucket counts (the last one is +Inf), then sum
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def _render_series(self, series):
+        lines = []
+        bounds = self.buckets + (math.inf,)
+        for key, (counts, total) in series:
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, f'le="{_format_value(float(bound))}"')
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f'{self.name}_sum{labels} {_format_value(total)}')
+            lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+
+class MetricsRegistry:
+    """Metric families of this process, rendered in the Prometheus text format.
+
+    Collectors are callables run just before rendering, to refresh gauges
+    that are cheaper to read on demand (pool sizes, cache counters) than to
+    keep up to date on every change.
+    """
+
+    CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, collector):
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self):
+        with self._lock:
+            collectors = list(self._collectors)
+            metrics = [self._metrics[name] for name in sorted(self._metrics)]
+        for collector in collectors:
+            collector()
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+def sql_operation(query):
+    """Leading SQL keyword of a statement, for low-cardinality labels."""
+    keyword = query.lstrip(' \t\r\n(').split(None, 1)[0].lower() if query.strip() else ''
+    return keyword if keyword in SQL_OPERATIONS else 'other'
+
+
+class RequestMetrics:
+    """Per-endpoint request latency, status counts and in-flight gauges.
+
+    Endpoints are labelled by their Flask endpoint name rather than the URL,
+    so ids in paths do not create new series; unmatched URLs share one label.
+    """
+
+    def __init__(self, registry):
+        self.registry = registry
+        self.enabled = True
+        self._collecting = False
+        self.latency = registry.histogram(
+            'http_request_duration_seconds', 'Time spent handling requests.', ('method', 'endpoint')
+        )
+        self.responses = registry.counter(
+            'http_responses_total', 'Responses sent, by status code.', ('method', 'endpoint', 'status')
+        )
+        self.in_flight = registry.gauge(
+            'http_requests_in_flight', 'Requests being handled right now.', ('endpoint',)
+        )
+        self.query_latency = registry.histogram(
+            'db_query_duration_seconds', 'Time spent in Database.execute_* calls.', ('operation',)
+        )
+        self.query_rows = registry.counter(
+            'db_query_rows_total', 'Rows returned or affected by Database.execute_* calls.', ('operation',)
+        )
+        self.pool_connections = registry.gauge(
+            'db_pool_connections', 'Connections of the database pool.', ('state',)
+        )
+        self.replica_healthy = registry.gauge(
+            'db_replica_healthy', 'Whether a read replica takes reads (1) or is ejected (0).', ('replica',)
+        )
+        self.replica_lag = registry.gauge(
+            'db_replica_lag_seconds', 'Replication lag measured by the last check.', ('replica',)
+        )
+
+    def init_app(self, app):
+        """Install the request hooks and the database observer.
+
+        Call before the other extensions register their ``after_request``
+        hooks: Flask runs those in reverse order, so ours runs last and sees
+        the final status, including a failed commit turned into a 500.
+        """
+        from utils.database import db
+
+        self.enabled = app.config['METRICS_ENABLED']
+        if not self.enabled:
+            return
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        app.teardown_request(self._teardown_request)
+        db.add_observer(self.observe_query)
+        if not self._collecting:
+            self.registry.add_collector(lambda: self._collect_pool(db))
+            self._collecting = True
+
+    @staticmethod
+    def _endpoint():
+        return request.endpoint or 'unmatched'
+
+    def _start_request(self):
+        g._metrics_started = time.perf_counter()
+        self.in_flight.inc(endpoint=self._endpoint())
+
+    def _finish_request(self, response):
+        started = g.pop('_metrics_started', None)
+        if started is not None:
+            endpoint = self._endpoint()
+            self.latency.observe(time.perf_counter() - started, method=request.method, endpoint=endpoint)
+            self.responses.inc(method=request.method, endpoint=endpoint, status=response.status_code)
+            self.in_flight.dec(endpoint=endpoint)
+        return response
+
+    def _teardown_request(self, exc):
+        # Only reached with the start time still set when after_request never ran
+        if g.pop('_metrics_started', None) is not None:
+            self.in_flight.dec(endpoint=self._endpoint())
+
+    def observe_query(self, query, elapsed, rows):
+        operation = sql_operation(query)
+        self.query_latency.observe(elapsed, operation=operation)
+        if rows is not None and rows > 0:
+            self.query_rows.inc(rows, operation=operation)
+
+    def _collect_pool(self, db):
+        for state, value in db.pool_stats().items():
+            if state in ('size', 'in_use', 'idle', 'waiting'):
+                self.pool_connections.set(value, state=state)
+        for replica in db.replica_stats():
+            self.replica_healthy.set(int(replica['healthy']), replica=replica['replica'])
+            if replica['lag'] is not None:
+                self.replica_lag.set(replica['lag'], replica=replica['replica'])
+
+
+# Global metrics registry and request instrumentation
+registry = MetricsRegistry()
+metrics = RequestMetrics(registry)
@@ -0,0 +1,158 @@
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+
+BCRYPT_COST_PATTERN = re.compile(r'^\$2[aby]?\$(\d{2})\$')
+
+
+class HasherBusy(Exception):
+    """Raised when too many password operations are already queued."""
+    pass
+
+
+class PasswordHasher:
+    """Runs bcrypt on a small, bounded worker pool instead of the request thread.
+
+    bcrypt releases the GIL while hashing, so a thread pool gives real
+    parallelism without the cost of shipping work to another process. At most
+    ``max_queue`` operations may be pending at once; beyond that callers get
+    ``HasherBusy`` straight away so the endpoint can answer 503 instead of
+    tying up the worker. Batches wait for slots instead, but hold at most
+    ``max_batch_queue`` of them between them, so logins keep getting slots
+    while a large batch runs.
+    """
+
+    def __init__(self):
+        self.rounds = 12
+        self.max_workers = 2
+        self.max_queue = 16
+        self.max_batch_queue = 8
+        self._executor = None
+        self._slots = None
+        self._batch_slots = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """Configure the pool and settle on a work factor."""
+        self.max_workers = app.config['BCRYPT_MAX_WORKERS']
+        self.max_queue = app.config['BCRYPT_MAX_QUEUE']
+        self.max_batch_queue = app.config['BCRYPT_MAX_BATCH_QUEUE'] or max(1, self.max_queue // 2)
+        self._shutdown()
+
+        rounds = app.config.get('BCRYPT_ROUNDS')
+        if rounds:
+            self.rounds = rounds
+        else:
+            self.rounds = self.calibrate(
+                app.config['BCRYPT_TARGET_MS'],
+                min_rounds=app.config['BCRYPT_MIN_ROUNDS'],
+                max_rounds=app.config['BCRYPT_MAX_ROUNDS']
+            )
+
+    @staticmethod
+    def calibrate(target_ms, min_rounds=10, max_rounds=15):
+        """Return the highest cost whose hash time stays within ``target_ms``.
+
+        Each extra round doubles the work, so one timed hash at ``min_rounds``
+        is enough to estimate the others.
+        """
+        started = time.perf_counter()
+        bcrypt.hashpw(b'calibration', bcrypt.gensalt(rounds=min_rounds))
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        rounds = min_rounds
+        while rounds < max_rounds and elapsed_ms * 2 <= target_ms:
+            rounds += 1
+            elapsed_ms *= 2
+        return rounds
+
+    def hash(self, password):
+        """Hash a password with the configured cost."""
+        return self._run(self._hash, password, self.rounds)
+
+    def hash_many(self, passwords):
+        """Hash several passwords in parallel, preserving order.
+
+        Unlike single operations this waits for queue slots rather than
+        failing, so one large batch cannot be rejected halfway through. It
+        never holds more than ``max_batch_queue`` slots at a time.
+        """
+        _, _, batch_slots = self._get_executor()
+        futures = []
+        for password in passwords:
+            batch_slots.acquire()
+            try:
+                future = self._submit(self._hash, password, self.rounds, blocking=True)
+            except Exception:
+                batch_slots.release()
+                raise
+            future.add_done_callback(lambda _: batch_slots.release())
+            futures.append(future)
+        return [future.result() for future in futures]
+
+    def verify(self, password, password_hash):
+        """Check a password against a stored bcrypt hash."""
+        return self._run(self._verify, password, password_hash)
+
+    def needs_rehash(self, password_hash):
+        """True if ``password_hash`` was made with a lower cost than configured."""
+        match = BCRYPT_COST_PATTERN.match(password_hash or '')
+        return match is None or int(match.group(1)) < self.rounds
+
+    @staticmethod
+    def _hash(password, rounds):
+        return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=rounds)).decode('utf-8')
+
+    @staticmethod
+    def _verify(password, password_hash):
+        try:
+            return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
+        except (ValueError, AttributeError):
+            return False
+
+    def _run(self, fn, *args):
+        return self._submit(fn, *args).result()
+
+    def _submit(self, fn, *args, blocking=False):
+        executor, slots, _ = self._get_executor()
+        if not slots.acquire(blocking=blocking):
+            raise HasherBusy('Too many password operations in progress')
+        try:
+            future = executor.submit(fn, *args)
+        except Exception:
+            slots.release()
+            raise
+        future.add_done_callback(lambda _: slots.release())
+        return future
+
+    def _get_executor(self):
+        """Return the worker pool, recreating it in a forked child."""
+        pid = os.getpid()
+        if self._executor is None or self._pid != pid:
+            with self._lock:
+                if self._executor is None or self._pid != pid:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers,
+                        thread_name_prefix='bcrypt'
+                    )
+                    self._slots = threading.BoundedSemaphore(self.max_queue)
+                    self._batch_slots = threading.BoundedSemaphore(min(self.max_batch_queue, self.max_queue))
+                    self._pid = pid
+        return self._executor, self._slots, self._batch_slots
+
+    def _shutdown(self):
+        with self._lock:
+            if self._executor is not None and self._pid == os.getpid():
+                self._executor.shutdown(wait=False)
+            self._executor = None
+            self._slots = None
+            self._batch_slots = None
+
+
+# Global password hasher instance
+hasher = PasswordHasher()
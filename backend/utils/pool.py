@@ -0,0 +1,324 @@
+import os
+import threading
+import time
+import weakref
+from collections import deque
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection could be checked out before the timeout."""
+    pass
+
+
+class _PooledConnection:
+    """Bookkeeping for a single pooled connection."""
+
+    __slots__ = ('connection', 'created_at', 'last_used')
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+
+
+class _Waiter:
+    """A thread queued for a connection."""
+
+    __slots__ = ('entry', 'create', 'ready')
+
+    def __init__(self):
+        self.entry = None
+        self.create = False
+        self.ready = False
+
+
+# Every pool created in this process, so they can all be reset after a fork.
+_pools = weakref.WeakSet()
+
+
+class ConnectionPool:
+    """Bounded, thread-safe pool of database connections.
+
+    Connections are created lazily up to ``max_size``. A checkout blocks for at
+    most ``timeout`` seconds when the pool is exhausted. Idle connections are
+    pinged before reuse once they have been idle for ``ping_interval`` seconds
+    and are replaced once they are older than ``recycle`` seconds.
+
+    ``min_size`` connections are kept open: ``warm()`` opens them up front,
+    connections beyond them are closed once idle for ``idle_timeout``
+    seconds (checked whenever one is returned), and a discarded connection
+    is replaced at once while the pool is below ``min_size``.
+    """
+
+    def __init__(self, connect, min_size=1, max_size=10, timeout=5.0,
+                 recycle=3600, ping_interval=30, idle_timeout=600):
+        if max_size < 1:
+            raise ValueError('max_size must be at least 1')
+
+        self._connect = connect
+        self.min_size = max(0, min(min_size, max_size))
+        self.max_size = max_size
+        self.timeout = timeout
+        self.recycle = recycle
+        self.ping_interval = ping_interval
+        self.idle_timeout = idle_timeout
+
+        self._init_state()
+        _pools.add(self)
+
+    def _init_state(self):
+        """(Re)initialize all process-local state."""
+        self._pid = os.getpid()
+        self._cond = threading.Condition(threading.Lock())
+        self._idle = deque()
+        self._in_use = {}
+        self._waiters = deque()
+        self._size = 0
+
+        # Statistics
+        self._waits = 0
+        self._wait_time = 0.0
+        self._max_wait_time = 0.0
+        self._timeouts = 0
+        self._created = 0
+        self._recycled = 0
+        self._ping_failures = 0
+        self._trimmed = 0
+
+    def _check_fork(self):
+        """Drop inherited connections if we are running in a forked child."""
+        if self._pid != os.getpid():
+            self.reset()
+
+    def reset(self):
+        """Forget every connection without closing it.
+
+        Used after ``fork()``: the sockets are shared with the parent process, so
+        closing them here would tear down the parent's connections as well.
+        """
+        self._init_state()
+
+    def acquire(self):
+        """Check out a connection, creating one if the pool is not full."""
+        self._check_fork()
+        create = False
+
+        with self._cond:
+            if self._idle and not self._waiters:
+                entry = self._idle.pop()
+            elif self._size < self.max_size and not self._waiters:
+                self._size += 1
+                entry = None
+                create = True
+            else:
+                entry, create = self._wait()
+
+        try:
+            if create:
+                entry = self._open()
+            else:
+                entry = self._validate(entry)
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._hand_off_slot()
+            raise
+
+        with self._cond:
+            self._in_use[id(entry.connection)] = entry
+        return entry.connection
+
+    def _wait(self):
+        """Queue for the next released connection (called with the lock held).
+
+        Waiters are served first-in first-out so a burst of new checkouts
+        cannot starve threads that are already waiting.
+        """
+        waiter = _Waiter()
+        self._waiters.append(waiter)
+        self._waits += 1
+        started = time.monotonic()
+        deadline = started + self.timeout
+
+        while not waiter.ready:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self._waiters.remove(waiter)
+                self._timeouts += 1
+                self._record_wait(started)
+                raise PoolTimeout(
+                    f'Timed out after {self.timeout}s waiting for a database connection'
+                )
+            self._cond.wait(remaining)
+
+        self._record_wait(started)
+        return waiter.entry, waiter.create
+
+    def _hand_off_slot(self):
+        """Let the oldest waiter open a new connection (called with the lock held)."""
+        if self._waiters and self._size < self.max_size:
+            waiter = self._waiters.popleft()
+            self._size += 1
+            waiter.create = True
+            waiter.ready = True
+            self._cond.notify_all()
+
+    def release(self, connection, discard=False):
+        """Return a connection to the pool, or close it if ``discard`` is set."""
+        if self._pid != os.getpid():
+            # Checked out by the parent before the fork; not ours to return.
+            return
+
+        with self._cond:
+            entry = self._in_use.pop(id(connection), None)
+            if entry is None:
+                return
+            if not discard:
+                entry.last_used = time.monotonic()
+                if self._waiters:
+                    waiter = self._waiters.popleft()
+                    waiter.entry = entry
+                    waiter.ready = True
+                    self._cond.notify_all()
+                    return
+                self._idle.append(entry)
+                stale = self._take_stale()
+            else:
+                self._size -= 1
+                self._hand_off_slot()
+                refill = self._size < self.min_size
+
+        if not discard:
+            for entry in stale:
+                self._close(entry.connection)
+            return
+
+        self._close(connection)
+        if refill:
+            try:
+                self.warm()
+            except Exception:
+                # Left to the next checkout
+                pass
+
+    def warm(self, size=None):
+        """Open connections until ``size`` (default ``min_size``) are idle.
+
+        Without ``size`` this stops at ``min_size`` connections in total,
+        idle or not.
+        """
+        self._check_fork()
+        target = self.min_size if size is None else min(size, self.max_size)
+        while True:
+            with self._cond:
+                if len(self._idle) >= target or self._size >= self.max_size:
+                    return
+                if size is None and self._size >= target:
+                    return
+                self._size += 1
+            try:
+                entry = self._open()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                raise
+            with self._cond:
+                if self._waiters:
+                    waiter = self._waiters.popleft()
+                    waiter.entry = entry
+                    waiter.ready = True
+                    self._cond.notify_all()
+                else:
+                    self._idle.append(entry)
+
+    def close(self):
+        """Close every idle connection."""
+        with self._cond:
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+        for entry in idle:
+            self._close(entry.connection)
+
+    def stats(self):
+        """Return a snapshot of pool usage counters."""
+        with self._cond:
+            return {
+                'size': self._size,
+                'in_use': len(self._in_use),
+                'idle': len(self._idle),
+                'waiting': len(self._waiters),
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'waits': self._waits,
+                'wait_time_total': round(self._wait_time, 6),
+                'wait_time_max': round(self._max_wait_time, 6),
+                'timeouts': self._timeouts,
+                'created': self._created,
+                'recycled': self._recycled,
+                'ping_failures': self._ping_failures,
+                'trimmed': self._trimmed
+            }
+
+    def _record_wait(self, started):
+        waited = time.monotonic() - started
+        self._wait_time += waited
+        self._max_wait_time = max(self._max_wait_time, waited)
+
+    def _take_stale(self):
+        """Remove idle connections beyond ``min_size`` idle for ``idle_timeout`` (called with the lock held).
+
+        The least recently used connections are at the left of the deque.
+        """
+        stale = []
+        if not self.idle_timeout:
+            return stale
+        cutoff = time.monotonic() - self.idle_timeout
+        while self._idle and self._size > self.min_size and self._idle[0].last_used < cutoff:
+            stale.append(self._idle.popleft())
+            self._size -= 1
+            self._trimmed += 1
+        return stale
+
+    def _open(self):
+        entry = _PooledConnection(self._connect())
+        with self._cond:
+            self._created += 1
+        return entry
+
+    def _validate(self, entry):
+        """Recycle old connections and ping ones that have been idle a while."""
+        now = time.monotonic()
+
+        if self.recycle and now - entry.created_at > self.recycle:
+            self._close(entry.connection)
+            with self._cond:
+                self._recycled += 1
+            return self._open()
+
+        if self.ping_interval is not None and now - entry.last_used > self.ping_interval:
+            try:
+                entry.connection.ping(reconnect=False)
+            except Exception:
+                self._close(entry.connection)
+                with self._cond:
+                    self._ping_failures += 1
+                return self._open()
+
+        return entry
+
+    @staticmethod
+    def _close(connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+
+def _reset_pools_after_fork():
+    for pool in list(_pools):
+        pool.reset()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_pools_after_fork)
@@ -0,0 +1,211 @@
+import json
+import logging
+import re
+import time
+from functools import lru_cache
+from flask import g, has_request_context, request
+from flask_jwt_extended import get_jwt, verify_jwt_in_request
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_HEADER = 'X-Query-Profile'
+SUMMARY_LIMIT = 10
+# Outside debug and testing only staff tokens get the summary; it exposes the statements run
+SUMMARY_ROLES = ('admin', 'lab')
+
+_COMMENTS = re.compile(r'/\*.*?\*/|--[^\n]*', re.S)
+_STRINGS = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.)*\"")
+_PLACEHOLDERS = re.compile(r'%\(\w+\)s|%s')
+_NUMBERS = re.compile(r'\b\d+(?:\.\d+)?\b')
+_LISTS = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_SPACES = re.compile(r'\s+')
+
+
+@lru_cache(maxsize=1024)
+def fingerprint(query):
+    """Normalize a statement so that executions differing only in values match.
+
+    Literals and placeholders become ``?``, ``IN (?, ?, ...)`` lists of any
+    length become ``(?+)`` and whitespace and comments are dropped.
+    """
+    text = _COMMENTS.sub(' ', query)
+    text = _STRINGS.sub('?', text)
+    text = _PLACEHOLDERS.sub('?', text)
+    text = _NUMBERS.sub('?', text)
+    text = _LISTS.sub('(?+)', text)
+    return _SPACES.sub(' ', text).strip()
+
+
+class RequestProfile:
+    """Statements executed during one request, grouped by fingerprint."""
+
+    __slots__ = ('started', 'queries', 'time', 'statements')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.time = 0.0
+        # fingerprint -> [executions, seconds, {parameter set: executions}]
+        self.statements = {}
+
+    def record(self, query, args, elapsed):
+        self.queries += 1
+        self.time += elapsed
+        statement = self.statements.get(query)
+        if statement is None:
+            statement = self.statements[query] = [0, 0.0, {}]
+        statement[0] += 1
+        statement[1] += elapsed
+        key = repr(args)
+        statement[2][key] = statement[2].get(key, 0) + 1
+
+    def summary(self, threshold, duplicate_threshold):
+        """Per-fingerprint counts, with N+1 and duplicate patterns flagged."""
+        grouped = {}
+        for query, (count, elapsed, parameters) in self.statements.items():
+            entry = grouped.setdefault(fingerprint(query), {'count': 0, 'time_ms': 0.0, 'distinct': 0, 'same': 0})
+            entry['count'] += count
+            entry['time_ms'] += elapsed * 1000
+            entry['distinct'] += len(parameters)
+            entry['same'] = max(entry['same'], max(parameters.values()))
+
+        statements = []
+        for text, entry in grouped.items():
+            issues = []
+            # The same statement with the same values: the first result could have been reused
+            if entry['same'] >= duplicate_threshold:
+                issues.append('duplicate')
+            # The same statement with different values, typically once per row of an earlier result
+            if entry['distinct'] >= threshold:
+                issues.append('n_plus_one')
+            statements.append({
+                'fingerprint': text,
+                'count': entry['count'],
+                'time_ms': round(entry['time_ms'], 3),
+                'issues': issues
+            })
+        statements.sort(key=lambda statement: (-statement['count'], -statement['time_ms']))
+        return {
+            'queries': self.queries,
+            'time_ms': round(self.time * 1000, 3),
+            'statements': statements
+        }
+
+
+class ProfiledCursor:
+    """Cursor proxy that records every execute into the request profile."""
+
+    __slots__ = ('_cursor', '_profile')
+
+    def __init__(self, cursor, profile):
+        self._cursor = cursor
+        self._profile = profile
+
+    def execute(self, query, args=None):
+        started = time.perf_counter()
+        try:
+            return self._cursor.execute(query, args)
+        finally:
+            self._profile.record(query, args, time.perf_counter() - started)
+
+    def executemany(self, query, args):
+        started = time.perf_counter()
+        try:
+            return self._cursor.executemany(query, args)
+        finally:
+            self._profile.record(query, None, time.perf_counter() - started)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+
+class QueryProfiler:
+    """Counts the statements of each request and reports them.
+
+    When enabled, every cursor handed out by ``Database`` during a request
+    is wrapped to record its statements. The response gets a
+    ``Server-Timing`` header with the database time and query count. A
+    statement fingerprint executed with ``threshold`` different sets of
+    values (N+1), or ``duplicate_threshold`` times with the same values, is
+    logged as a warning. Clients may ask for the full summary as JSON in
+    the ``X-Query-Profile`` response header by sending ``X-Query-Profile:
+    summary``; unless the app runs in debug or testing mode, only requests
+    with a valid access token of a ``SUMMARY_ROLES`` role get it.
+
+    When disabled, no hooks are installed and ``Database`` only checks one
+    attribute per cursor.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.threshold = 5
+        self.duplicate_threshold = 2
+        self.open_summary = False
+
+    def init_app(self, app):
+        """Install the request hooks and the cursor wrapper if enabled."""
+        from utils.database import db
+
+        self.enabled = app.config['QUERY_PROFILER_ENABLED']
+        self.threshold = app.config['QUERY_PROFILER_THRESHOLD']
+        self.duplicate_threshold = app.config['QUERY_PROFILER_DUPLICATE_THRESHOLD']
+        self.open_summary = app.debug or app.testing
+        if not self.enabled:
+            return
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        db.set_cursor_wrapper(self.wrap)
+
+    @staticmethod
+    def wrap(cursor):
+        """Wrap ``cursor`` if the current request is being profiled."""
+        if not has_request_context():
+            return cursor
+        profile = g.get('_query_profile')
+        return cursor if profile is None else ProfiledCursor(cursor, profile)
+
+    @staticmethod
+    def _start_request():
+        g._query_profile = RequestProfile()
+
+    def _finish_request(self, response):
+        profile = g.pop('_query_profile', None)
+        if profile is None:
+            return response
+
+        total_ms = (time.perf_counter() - profile.started) * 1000
+        response.headers.add(
+            'Server-Timing',
+            f'db;desc="{profile.queries} queries";dur={profile.time * 1000:.3f}, app;dur={total_ms:.3f}'
+        )
+        if not profile.queries:
+            return response
+
+        summary = profile.summary(self.threshold, self.duplicate_threshold)
+        flagged = [statement for statement in summary['statements'] if statement['issues']]
+        if flagged:
+            logger.warning('Repeated queries', extra={
+                'endpoint': request.endpoint,
+                'queries': summary['queries'],
+                'flagged': flagged
+            })
+        if request.headers.get(SUMMARY_HEADER, '').lower() == 'summary' and self._may_see_summary():
+            summary['statements'] = summary['statements'][:SUMMARY_LIMIT]
+            response.headers[SUMMARY_HEADER] = json.dumps(summary, separators=(',', ':'))
+        return response
+
+    def _may_see_summary(self):
+        if self.open_summary:
+            return True
+        try:
+            verify_jwt_in_request(optional=True)
+        except Exception:
+            return False
+        return get_jwt().get('role') in SUMMARY_ROLES
+
+
+# Global query profiler instance
+query_profiler = QueryProfiler()
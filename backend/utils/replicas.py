@@ -0,0 +1,273 @@
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Statements that must see the primary even though they start with SELECT
+_LOCKING_CLAUSES = ('for update', 'for share', 'lock in share mode')
+
+_NOT_CHECKED = 'not checked yet'
+
+
+def parse_replicas(spec):
+    """Parse ``host[:port][=weight]`` entries separated by commas into tuples."""
+    replicas = []
+    for entry in (spec or '').split(','):
+        entry = entry.strip()
+        if not entry:
+            continue
+        address, _, weight = entry.partition('=')
+        host, _, port = address.partition(':')
+        try:
+            replicas.append((host.strip(), int(port or 3306), int(weight or 1)))
+        except ValueError:
+            raise ValueError(f'Invalid replica {entry!r}; expected host[:port][=weight]')
+        if replicas[-1][2] < 1:
+            raise ValueError(f'Invalid replica {entry!r}; the weight must be at least 1')
+    return replicas
+
+
+def is_plain_read(query):
+    """True for a SELECT that takes no locks, so a replica may answer it."""
+    text = query.lstrip(' \t\r\n(')
+    if text[:6].lower() != 'select':
+        return False
+    lowered = text.lower()
+    return not any(clause in lowered for clause in _LOCKING_CLAUSES)
+
+
+class Replica:
+    """A read replica, its connection pool and its last known lag."""
+
+    def __init__(self, host, port, weight, pool):
+        self.host = host
+        self.port = port
+        self.weight = weight
+        self.pool = pool
+        # Until the first lag check has seen it caught up
+        self.healthy = False
+        self.lag = None
+        self.reason = _NOT_CHECKED
+        self.current_weight = 0
+
+    @property
+    def name(self):
+        return f'{self.host}:{self.port}'
+
+
+class ReplicaSet:
+    """Picks a healthy replica by smooth weighted round robin.
+
+    A background thread measures each replica's lag every
+    ``check_interval`` seconds with ``lag_query`` (``SHOW REPLICA STATUS``
+    by default, or any statement returning the lag in seconds as its first
+    column) and ejects replicas more than ``max_lag`` seconds behind, or
+    whose lag cannot be read. A replica takes reads only once a check has
+    found it caught up, so none is used before the first check completes.
+    A failed read ejects its replica straight away.
+
+    The thread starts on the first pick, and again in a forked worker.
+    """
+
+    def __init__(self, replicas, max_lag=5.0, check_interval=2.0, lag_query=None):
+        self.replicas = list(replicas)
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.lag_query = lag_query
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._monitor_pid = None
+
+    def __bool__(self):
+        return bool(self.replicas)
+
+    def pick(self):
+        """Next healthy replica, or None when all of them are ejected."""
+        if self._monitor_pid != os.getpid():
+            self._start_monitor()
+
+        with self._lock:
+            best = None
+            total = 0
+            for replica in self.replicas:
+                if not replica.healthy:
+                    continue
+                replica.current_weight += replica.weight
+                total += replica.weight
+                if best is None or replica.current_weight > best.current_weight:
+                    best = replica
+            if best is not None:
+                best.current_weight -= total
+            return best
+
+    def eject(self, replica, reason):
+        with self._lock:
+            # Log the transition only, not every check that finds it still behind
+            announce = replica.healthy or replica.reason == _NOT_CHECKED
+            replica.healthy = False
+            replica.reason = reason
+            replica.current_weight = 0
+        if announce:
+            logger.warning('Replica ejected', extra={'replica': replica.name, 'reason': reason})
+
+    def _admit(self, replica, lag):
+        with self._lock:
+            was_healthy = replica.healthy
+            replica.healthy = True
+            replica.lag = lag
+            replica.reason = None
+        if not was_healthy:
+            logger.info('Replica admitted', extra={'replica': replica.name, 'lag': lag})
+
+    def check(self):
+        """Measure every replica's lag once and eject or readmit it."""
+        for replica in self.replicas:
+            try:
+                lag = self._measure(replica)
+            except Exception as e:
+                self.eject(replica, f'lag check failed: {e}')
+                continue
+            if lag is None:
+                replica.lag = None
+                self.eject(replica, 'replication is not running')
+            elif lag > self.max_lag:
+                replica.lag = lag
+                self.eject(replica, f'{lag:g}s behind')
+            else:
+                self._admit(replica, lag)
+
+    def _measure(self, replica):
+        connection = replica.pool.acquire()
+        cursor = None
+        discard = False
+        try:
+            cursor = connection.cursor()
+            if self.lag_query:
+                cursor.execute(self.lag_query)
+                row = cursor.fetchone()
+                value = next(iter(row.values())) if row else None
+            else:
+                cursor.execute('SHOW REPLICA STATUS')
+                row = cursor.fetchone()
+                # Servers before MySQL 8.0.22 and MariaDB still use the old column name
+                value = row.get('Seconds_Behind_Source', row.get('Seconds_Behind_Master')) if row else None
+            return None if value is None else float(value)
+        except Exception:
+            discard = True
+            raise
+        finally:
+            if cursor is not None:
+                cursor.close()
+            replica.pool.release(connection, discard=discard)
+
+    def _start_monitor(self):
+        with self._lock:
+            if self._monitor_pid == os.getpid():
+                return
+            self._monitor_pid = os.getpid()
+            # An Event inherited over fork may already be set by the parent's shutdown
+            self._stop = threading.Event()
+        threading.Thread(target=self._monitor, name='replica-lag-monitor', daemon=True).start()
+
+    def _monitor(self):
+        while True:
+            try:
+                self.check()
+            except Exception:
+                logger.exception('Replica lag check error')
+            if self._stop.wait(self.check_interval):
+                return
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self):
+        return [
+            {'replica': replica.name, 'weight': replica.weight, 'healthy': replica.healthy,
+             'lag': replica.lag, 'reason': replica.reason}
+            for replica in self.replicas
+        ]
+
+
+class SessionPins:
+    """Sessions that wrote recently and must read from the primary.
+
+    Pins are also published through ``channel``, a FileChannel every worker
+    reads, so a session stays pinned whichever worker serves its next
+    request; deadlines are wall-clock times for that reason. Pins all last
+    the same ``window``, so insertion order is (close to) expiry order and
+    expired pins are dropped from the front.
+    """
+
+    def __init__(self, window, channel=None):
+        self.window = window
+        self._channel = channel
+        self._deadlines = {}
+        self._lock = threading.Lock()
+
+    def pin(self, key):
+        deadline = time.time() + self.window
+        self._set(key, deadline)
+        if self._channel is not None:
+            try:
+                self._channel.publish(f'{key} {deadline:.3f}')
+            except OSError as e:
+                logger.error('Session pin channel error: %s', e)
+
+    def is_pinned(self, key):
+        self._sync()
+        deadline = self._deadlines.get(key)
+        return deadline is not None and deadline > time.time()
+
+    def _set(self, key, deadline):
+        with self._lock:
+            if self._deadlines.get(key, 0) >= deadline:
+                return
+            self._deadlines.pop(key, None)
+            self._deadlines[key] = deadline
+            self._prune()
+
+    def _sync(self):
+        """Apply pins published by other workers."""
+        if self._channel is None:
+            return
+        try:
+            messages, _ = self._channel.poll()
+        except OSError as e:
+            logger.error('Session pin channel error: %s', e)
+            return
+        for message in messages:
+            deadline = self._deadline(message)
+            if deadline is not None:
+                self._set(message.rpartition(' ')[0], deadline)
+
+    @staticmethod
+    def compact(lines):
+        """Channel lines of pins that have not expired yet."""
+        now = time.time()
+        return [line for line in lines if (SessionPins._deadline(line) or 0) > now]
+
+    @staticmethod
+    def _deadline(line):
+        """The deadline of a ``key deadline`` channel line, or None (logged) if it is malformed."""
+        key, _, deadline = line.rpartition(' ')
+        try:
+            if key:
+                return float(deadline)
+        except ValueError:
+            pass
+        logger.warning('Skipping malformed session pin: %r', line)
+        return None
+
+    def _prune(self):
+        now = time.time()
+        while self._deadlines:
+            key = next(iter(self._deadlines))
+            if self._deadlines[key] > now:
+                break
+            del self._deadlines[key]
+
+    def __len__(self):
+        return len(self._deadlines)
@@ -0,0 +1,116 @@
+import bisect
+from datetime import time as dt_time, timedelta
+
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+
+
+def to_minutes(value):
+    """Minutes past midnight for a TIME value (timedelta from pymysql, or time)."""
+    if value is None:
+        return None
+    if isinstance(value, timedelta):
+        return int(value.total_seconds()) // 60
+    if isinstance(value, dt_time):
+        return value.hour * 60 + value.minute
+    hours, minutes = str(value).split(':')[:2]
+    return int(hours) * 60 + int(minutes)
+
+
+def minute_of_week(moment):
+    """Minute of the week for a datetime, Monday 00:00 being 0."""
+    return moment.weekday() * MINUTES_PER_DAY + moment.hour * 60 + moment.minute
+
+
+def weekly_intervals(daily_hours):
+    """Compile seven ``(open, close)`` pairs (Monday first) into week intervals.
+
+    Returns sorted, merged, half-open ``(start, end)`` minute-of-week ranges.
+    A close time at or before the open time means the location closes the
+    next day; ranges running past Sunday midnight wrap to Monday.
+    """
+    intervals = []
+    for day, (opens, closes) in enumerate(daily_hours):
+        opens = to_minutes(opens)
+        closes = to_minutes(closes)
+        if opens is None or closes is None:
+            continue
+        if closes <= opens:
+            closes += MINUTES_PER_DAY
+
+        start = day * MINUTES_PER_DAY + opens
+        end = day * MINUTES_PER_DAY + closes
+        if end > MINUTES_PER_WEEK:
+            intervals.append((start, MINUTES_PER_WEEK))
+            intervals.append((0, end - MINUTES_PER_WEEK))
+        else:
+            intervals.append((start, end))
+
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+class WeeklyScheduleIndex:
+    """Answers "which slots are open at minute m" with one bisect.
+
+    Every slot (a small integer standing for one location) has a list of
+    week intervals. The index sweeps all interval boundaries once and stores,
+    for each segment between consecutive boundaries, an integer bitmask of
+    the slots open during that segment. A lookup is a binary search over the
+    boundaries; the result combines with other per-attribute bitmasks using
+    plain ``&``/``|``, evaluating every location at once.
+    """
+
+    def __init__(self):
+        self._intervals = {}
+        self._boundaries = []
+        self._masks = []
+        self._dirty = False
+
+    def set(self, slot, intervals):
+        """Replace the intervals of ``slot``."""
+        if intervals:
+            self._intervals[slot] = intervals
+        else:
+            self._intervals.pop(slot, None)
+        self._dirty = True
+
+    def remove(self, slot):
+        """Forget ``slot``."""
+        if self._intervals.pop(slot, None) is not None:
+            self._dirty = True
+
+    def open_mask(self, minute):
+        """Bitmask of slots open at ``minute`` of the week."""
+        if self._dirty:
+            self._rebuild()
+        position = bisect.bisect_right(self._boundaries, minute % MINUTES_PER_WEEK) - 1
+        return self._masks[position] if position >= 0 else 0
+
+    def _rebuild(self):
+        events = {}
+        for slot, intervals in self._intervals.items():
+            bit = 1 << slot
+            for start, end in intervals:
+                events[start] = events.get(start, 0) ^ bit
+                events[end] = events.get(end, 0) ^ bit
+
+        boundaries = [0]
+        masks = [0]
+        current = 0
+        for minute in sorted(events):
+            current ^= events[minute]
+            if minute == boundaries[-1]:
+                masks[-1] = current
+            else:
+                boundaries.append(minute)
+                masks.append(current)
+
+        self._boundaries = boundaries
+        self._masks = masks
+        self._dirty = False
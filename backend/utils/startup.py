@@ -0,0 +1,130 @@
+import gc
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from models.location import location_directory
+from utils.database import db
+from utils.log import configure_logging
+from utils.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+
+class StartupTimer:
+    """Durations of the startup phases of this process, and its time to first request.
+
+    ``create_app``, ``preload`` and ``warmup`` are how long those steps
+    took. ``ready`` and ``first_request`` are measured from the start of
+    the process (of the worker, once ``mark_started`` has run after a
+    fork) to the end of warm_worker and to the arrival of the first
+    request. Phases recorded in a gunicorn master before the fork are
+    inherited by every worker. Exported as the ``app_startup_seconds``
+    gauge.
+    """
+
+    def __init__(self, registry):
+        self.started = time.monotonic()
+        self.phases = {}
+        self._first_request_seen = False
+        self._lock = threading.Lock()
+        self.gauge = registry.gauge(
+            'app_startup_seconds', 'Duration of each startup phase of this process.', ('phase',)
+        )
+
+    def init_app(self, app):
+        """Record the arrival of the app's first request.
+
+        Call before the other extensions register their ``before_request``
+        hooks, so the time spent in those counts as serving the request.
+        """
+        app.before_request(self._first_request)
+
+    def mark_started(self):
+        """Start the clock again; call in a freshly forked worker."""
+        with self._lock:
+            self.started = time.monotonic()
+            self._first_request_seen = False
+            for phase in ('warmup', 'ready', 'first_request'):
+                self.phases.pop(phase, None)
+
+    def record(self, phase, seconds):
+        self.phases[phase] = seconds
+        self.gauge.set(seconds, phase=phase)
+        logger.info('Startup phase finished', extra={'phase': phase, 'seconds': round(seconds, 4), 'pid': os.getpid()})
+
+    @contextmanager
+    def phase(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def _first_request(self):
+        if self._first_request_seen:
+            return
+        with self._lock:
+            if self._first_request_seen:
+                return
+            self._first_request_seen = True
+            elapsed = time.monotonic() - self.started
+        self.record('first_request', elapsed)
+
+    def stats(self):
+        return {'pid': os.getpid(), **{phase: round(seconds, 4) for phase, seconds in self.phases.items()}}
+
+
+def preload(app):
+    """Load what forked workers can share, in the gunicorn master.
+
+    create_app has already imported the blueprints (and with them the
+    validators' compiled patterns), set up the JSON provider and calibrated
+    bcrypt. This adds the location directory and its weekly schedule index,
+    then closes the master's database connections so no socket is shared
+    with the workers, and moves everything allocated so far out of the
+    garbage collector's reach so collections in the workers do not touch
+    (and copy) the inherited pages. If the database is unreachable the
+    workers load the directory themselves.
+    """
+    with startup.phase('preload'):
+        if app.config['PRELOAD_DATA']:
+            try:
+                with app.app_context():
+                    location_directory.ensure_fresh()
+            except Exception:
+                logger.exception('Preload error')
+        db.pool.close()
+        if db.replicas:
+            # Started by the reads above; each worker starts its own
+            db.replicas.stop()
+            for replica in db.replicas.replicas:
+                replica.pool.close()
+        gc.freeze()
+
+
+def warm_worker(app):
+    """Set up per-process state in a worker before it accepts requests.
+
+    Pools drop inherited connections by themselves after a fork, and the
+    bcrypt executor and replica monitor start lazily in each process; the
+    log listener thread has to be started again here. The pool is then
+    filled to DB_POOL_WARMUP_SIZE connections and the location directory
+    loaded, unless the master already did. A failure is logged and the
+    worker starts anyway, cold.
+    """
+    with startup.phase('warmup'):
+        configure_logging(app)
+        try:
+            db.pool.warm(app.config['DB_POOL_WARMUP_SIZE'] or None)
+            if app.config['PRELOAD_DATA']:
+                with app.app_context():
+                    location_directory.ensure_fresh()
+        except Exception:
+            logger.exception('Worker warmup error')
+    startup.record('ready', time.monotonic() - startup.started)
+
+
+# Global startup timer
+startup = StartupTimer(registry)
@@ -0,0 +1,57 @@
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+
+def _text(value):
+    """Plain value for CSV/JSON output."""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, timedelta):
+        return str(value)
+    return value
+
+
+def csv_chunks(columns, batches):
+    """Encode batches of dict rows as CSV, one chunk per batch, header first."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    yield buffer.getvalue().encode('utf-8')
+
+    for rows in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        for row in rows:
+            writer.writerow(['' if row[column] is None else _text(row[column]) for column in columns])
+        yield buffer.getvalue().encode('utf-8')
+
+
+def ndjson_chunks(columns, batches):
+    """Encode batches of dict rows as newline-delimited JSON, one chunk per batch."""
+    for rows in batches:
+        yield ''.join(
+            json.dumps({column: _text(row[column]) for column in columns}, default=str) + '\n'
+            for row in rows
+        ).encode('utf-8')
+
+
+def gzip_chunks(chunks, level=6):
+    """Gzip a stream of byte chunks on the fly.
+
+    Every chunk is sync-flushed so the client receives data as soon as it
+    is produced instead of when the compressor's window fills up.
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    # Send the gzip header right away
+    yield compressor.compress(b'') + compressor.flush(zlib.Z_SYNC_FLUSH)
+    for chunk in chunks:
+        data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
@@ -0,0 +1,344 @@
+import hashlib
+import heapq
+import logging
+import math
+import threading
+import time
+from functools import wraps
+from flask import current_app, jsonify
+from flask_jwt_extended import create_access_token, create_refresh_token, get_jti, get_jwt, get_jwt_identity, jwt_required, verify_jwt_in_request
+from models.user_cache import user_cache
+from utils.cache import FileChannel
+from utils.database import db
+
+logger = logging.getLogger(__name__)
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings."""
+
+    def __init__(self, capacity, error_rate=0.01):
+        capacity = max(1, capacity)
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        # Double hashing: k positions from two independent 64-bit hashes
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def add(self, key):
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key):
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class TokenDenylist:
+    """Server-side revocation state for JWTs.
+
+    Two mechanisms are supported:
+
+    * individual tokens are revoked by ``jti`` (logout). Lookups go through a
+      Bloom filter first, so the common case of a token that was never revoked
+      costs a few hash probes; only filter hits consult the exact set. Revoked
+      ids are kept in a heap ordered by token expiry and pruned once the token
+      could no longer be used anyway.
+    * all of a user's tokens are revoked by bumping the user's token version
+      (deactivation). Tokens carry the version they were issued with in the
+      ``ver`` claim and are rejected once it falls behind. The version is
+      kept in the ``token_version`` column of ``users``, which every process
+      loads before checking its first token; the copy held here is a cache.
+
+    Tokens issued to an inactive account (``active`` claim false) are
+    rejected as well.
+
+    Revocations are appended to a shared file (TOKEN_REVOCATION_CHANNEL_PATH,
+    under ``instance/`` by default) that every worker replays, which also
+    restores the state on restart. Without one, a logout would only hold in
+    the process that made it, and a version bump would reach the other
+    workers only when they next load the versions.
+    The file is compacted to the revocations still in force once it grows
+    past CHANNEL_MAX_BYTES.
+    """
+
+    def __init__(self):
+        self.capacity = 100000
+        self.error_rate = 0.01
+        self._lock = threading.Lock()
+        self._channel = None
+        self._reset()
+
+    def init_app(self, app):
+        """Configure sizing and the optional cross-worker channel."""
+        self.capacity = app.config['TOKEN_DENYLIST_CAPACITY']
+        self.error_rate = app.config['TOKEN_DENYLIST_ERROR_RATE']
+        with self._lock:
+            self._reset()
+        path = app.config['TOKEN_REVOCATION_CHANNEL_PATH']
+        self._channel = FileChannel(
+            path, replay=True, max_bytes=app.config['CHANNEL_MAX_BYTES'], compact=self._compact
+        ) if path else None
+        self._sync()
+
+    def _reset(self):
+        self._bloom = BloomFilter(self.capacity, self.error_rate)
+        self._revoked = {}
+        self._expiry_heap = []
+        self._versions = {}
+        self._loaded = False
+
+    def revoke(self, jti, expires_at):
+        """Revoke a single token until its expiry (a Unix timestamp)."""
+        self._revoke(jti, expires_at)
+        self._publish(f'jti {jti} {int(expires_at)}')
+
+    def bump_version(self, user_id):
+        """Revoke every token issued to ``user_id`` so far.
+
+        The new version is written in the current transaction, and takes
+        effect here and in the other workers once that commits.
+        """
+        db.execute_update('UPDATE users SET token_version = token_version + 1 WHERE id = %s', (user_id,))
+        row = db.execute_single('SELECT token_version FROM users WHERE id = %s', (user_id,))
+        if row is None:
+            return 0
+        version = row['token_version']
+        db.after_commit(lambda: self._set_version(user_id, version))
+        return version
+
+    def version(self, user_id):
+        """Current token version for ``user_id``, read from its row."""
+        with db.primary():
+            row = db.execute_single('SELECT token_version FROM users WHERE id = %s', (user_id,))
+        return row['token_version'] if row else 0
+
+    def is_revoked(self, jwt_payload):
+        """True if the decoded token has been revoked."""
+        self._sync()
+        self._load()
+
+        if jwt_payload.get('active') is False:
+            return True
+
+        user_id = jwt_payload.get('sub')
+        try:
+            current_version = self._versions.get(int(user_id), 0)
+        except (TypeError, ValueError):
+            current_version = 0
+        if jwt_payload.get('ver', 0) < current_version:
+            return True
+
+        jti = jwt_payload.get('jti')
+        if jti is None or jti not in self._bloom:
+            return False
+        with self._lock:
+            self._prune()
+            return jti in self._revoked
+
+    def stats(self):
+        """Return denylist size information."""
+        with self._lock:
+            return {
+                'revoked_tokens': len(self._revoked),
+                'versioned_users': len(self._versions),
+                'bloom_bits': self._bloom.size
+            }
+
+    def _set_version(self, user_id, version):
+        with self._lock:
+            self._versions[user_id] = max(self._versions.get(user_id, 0), version)
+        self._publish(f'ver {user_id} {version}')
+
+    def _load(self):
+        """Load the versions of every user that has bumped one, once per process (or reset)."""
+        if self._loaded:
+            return
+        try:
+            with db.primary():
+                rows = db.execute_query('SELECT id, token_version FROM users WHERE token_version > 0')
+        except Exception as e:
+            # The cached versions still apply; try again on the next check
+            logger.error('Token version load error: %s', e)
+            return
+        with self._lock:
+            for row in rows:
+                self._versions[row['id']] = max(self._versions.get(row['id'], 0), row['token_version'])
+            self._loaded = True
+
+    def _revoke(self, jti, expires_at):
+        if expires_at <= time.time():
+            return
+        with self._lock:
+            if jti in self._revoked:
+                return
+            self._revoked[jti] = expires_at
+            heapq.heappush(self._expiry_heap, (expires_at, jti))
+            self._bloom.add(jti)
+            self._prune()
+
+    def _prune(self):
+        """Forget expired revocations (called with the lock held).
+
+        Bloom filters cannot delete, so the filter is rebuilt from the exact
+        set once enough entries have expired or it is over capacity.
+        """
+        now = time.time()
+        removed = 0
+        while self._expiry_heap and self._expiry_heap[0][0] <= now:
+            _, jti = heapq.heappop(self._expiry_heap)
+            if self._revoked.pop(jti, None) is not None:
+                removed += 1
+
+        if removed and (removed * 4 >= len(self._revoked) or len(self._revoked) > self.capacity):
+            self._bloom = BloomFilter(max(self.capacity, len(self._revoked) * 2), self.error_rate)
+            for jti in self._revoked:
+                self._bloom.add(jti)
+
+    def _publish(self, message):
+        if self._channel is None:
+            return
+        try:
+            self._channel.publish(message)
+        except OSError as e:
+            logger.error('Token revocation channel error: %s', e)
+
+    @staticmethod
+    def _compact(lines):
+        """Channel lines still needed: unexpired revocations and each user's latest version."""
+        now = time.time()
+        revocations = []
+        versions = {}
+        for line in lines:
+            entry = TokenDenylist._parse(line)
+            if entry is None:
+                continue
+            kind, key, value = entry
+            if kind == 'jti' and value > now:
+                revocations.append(line)
+            elif kind == 'ver' and value > versions.get(key, (0, None))[0]:
+                versions[key] = (value, line)
+        return revocations + [line for _, line in versions.values()]
+
+    def _sync(self):
+        """Apply revocations published by other workers."""
+        if self._channel is None:
+            return
+        try:
+            messages, reset = self._channel.poll()
+        except OSError as e:
+            logger.error('Token revocation channel error: %s', e)
+            return
+
+        if reset:
+            with self._lock:
+                self._reset()
+        for message in messages:
+            entry = self._parse(message)
+            if entry is None:
+                continue
+            kind, key, value = entry
+            if kind == 'jti':
+                self._revoke(key, value)
+            elif kind == 'ver':
+                with self._lock:
+                    user_id = int(key)
+                    self._versions[user_id] = max(self._versions.get(user_id, 0), value)
+
+    @staticmethod
+    def _parse(line):
+        """Split a channel line into (kind, key, value), or None if it is malformed.
+
+        A torn or hand-edited line is skipped rather than failing every
+        request that syncs past it.
+        """
+        try:
+            kind, key, value = line.split(' ')
+            if kind == 'ver':
+                int(key)
+            return kind, key, int(value)
+        except ValueError:
+            logger.warning('Skipping malformed token revocation entry: %r', line)
+            return None
+
+
+def token_claims(user_id, role, is_active):
+    """Identity claims carried in every token so handlers can skip user lookups."""
+    return {
+        'role': role,
+        'active': bool(is_active),
+        'ver': denylist.version(user_id)
+    }
+
+
+def create_token_pair(user_id, role, is_active):
+    """Access and refresh token for a new session.
+
+    The access token names its refresh token in the ``rjti`` claim, so
+    logging out with it revokes both.
+    """
+    claims = token_claims(user_id, role, is_active)
+    refresh_token = create_refresh_token(identity=str(user_id), additional_claims=claims)
+    access_token = create_access_token(
+        identity=str(user_id), additional_claims={**claims, 'rjti': get_jti(refresh_token)}
+    )
+    return access_token, refresh_token
+
+
+def revoke_session(claims):
+    """Revoke the access token ``claims`` and the refresh token it was issued with."""
+    denylist.revoke(claims['jti'], claims['exp'])
+    if claims.get('rjti'):
+        # Its expiry is not in the access token; no refresh token outlives this bound
+        lifetime = current_app.config['JWT_REFRESH_TOKEN_EXPIRES'].total_seconds()
+        denylist.revoke(claims['rjti'], time.time() + lifetime)
+
+
+# Roles that may see operational details (pool, cache and startup stats)
+STAFF_ROLES = ('admin', 'lab')
+
+
+def has_current_role(*roles):
+    """True if the verified token's user currently holds one of ``roles`` and is active.
+
+    The ``role`` claim only rules out callers cheaply: a token outlives a
+    role change made after it was issued, so the role is checked against
+    the user record (through ``user_cache``) as well.
+    """
+    if get_jwt().get('role') not in roles:
+        return False
+    user = user_cache.get(int(get_jwt_identity()))
+    return user is not None and bool(user.is_active) and user.role in roles
+
+
+def is_staff_request():
+    """True if the request carries a valid access token of a current staff user; never raises."""
+    try:
+        verify_jwt_in_request(optional=True)
+        return get_jwt_identity() is not None and has_current_role(*STAFF_ROLES)
+    except Exception:
+        return False
+
+
+def roles_required(*roles):
+    """Require a valid access token for an active user whose role is one of ``roles`` (see has_current_role)."""
+    def decorator(fn):
+        @wraps(fn)
+        @jwt_required()
+        def wrapper(*args, **kwargs):
+            if not has_current_role(*roles):
+                return jsonify({
+                    'success': False,
+                    'message': 'You do not have permission to perform this action'
+                }), 403
+            return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# Global token denylist instance
+denylist = TokenDenylist()
@@ -32,6 +32,7 @@ CREATE TABLE IF NOT EXISTS users (
     is_active BOOLEAN DEFAULT TRUE,
     is_eligible BOOLEAN DEFAULT TRUE,
     last_donation_date DATETIME,
+    token_version INT UNSIGNED NOT NULL DEFAULT 0,  -- bumped to revoke every token of the account
     
     -- Timestamps
     created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
@@ -46,7 +47,8 @@ CREATE TABLE IF NOT EXISTS users (
     INDEX idx_state (state),
     INDEX idx_is_active (is_active),
     INDEX idx_is_eligible (is_eligible),
-    INDEX idx_created_at (created_at)
+    INDEX idx_created_at (created_at),
+    INDEX idx_updated_at (updated_at)
 );
 
 -- Create locations table
@@ -128,6 +130,8 @@ CREATE TABLE IF NOT EXISTS donations (
     -- Processing information
     collection_bag_number VARCHAR(50),
     expiry_date DATETIME,
+    dispensed_at DATETIME,
+    expired_at DATETIME,
     processing_notes TEXT,
     
     -- Timestamps
@@ -145,7 +149,11 @@ CREATE TABLE IF NOT EXISTS donations (
     INDEX idx_location_id (location_id),
     INDEX idx_status (status),
     INDEX idx_user_blood_type (user_id, blood_type),
-    INDEX idx_date_status (donation_date, status)
+    INDEX idx_date_status (donation_date, status),
+    INDEX idx_updated_at (updated_at),
+    INDEX idx_collection_bag_number (collection_bag_number),
+    -- Units in stock of one blood type, first-expiring first
+    INDEX idx_units_in_stock (blood_type, status, dispensed_at, expired_at, expiry_date)
 );
 
 -- Create blood_inventory table
@@ -166,16 +174,49 @@ CREATE TABLE IF NOT EXISTS blood_inventory (
     last_updated DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     last_donation_date DATETIME,
     last_dispensed_date DATETIME,
+    version INT UNSIGNED NOT NULL DEFAULT 0,  -- bumped on every update, used for ETags
     
     -- Timestamps
     created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
     
+    -- Stock can never go negative or be reserved beyond what is on hand
+    CONSTRAINT chk_inventory_stock CHECK (
+        current_stock >= 0 AND reserved_stock >= 0 AND reserved_stock <= current_stock
+    ),
+    
     -- Indexes
     INDEX idx_blood_type (blood_type),
     INDEX idx_current_stock (current_stock),
     INDEX idx_last_updated (last_updated)
 );
 
+-- Create donor_stats_totals table (per-donor totals maintained by the donations triggers)
+CREATE TABLE IF NOT EXISTS donor_stats_totals (
+    user_id INT PRIMARY KEY,
+    total_donations INT NOT NULL DEFAULT 0,
+    total_volume_donated DECIMAL(12,2) NOT NULL DEFAULT 0,
+    last_donation_date_actual DATETIME,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
+-- Create inventory_rollups table (hourly and daily aggregates maintained by triggers)
+CREATE TABLE IF NOT EXISTS inventory_rollups (
+    bucket ENUM('hour', 'day') NOT NULL,
+    bucket_start DATETIME NOT NULL,
+    blood_type ENUM('A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-') NOT NULL,
+    location_id INT NOT NULL DEFAULT 0,  -- 0: no location (inventory-wide events)
+    
+    volume_collected DECIMAL(12,2) NOT NULL DEFAULT 0,
+    donations_completed INT NOT NULL DEFAULT 0,
+    units_dispensed DECIMAL(12,2) NOT NULL DEFAULT 0,
+    units_expired DECIMAL(12,2) NOT NULL DEFAULT 0,
+    stock_level DECIMAL(10,2),  -- current_stock after the last change in the bucket
+    
+    PRIMARY KEY (bucket, bucket_start, blood_type, location_id)
+);
+
 -- Insert default blood inventory records
 INSERT INTO blood_inventory (blood_type, current_stock, min_threshold, max_capacity) VALUES
 ('A+', 2000, 1000, 10000),
@@ -218,7 +259,9 @@ INSERT INTO donations (user_id, blood_type, quantity, donation_date, location_id
 (3, 'O+', 450.00, '2024-02-15 11:00:00', 1, 'pending', 14.0, NULL);
 
 -- Create indexes for better performance
-CREATE INDEX idx_donations_user_date ON donations(user_id, donation_date DESC);
+CREATE INDEX idx_donations_user_date ON donations(user_id, donation_date DESC, id DESC);
+-- Staff history across all donors (no user_id filter) seeks in the same order
+CREATE INDEX idx_donations_date_id ON donations(donation_date DESC, id DESC);
 CREATE INDEX idx_donations_blood_type_status ON donations(blood_type, status);
 CREATE INDEX idx_users_role_active ON users(role, is_active);
 CREATE INDEX idx_locations_active_accepting ON locations(is_active, is_accepting_donations);
@@ -236,13 +279,12 @@ SELECT
     u.state,
     u.is_eligible,
     u.last_donation_date,
-    COUNT(d.id) as total_donations,
-    SUM(CASE WHEN d.status = 'completed' THEN d.quantity ELSE 0 END) as total_volume_donated,
-    MAX(d.donation_date) as last_donation_date_actual
+    COALESCE(t.total_donations, 0) as total_donations,
+    COALESCE(t.total_volume_donated, 0) as total_volume_donated,
+    t.last_donation_date_actual
 FROM users u
-LEFT JOIN donations d ON u.id = d.user_id
-WHERE u.role = 'donor' AND u.is_active = TRUE
-GROUP BY u.id;
+LEFT JOIN donor_stats_totals t ON t.user_id = u.id
+WHERE u.role = 'donor' AND u.is_active = TRUE;
 
 CREATE VIEW inventory_summary AS
 SELECT 
@@ -250,7 +292,7 @@ SELECT
     current_stock,
     min_threshold,
     max_capacity,
-    available_stock,
+    current_stock - reserved_stock as available_stock,
     reserved_stock,
     expired_stock,
     CASE 
@@ -307,8 +349,10 @@ AFTER UPDATE ON donations
 FOR EACH ROW
 BEGIN
     IF NEW.status = 'completed' AND OLD.status != 'completed' THEN
+        -- The eligibility engine makes the donor eligible again once deferral ends
         UPDATE users 
-        SET last_donation_date = NEW.donation_date
+        SET last_donation_date = NEW.donation_date,
+            is_eligible = FALSE
         WHERE id = NEW.user_id;
     END IF;
 END //
@@ -324,8 +368,178 @@ BEGIN
     END IF;
 END //
 
+-- Keep donor_stats_totals in step with donations
+CREATE TRIGGER donor_stats_after_insert
+AFTER INSERT ON donations
+FOR EACH ROW
+BEGIN
+    INSERT INTO donor_stats_totals (user_id, total_donations, total_volume_donated, last_donation_date_actual)
+    VALUES (NEW.user_id, 1, IF(NEW.status = 'completed', NEW.quantity, 0), NEW.donation_date)
+    ON DUPLICATE KEY UPDATE
+        total_donations = total_donations + 1,
+        total_volume_donated = total_volume_donated + VALUES(total_volume_donated),
+        last_donation_date_actual = GREATEST(COALESCE(last_donation_date_actual, VALUES(last_donation_date_actual)), VALUES(last_donation_date_actual));
+END //
+
+CREATE TRIGGER donor_stats_after_update
+AFTER UPDATE ON donations
+FOR EACH ROW
+BEGIN
+    IF NEW.user_id = OLD.user_id THEN
+        IF NOT (NEW.status <=> OLD.status AND NEW.quantity <=> OLD.quantity AND NEW.donation_date <=> OLD.donation_date) THEN
+            UPDATE donor_stats_totals
+            SET total_volume_donated = total_volume_donated
+                    - IF(OLD.status = 'completed', OLD.quantity, 0)
+                    + IF(NEW.status = 'completed', NEW.quantity, 0),
+                last_donation_date_actual = IF(
+                    NEW.donation_date >= OLD.donation_date,
+                    GREATEST(COALESCE(last_donation_date_actual, NEW.donation_date), NEW.donation_date),
+                    (SELECT MAX(donation_date) FROM donations WHERE user_id = NEW.user_id)
+                )
+            WHERE user_id = NEW.user_id;
+        END IF;
+    ELSE
+        -- Donation moved to another donor
+        UPDATE donor_stats_totals
+        SET total_donations = total_donations - 1,
+            total_volume_donated = total_volume_donated - IF(OLD.status = 'completed', OLD.quantity, 0),
+            last_donation_date_actual = (SELECT MAX(donation_date) FROM donations WHERE user_id = OLD.user_id)
+        WHERE user_id = OLD.user_id;
+        
+        INSERT INTO donor_stats_totals (user_id, total_donations, total_volume_donated, last_donation_date_actual)
+        VALUES (NEW.user_id, 1, IF(NEW.status = 'completed', NEW.quantity, 0), NEW.donation_date)
+        ON DUPLICATE KEY UPDATE
+            total_donations = total_donations + 1,
+            total_volume_donated = total_volume_donated + VALUES(total_volume_donated),
+            last_donation_date_actual = GREATEST(COALESCE(last_donation_date_actual, VALUES(last_donation_date_actual)), VALUES(last_donation_date_actual));
+    END IF;
+END //
+
+CREATE TRIGGER donor_stats_after_delete
+AFTER DELETE ON donations
+FOR EACH ROW
+BEGIN
+    UPDATE donor_stats_totals
+    SET total_donations = total_donations - 1,
+        total_volume_donated = total_volume_donated - IF(OLD.status = 'completed', OLD.quantity, 0),
+        last_donation_date_actual = IF(
+            OLD.donation_date < last_donation_date_actual,
+            last_donation_date_actual,
+            (SELECT MAX(donation_date) FROM donations WHERE user_id = OLD.user_id)
+        )
+    WHERE user_id = OLD.user_id;
+END //
+
+-- Keep inventory_rollups in step with donations and blood_inventory
+CREATE PROCEDURE RecordCollection(IN at DATETIME, IN p_blood_type VARCHAR(3), IN p_location_id INT, IN p_quantity DECIMAL(10,2), IN p_count INT)
+BEGIN
+    INSERT INTO inventory_rollups (bucket, bucket_start, blood_type, location_id, volume_collected, donations_completed)
+    VALUES
+        ('hour', DATE_FORMAT(at, '%Y-%m-%d %H:00:00'), p_blood_type, COALESCE(p_location_id, 0), p_quantity, p_count),
+        ('day', DATE(at), p_blood_type, COALESCE(p_location_id, 0), p_quantity, p_count)
+    ON DUPLICATE KEY UPDATE
+        volume_collected = volume_collected + VALUES(volume_collected),
+        donations_completed = donations_completed + VALUES(donations_completed);
+END //
+
+CREATE TRIGGER rollup_donation_insert
+AFTER INSERT ON donations
+FOR EACH ROW
+BEGIN
+    IF NEW.status = 'completed' THEN
+        CALL RecordCollection(NEW.donation_date, NEW.blood_type, NEW.location_id, NEW.quantity, 1);
+    END IF;
+END //
+
+CREATE TRIGGER rollup_donation_update
+AFTER UPDATE ON donations
+FOR EACH ROW
+BEGIN
+    IF OLD.status = 'completed' AND NOT (NEW.status = 'completed' AND NEW.quantity <=> OLD.quantity
+            AND NEW.donation_date <=> OLD.donation_date AND NEW.blood_type <=> OLD.blood_type
+            AND NEW.location_id <=> OLD.location_id) THEN
+        CALL RecordCollection(OLD.donation_date, OLD.blood_type, OLD.location_id, -OLD.quantity, -1);
+        IF NEW.status = 'completed' THEN
+            CALL RecordCollection(NEW.donation_date, NEW.blood_type, NEW.location_id, NEW.quantity, 1);
+        END IF;
+    ELSEIF NEW.status = 'completed' AND OLD.status != 'completed' THEN
+        CALL RecordCollection(NEW.donation_date, NEW.blood_type, NEW.location_id, NEW.quantity, 1);
+    END IF;
+END //
+
+CREATE TRIGGER rollup_inventory_update
+AFTER UPDATE ON blood_inventory
+FOR EACH ROW
+BEGIN
+    -- units_dispensed_today is reset daily; only increases count as dispensing
+    IF NOT (NEW.current_stock <=> OLD.current_stock AND NEW.expired_stock <=> OLD.expired_stock
+            AND NEW.units_dispensed_today <=> OLD.units_dispensed_today) THEN
+        INSERT INTO inventory_rollups (bucket, bucket_start, blood_type, location_id, units_dispensed, units_expired, stock_level)
+        VALUES
+            ('hour', DATE_FORMAT(NOW(), '%Y-%m-%d %H:00:00'), NEW.blood_type, 0,
+             GREATEST(NEW.units_dispensed_today - OLD.units_dispensed_today, 0),
+             GREATEST(NEW.expired_stock - OLD.expired_stock, 0), NEW.current_stock),
+            ('day', CURDATE(), NEW.blood_type, 0,
+             GREATEST(NEW.units_dispensed_today - OLD.units_dispensed_today, 0),
+             GREATEST(NEW.expired_stock - OLD.expired_stock, 0), NEW.current_stock)
+        ON DUPLICATE KEY UPDATE
+            units_dispensed = units_dispensed + VALUES(units_dispensed),
+            units_expired = units_expired + VALUES(units_expired),
+            stock_level = VALUES(stock_level);
+    END IF;
+END //
+
+-- Every change to a stock row moves the inventory ETag
+CREATE TRIGGER inventory_version_bump
+BEFORE UPDATE ON blood_inventory
+FOR EACH ROW
+BEGIN
+    SET NEW.version = OLD.version + 1;
+END //
+
 DELIMITER ;
 
+-- units_dispensed_today and units_received_today start from zero every day.
+-- Needs event_scheduler=ON; without it run `flask inventory reset-daily` at midnight instead.
+CREATE EVENT IF NOT EXISTS reset_inventory_daily_counters
+ON SCHEDULE EVERY 1 DAY STARTS CURRENT_DATE + INTERVAL 1 DAY
+DO
+    UPDATE blood_inventory SET units_dispensed_today = 0, units_received_today = 0
+    WHERE units_dispensed_today <> 0 OR units_received_today <> 0;
+
+-- Backfill donor_stats_totals for rows inserted before the triggers existed
+-- (also available as `flask donor-stats backfill`)
+INSERT INTO donor_stats_totals (user_id, total_donations, total_volume_donated, last_donation_date_actual)
+SELECT 
+    user_id,
+    COUNT(*),
+    SUM(CASE WHEN status = 'completed' THEN quantity ELSE 0 END),
+    MAX(donation_date)
+FROM donations
+GROUP BY user_id
+ON DUPLICATE KEY UPDATE
+    total_donations = VALUES(total_donations),
+    total_volume_donated = VALUES(total_volume_donated),
+    last_donation_date_actual = VALUES(last_donation_date_actual);
+
+-- Backfill the collection figures of inventory_rollups the same way
+-- (also available as `flask rollups backfill`)
+INSERT INTO inventory_rollups (bucket, bucket_start, blood_type, location_id, volume_collected, donations_completed)
+SELECT * FROM (
+    SELECT 'hour', DATE_FORMAT(donation_date, '%Y-%m-%d %H:00:00'), blood_type, COALESCE(location_id, 0), SUM(quantity), COUNT(*)
+    FROM donations
+    WHERE status = 'completed'
+    GROUP BY 2, 3, 4
+    UNION ALL
+    SELECT 'day', DATE(donation_date), blood_type, COALESCE(location_id, 0), SUM(quantity), COUNT(*)
+    FROM donations
+    WHERE status = 'completed'
+    GROUP BY 2, 3, 4
+) AS collected
+ON DUPLICATE KEY UPDATE
+    volume_collected = VALUES(volume_collected),
+    donations_completed = VALUES(donations_completed);
+
 -- Grant permissions (adjust as needed for your MySQL user)
 -- GRANT ALL PRIVILEGES ON vitapink_bloodbank.* TO 'your_username'@'localhost';
 -- FLUSH PRIVILEGES;